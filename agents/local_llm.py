@@ -0,0 +1,284 @@
+"""
+Pool of warm local GPT4All models that stream tokens.
+
+Loading a model takes seconds and a single instance can only run one
+generation at a time. ``ModelPool`` therefore loads ``size`` instances up
+front and hands each request the next free one. Up to ``max_queue`` callers
+wait for an instance; past that the pool rejects requests right away with
+``PoolSaturated``, like the API's worker pools.
+
+``stream`` yields tokens as the model produces them, so the first words can
+be shown and spoken long before the whole answer is done. It returns a
+``TokenStream`` holding the instance, which goes back to the pool when the
+stream is exhausted or closed, or at the latest when it is garbage
+collected.
+
+Each instance keeps a chat session open with the fixed system prompt.
+Follow-up turns of the same conversation go back to the instance that
+already holds its context, and only the new message is evaluated, not the
+system prompt and history again. A session is restarted for a new
+conversation or after ``max_turns`` turns, to keep the context window
+bounded.
+"""
+import os
+import threading
+import time
+from contextlib import ExitStack
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from observability import tracing
+from observability.metrics import counter, histogram
+from orchestrator.executors import PoolSaturated
+
+DEFAULT_MODEL = "orca-mini-3b-gguf2-q4_0"
+SYSTEM_PROMPT = ("You are a helpful voice assistant running offline. "
+                 "Answer clearly in a few short sentences.")
+GENERATION_DEFAULTS = {'max_tokens': 512, 'temp': 0.7, 'top_p': 0.95, 'repeat_penalty': 1.1, 'top_k': 40}
+
+first_token_latency = histogram('llm_first_token_seconds', "Time from request to the first generated token")
+llm_sessions = counter('llm_sessions', "Local model turns by chat session use", ['session'])
+
+
+def gpt4all_factory(model_name: str = DEFAULT_MODEL, **kwargs) -> Callable[[], Any]:
+    """Factory for GPT4All instances; the package is only imported when a model loads"""
+    def load():
+        from gpt4all import GPT4All
+        return GPT4All(model_name, **kwargs)
+    return load
+
+
+class LocalModel:
+    """One loaded model and its open chat session"""
+
+    def __init__(self, model: Any, system_prompt: str = SYSTEM_PROMPT, max_turns: int = 8):
+        self.model = model
+        self.system_prompt = system_prompt
+        self.max_turns = max_turns
+        self.conversation: Optional[str] = None
+        self.turns = 0
+        self.last_used = 0.0
+        self._session = ExitStack()
+
+    def _restart(self, conversation: Optional[str]):
+        self._session.close()
+        self._session = ExitStack()
+        self._session.enter_context(self.model.chat_session(self.system_prompt))
+        self.conversation = conversation
+        self.turns = 0
+
+    def stream(self, prompt: str, conversation: Optional[str] = None, **params) -> Iterator[str]:
+        """Tokens of the reply; stops generating as soon as the caller stops reading"""
+        reuse = conversation is not None and conversation == self.conversation and self.turns < self.max_turns
+        if not reuse:
+            self._restart(conversation)
+        llm_sessions.inc(session='reused' if reuse else 'new')
+        self.turns += 1
+        stop = threading.Event()
+        tokens = self.model.generate(prompt, streaming=True,
+                                     callback=lambda token_id, response: not stop.is_set(),
+                                     **dict(GENERATION_DEFAULTS, **params))
+        finished = False
+        try:
+            for token in tokens:
+                yield token
+            finished = True
+        finally:
+            if not finished:
+                # Stop generating; the partial reply stays in the session like a full one
+                stop.set()
+                for _ in tokens:
+                    pass
+            self.last_used = time.monotonic()
+
+    def close(self):
+        self._session.close()
+
+
+class ModelPool:
+    def __init__(self, factory: Callable[[], Any], size: int = 1, max_queue: int = 4,
+                 system_prompt: str = SYSTEM_PROMPT, max_turns: int = 8):
+        self.factory = factory
+        self.size = size
+        self.max_queue = max_queue
+        self.system_prompt = system_prompt
+        self.max_turns = max_turns
+        self.requests = 0
+        self.rejected = 0
+        self.reused = 0
+        self._models: List[LocalModel] = []
+        self._idle: List[LocalModel] = []
+        self._waiting = 0
+        self._avg_duration = 5.0
+        self._avg_first_token: Optional[float] = None
+        self._cond = threading.Condition()
+        self._loading = threading.Lock()
+
+    def warm(self):
+        """Load every instance now instead of on first use"""
+        with self._loading:
+            self._load_missing()
+
+    def _load_missing(self):
+        while len(self._models) < self.size:
+            with tracing.span('llm.load'):
+                model = LocalModel(self.factory(), self.system_prompt, self.max_turns)
+            with self._cond:
+                self._models.append(model)
+                self._idle.append(model)
+                self._cond.notify()
+
+    def warm_in_background(self) -> threading.Thread:
+        thread = threading.Thread(target=self.warm, name='llm-warmup', daemon=True)
+        thread.start()
+        return thread
+
+    def retry_after(self) -> int:
+        with self._cond:
+            return max(1, int(round(self._avg_duration * (self._waiting + 1) / self.size)))
+
+    def _acquire(self, conversation: Optional[str], timeout: Optional[float]) -> LocalModel:
+        # Load on first use, unless a warm-up is already loading; then wait for its instances
+        if len(self._models) < self.size and self._loading.acquire(blocking=False):
+            try:
+                self._load_missing()
+            finally:
+                self._loading.release()
+        with self._cond:
+            if not self._idle and self._waiting >= self.max_queue:
+                self.rejected += 1
+                full = True
+            else:
+                self._waiting += 1
+                full = False
+        if full:
+            raise PoolSaturated('llm', self.retry_after())
+        with self._cond:
+            try:
+                if not self._cond.wait_for(lambda: self._idle, timeout):
+                    raise TimeoutError(f"No local model became free within {timeout}s")
+            finally:
+                self._waiting -= 1
+            # The instance already holding this conversation, else the one idle the longest
+            preferred = [model for model in self._idle if conversation is not None and model.conversation == conversation]
+            model = preferred[0] if preferred else min(self._idle, key=lambda model: model.last_used)
+            self._idle.remove(model)
+            self.requests += 1
+            self.reused += bool(preferred)
+            return model
+
+    def _release(self, model: LocalModel, duration: float):
+        with self._cond:
+            self._avg_duration = 0.8 * self._avg_duration + 0.2 * duration
+            self._idle.append(model)
+            self._cond.notify()
+
+    def stream(self, prompt: str, conversation: Optional[str] = None,
+               timeout: Optional[float] = None, **params) -> "TokenStream":
+        """Tokens of the reply from the next free instance; the instance is held until the
+        stream is exhausted or closed"""
+        started = time.monotonic()
+        model = self._acquire(conversation, timeout)
+        return TokenStream(self, model, model.stream(prompt, conversation, **params), started)
+
+    def _first_token(self, latency: float):
+        first_token_latency.observe(latency)
+        with self._cond:
+            self._avg_first_token = (latency if self._avg_first_token is None
+                                     else 0.8 * self._avg_first_token + 0.2 * latency)
+
+    def generate(self, prompt: str, conversation: Optional[str] = None, **params) -> str:
+        """The whole reply as one string"""
+        with self.stream(prompt, conversation, **params) as tokens:
+            return ''.join(tokens)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            return {
+                'size': self.size,
+                'loaded': len(self._models),
+                'idle': len(self._idle),
+                'waiting': self._waiting,
+                'requests': self.requests,
+                'rejected': self.rejected,
+                'reused_sessions': self.reused,
+                'avg_duration': round(self._avg_duration, 3),
+                'avg_first_token': round(self._avg_first_token, 3) if self._avg_first_token is not None else None,
+            }
+
+    def close(self):
+        with self._cond:
+            for model in self._models:
+                model.close()
+
+
+class TokenStream:
+    """Iterator over a reply's tokens that owns a pooled instance until it is released"""
+
+    def __init__(self, pool: ModelPool, model: LocalModel, tokens: Iterator[str], started: float):
+        self.pool = pool
+        self.model = model
+        self.started = started
+        self.latency: Optional[float] = None
+        self._tokens = tokens
+        self._released = False
+        self._lock = threading.Lock()
+
+    def __iter__(self) -> "TokenStream":
+        return self
+
+    def __next__(self) -> str:
+        if self._released:
+            raise StopIteration
+        try:
+            token = next(self._tokens)
+        except BaseException:
+            # Exhausted or failed: the instance is free again either way
+            self.close()
+            raise
+        if self.latency is None:
+            self.latency = time.monotonic() - self.started
+            self.pool._first_token(self.latency)
+        return token
+
+    def close(self):
+        """Stop generating and return the instance to the pool; safe to call more than once"""
+        with self._lock:
+            if self._released:
+                return
+            self._released = True
+        try:
+            self._tokens.close()
+        finally:
+            self.pool._release(self.model, time.monotonic() - self.started)
+            # Recorded afterwards: a span held open across yields would parent the caller's spans
+            tracing.record('llm.generate', self.started,
+                           first_token=round(self.latency, 4) if self.latency is not None else None)
+
+    def __enter__(self) -> "TokenStream":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __del__(self):
+        # Safety net for a stream that was dropped without being closed
+        self.close()
+
+
+_default_pool: Optional[ModelPool] = None
+_default_lock = threading.Lock()
+
+
+def get_default_llm_pool() -> ModelPool:
+    """Process-wide pool of LLM_POOL_SIZE LLM_MODEL instances with an LLM_QUEUE wait queue"""
+    global _default_pool
+    with _default_lock:
+        if _default_pool is None:
+            _default_pool = ModelPool(
+                gpt4all_factory(os.getenv("LLM_MODEL", DEFAULT_MODEL)),
+                size=int(os.getenv("LLM_POOL_SIZE", "1")),
+                max_queue=int(os.getenv("LLM_QUEUE", "4")),
+                system_prompt=os.getenv("LLM_SYSTEM_PROMPT", SYSTEM_PROMPT),
+                max_turns=int(os.getenv("LLM_MAX_TURNS", "8"))
+            )
+        return _default_pool
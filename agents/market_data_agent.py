@@ -1,116 +1,254 @@
-import yfinance as yf
+import hashlib
+import os
+import threading
+import numpy as np
 import pandas as pd
 from datetime import datetime, timedelta
-from typing import Dict, Any, List, Tuple
+from typing import Dict, Any, List, Optional, Tuple, Union
+
+from analytics import panel
+from analytics.risk import RiskEngine, load_positions
+from data_ingestion.cache import MarketDataCache, cached, get_default_cache
+from data_ingestion.fetcher import MarketDataFetcher, get_default_fetcher
+from data_ingestion.providers import period_for_bars
+from data_ingestion.history_store import HistoryStore, get_default_store
+from data_ingestion.stream import MarketStream, get_default_stream
+from data_ingestion.earnings_index import EarningsIndex, get_default_earnings_index
+from data_ingestion.snapshot import MarketSnapshot, SnapshotStore, get_default_snapshot_store
+from data_ingestion.universes import Universe, get_universe
+from observability.tracing import traced
+
+# Risk engines shared by every agent, keyed by positions file, its mtime and the window
+_risk_engines: Dict[Tuple, RiskEngine] = {}
+_risk_lock = threading.Lock()
 
 class MarketDataAgent:
-    def __init__(self):
-        # List of major Asian tech stocks
-        self.asia_tech_stocks = {
-            '2330.TW': 'TSMC',
-            '005930.KS': 'Samsung',
-            '9984.T': 'SoftBank',
-            '0700.HK': 'Tencent',
-            '9988.HK': 'Alibaba',
-            '3690.HK': 'Meituan',
-            '035420.KS': 'NAVER',
-            '035720.KS': 'Kakao'
-        }
+    def __init__(self, fetcher: Optional[MarketDataFetcher] = None,
+                 cache: Optional[MarketDataCache] = None, use_cache: bool = True,
+                 history_store: Optional[HistoryStore] = None,
+                 universe: Optional[Union[str, Universe]] = None,
+                 positions_file: Optional[str] = None,
+                 stream: Optional[MarketStream] = None,
+                 earnings_index: Optional[EarningsIndex] = None,
+                 snapshot_store: Optional[SnapshotStore] = None):
+        self.fetcher = fetcher or get_default_fetcher()
+        self.cache = (cache or get_default_cache()) if use_cache else None
+        self.history_store = history_store or get_default_store()
+        # Streamed bars, when a feed is configured; polled history otherwise
+        self.stream = stream if stream is not None else get_default_stream()
+        self.earnings_index = earnings_index or get_default_earnings_index()
+        # Snapshots shared with the other worker processes on this host, when SNAPSHOT_DIR is set
+        self.snapshot_store = snapshot_store or get_default_snapshot_store()
+        self.sentiment_lookback = 5
+        
+        # Stocks, regional indices and rates covered by this agent
+        if not isinstance(universe, Universe):
+            universe = get_universe(universe)
+        self.universe = universe
+        self.stocks = dict(universe.stocks)
+        self.indices = dict(universe.indices)
+        self.treasury_symbol = universe.treasury_symbol
+        
+        # Our actual book, as a CSV of symbol,quantity[,name][,fx] rows
+        self.positions_file = positions_file or os.getenv("PORTFOLIO_FILE") or None
+        self.risk_window = int(os.getenv("RISK_WINDOW", "250"))
+        
+    def cache_key(self) -> Tuple:
+        """Identify the universe so agents with different symbols never share entries"""
+        return (tuple(self.stocks.items()), tuple(self.indices.items()), self.treasury_symbol,
+                self.positions_file)
+        
+    def get_history(self, symbols: List[str], lookback: int) -> Dict[str, pd.DataFrame]:
+        """Last `lookback` daily bars per symbol, from the local store when available"""
+        if self.history_store is None:
+            history = self.fetcher.fetch_history(symbols, period=period_for_bars(lookback))
+            for symbol, error in history.errors.items():
+                print(f"Error fetching history for {symbol}: {error}")
+            return {symbol: frame.tail(lookback) for symbol, frame in history.data.items()}
         
+        # Only bars newer than what is on disk are requested from the provider
+        refreshed = self.history_store.refresh(symbols, self.fetcher)
+        for symbol, error in refreshed.errors.items():
+            print(f"Error refreshing history for {symbol}: {error}")
+        return {symbol: self.history_store.frame(symbol, lookback=lookback) for symbol in symbols}
+        
+    def get_snapshot(self) -> Dict[str, Any]:
+        """All datasets the crew tools expose, as one snapshot"""
+        return self.get_market_snapshot().to_dict()
+    
+    @traced('market_data.snapshot')
+    def get_market_snapshot(self, refresh: bool = False) -> MarketSnapshot:
+        """The snapshot in its compact form, read from the shared store while it is fresh;
+        `refresh` rebuilds it unless another worker just did"""
+        if self.snapshot_store is None:
+            return self._build_snapshot()
+        key = f"{self.universe.name}-{hashlib.sha256(repr(self.cache_key()).encode()).hexdigest()[:12]}"
+        max_age = self.cache.ttl_for('history') if self.cache is not None else None
+        return self.snapshot_store.get_or_build(key, self._build_snapshot, max_age, refresh=refresh)
+    
+    def _build_snapshot(self) -> MarketSnapshot:
+        total_exposure, exposure = self.get_portfolio_exposure()
+        return MarketSnapshot.from_dict({
+            'universe': self.universe.name,
+            'total_exposure': total_exposure,
+            'exposure': exposure,
+            'surprises': self.get_earnings_surprises(),
+            'sentiment': self.get_market_sentiment()
+        })
+        
+    @staticmethod
+    def snapshot_id(snapshot: Union[MarketSnapshot, Dict[str, Any]]) -> str:
+        """Content hash identifying a snapshot"""
+        if not isinstance(snapshot, MarketSnapshot):
+            snapshot = MarketSnapshot.from_dict(snapshot)
+        return snapshot.id
+        
+    @traced('market_data.portfolio_exposure')
+    @cached('info', cacheable=lambda result: bool(result[1]))
     def get_portfolio_exposure(self) -> Tuple[float, Dict[str, float]]:
         """Calculate portfolio exposure to Asian tech stocks"""
-        total_market_cap = 0
-        market_caps = {}
+        infos = self.fetcher.fetch_info(list(self.stocks))
+        for symbol, error in infos.errors.items():
+            print(f"Error fetching data for {self.stocks[symbol]}: {error}")
         
-        for symbol, name in self.asia_tech_stocks.items():
-            try:
-                stock = yf.Ticker(symbol)
-                info = stock.info
-                market_cap = info.get('marketCap', 0)
-                if market_cap:
-                    market_caps[name] = market_cap
-                    total_market_cap += market_cap
-            except Exception as e:
-                print(f"Error fetching data for {name}: {str(e)}")
-                
-        # Calculate percentages
-        exposure = {name: (cap / total_market_cap) * 100 
-                   for name, cap in market_caps.items()}
+        market_caps = pd.Series({self.stocks[symbol]: (info or {}).get('marketCap')
+                                 for symbol, info in infos.data.items()}, dtype='float64')
+        weights = panel.exposure_weights(market_caps)
         
-        return sum(exposure.values()), exposure
+        # Keep the configured universe order
+        exposure = {name: float(weights[name]) for name in self.stocks.values()
+                    if name in weights.index}
+        return float(weights.sum()), exposure
 
+    @traced('market_data.earnings_surprises')
+    @cached('earnings')
     def get_earnings_surprises(self) -> Dict[str, float]:
         """Get earnings surprises for Asian tech stocks"""
-        surprises = {}
+        # Only symbols new to the index or near an announcement are fetched
+        refreshed = self.earnings_index.refresh(list(self.stocks), self.fetcher)
+        for symbol, error in refreshed.errors.items():
+            print(f"Error fetching earnings for {self.stocks[symbol]}: {error}")
         
-        for symbol, name in self.asia_tech_stocks.items():
-            try:
-                stock = yf.Ticker(symbol)
-                earnings = stock.earnings_dates
-                
-                if not earnings.empty:
-                    # Get most recent earnings
-                    latest = earnings.iloc[0]
-                    if 'Surprise(%)' in latest:
-                        surprises[name] = latest['Surprise(%)']
-            except Exception as e:
-                print(f"Error fetching earnings for {name}: {str(e)}")
-                
-        return surprises
+        # Most recent reported announcement, skipping scheduled ones without results yet
+        latest = self.earnings_index.latest(self.stocks)
+        return {name: latest[symbol].surprise for symbol, name in self.stocks.items() if symbol in latest}
+    
+    @traced('market_data.earnings_calendar')
+    def get_earnings_calendar(self, days_back: int = 30, days_ahead: int = 7) -> Dict[str, Any]:
+        """Earnings reported in the last `days_back` days and scheduled in the next `days_ahead`"""
+        refreshed = self.earnings_index.refresh(list(self.stocks), self.fetcher)
+        for symbol, error in refreshed.errors.items():
+            print(f"Error fetching earnings for {self.stocks[symbol]}: {error}")
+        
+        def entries(events):
+            return [dict(event.to_dict(), name=self.stocks[event.symbol]) for event in events]
+        return {
+            'recent': entries(self.earnings_index.recent(days_back, self.stocks)),
+            'upcoming': entries(self.earnings_index.upcoming(days_ahead, self.stocks)),
+        }
 
+    @traced('market_data.market_sentiment')
     def get_market_sentiment(self) -> Dict[str, Any]:
         """Analyze market sentiment for Asian tech sector"""
+        if self.stream is not None:
+            symbols = list(self.indices) + ([self.treasury_symbol] if self.treasury_symbol else [])
+            missing = self.stream.unseeded(symbols)
+            if missing:
+                # Backfill once from history; the feed keeps the buffers current from then on
+                self.stream.seed(self.get_history(missing, self.stream.capacity))
+            live = self.stream.sentiment(self.indices, self.treasury_symbol, self.sentiment_lookback)
+            if live is not None:
+                return live
+        return self._polled_market_sentiment()
+
+    @cached('history', cacheable=lambda result: bool(result['factors']) and 'error' not in result)
+    def _polled_market_sentiment(self) -> Dict[str, Any]:
         sentiment_data = {
             'overall': 'neutral',
             'factors': []
         }
         
         try:
-            # Get regional index data
-            indices = {
-                '^HSI': 'Hang Seng Tech',
-                '^AXJO': 'ASX 200',
-                '^N225': 'Nikkei 225'
-            }
+            # One history read for all indices and the yield
+            symbols = list(self.indices) + ([self.treasury_symbol] if self.treasury_symbol else [])
+            closes = panel.build_panel(self.get_history(symbols, self.sentiment_lookback))
+            if closes.empty:
+                raise ValueError("No index history available")
             
-            for symbol, name in indices.items():
-                index = yf.Ticker(symbol)
-                hist = index.history(period='5d')
-                
-                if not hist.empty:
-                    change = ((hist['Close'][-1] - hist['Close'][0]) / hist['Close'][0]) * 100
+            index_changes = panel.period_change(closes.reindex(columns=list(self.indices)))
+            for symbol, name in self.indices.items():
+                change = index_changes[symbol]
+                if not np.isnan(change):
                     sentiment_data['factors'].append({
                         'index': name,
-                        'change': change,
+                        'change': float(change),
                         'trend': 'up' if change > 0 else 'down'
                     })
             
-            # Get yield data
-            treasury = yf.Ticker('^TNX')
-            hist = treasury.history(period='5d')
-            if not hist.empty:
-                yield_change = hist['Close'][-1] - hist['Close'][0]
-                sentiment_data['factors'].append({
-                    'factor': 'US 10Y Yield',
-                    'change': yield_change,
-                    'impact': 'cautionary' if yield_change > 0 else 'supportive'
-                })
-                
-            # Determine overall sentiment
-            positive_factors = sum(1 for f in sentiment_data['factors'] 
-                                if f.get('trend') == 'up' or f.get('impact') == 'supportive')
-            total_factors = len(sentiment_data['factors'])
+            # Yield change is measured in points, not percent
+            yield_change = None
+            if self.treasury_symbol and self.treasury_symbol in closes:
+                yield_change = panel.period_change(closes[[self.treasury_symbol]], relative=False).iloc[0]
+                if not np.isnan(yield_change):
+                    sentiment_data['factors'].append({
+                        'factor': 'US 10Y Yield',
+                        'change': float(yield_change),
+                        'impact': 'cautionary' if yield_change > 0 else 'supportive'
+                    })
             
-            if positive_factors / total_factors > 0.6:
-                sentiment_data['overall'] = 'positive'
-            elif positive_factors / total_factors < 0.4:
-                sentiment_data['overall'] = 'negative'
-            else:
-                sentiment_data['overall'] = 'neutral'
+            if not sentiment_data['factors']:
+                raise ValueError("No sentiment factors available")
+            sentiment_data['overall'], _ = panel.sentiment_score(index_changes, yield_change)
                 
         except Exception as e:
             print(f"Error analyzing market sentiment: {str(e)}")
             sentiment_data['overall'] = 'neutral'
             sentiment_data['error'] = str(e)
             
-        return sentiment_data 
\ No newline at end of file
+        return sentiment_data
+
+    @traced('market_data.sector_breadth')
+    @cached('history', cacheable=lambda result: bool(result['returns']))
+    def get_sector_breadth(self, windows: Tuple[int, ...] = (1, 5, 21)) -> Dict[str, Any]:
+        """Multi-window returns and advance/decline breadth across the stock universe"""
+        history = self.get_history(list(self.stocks), max(windows) + 1)
+        closes = panel.build_panel(history).rename(columns=self.stocks)
+        if closes.empty:
+            return {'returns': {}, 'breadth': {}}
+        
+        returns = panel.window_returns(closes, windows)
+        return {
+            'returns': returns.round(4).to_dict(orient='index'),
+            'breadth': panel.breadth(returns).to_dict(orient='index')
+        }
+
+    def risk_engine(self) -> RiskEngine:
+        """The shared engine for our positions, brought up to date with the latest bars"""
+        key = (os.path.abspath(self.positions_file), os.path.getmtime(self.positions_file), self.risk_window)
+        with _risk_lock:
+            engine = _risk_engines.get(key)
+            if engine is None:
+                # Positions changed (or first use): drop engines for older versions of the file
+                for stale in [k for k in _risk_engines if k[0] == key[0]]:
+                    del _risk_engines[stale]
+                engine = RiskEngine(load_positions(self.positions_file), window=self.risk_window)
+                _risk_engines[key] = engine
+            
+            # A new engine loads the whole window once; afterwards only the latest bars are read
+            lookback = self.risk_window + 1 if engine.last_timestamp is None else 5
+            closes = panel.build_panel(self.get_history(engine.symbols, lookback))
+            if not closes.empty:
+                engine.update(closes)
+        return engine
+
+    @traced('market_data.portfolio_risk')
+    @cached('history', cacheable=lambda result: 'error' not in result)
+    def get_portfolio_risk(self) -> Dict[str, Any]:
+        """Value at risk, exposure, risk contributions and concentration of our positions"""
+        if not self.positions_file:
+            return {'error': 'No positions configured; set PORTFOLIO_FILE'}
+        try:
+            return self.risk_engine().summary(top=10)
+        except Exception as e:
+            print(f"Error computing portfolio risk: {str(e)}")
+            return {'error': str(e)}
@@ -0,0 +1,3 @@
+"""
+Analytics package for vectorized computations over market data panels.
+"""
@@ -0,0 +1,100 @@
+"""
+Vectorized analytics over wide market data panels.
+
+A panel is a DataFrame indexed by date with one column per symbol. Every
+function works on the whole panel at once with NumPy/pandas operations, so
+the cost grows with the size of the arrays rather than with per-symbol Python
+loops, and whole regional sectors can be analysed as cheaply as eight names.
+"""
+from typing import Dict, Iterable, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+POSITIVE_THRESHOLD = 0.6
+NEGATIVE_THRESHOLD = 0.4
+
+
+def build_panel(history: Dict[str, pd.DataFrame], field: str = 'Close') -> pd.DataFrame:
+    """Align one field of per-symbol OHLCV frames into a dates x symbols panel"""
+    columns = {symbol: frame[field] for symbol, frame in history.items()
+               if frame is not None and field in frame and not frame.empty}
+    if not columns:
+        return pd.DataFrame()
+    panel = pd.concat(columns, axis=1, sort=True)
+    # Exchanges close on different holidays; compare bars by trading day
+    panel.index = pd.DatetimeIndex(panel.index).normalize()
+    return panel.groupby(level=0).last()
+
+
+def exposure_weights(market_caps: pd.Series) -> pd.Series:
+    """Market-cap weights in percent, ignoring missing or zero caps"""
+    caps = pd.to_numeric(market_caps, errors='coerce')
+    caps = caps[caps > 0]
+    total = caps.sum()
+    if not total:
+        return pd.Series(dtype='float64')
+    return caps / total * 100
+
+
+def period_change(prices: pd.DataFrame, relative: bool = True) -> pd.Series:
+    """Change from the first to the last valid observation of every column"""
+    values = prices.to_numpy(dtype='float64')
+    if not len(values):
+        return pd.Series(np.nan, index=prices.columns)
+    valid = ~np.isnan(values)
+    has_data = valid.any(axis=0)
+    first = values[valid.argmax(axis=0), np.arange(values.shape[1])]
+    last = values[len(values) - 1 - valid[::-1].argmax(axis=0), np.arange(values.shape[1])]
+    change = (last - first) / first * 100 if relative else last - first
+    return pd.Series(np.where(has_data, change, np.nan), index=prices.columns)
+
+
+def window_returns(prices: pd.DataFrame, windows: Iterable[int] = (1, 5, 21)) -> pd.DataFrame:
+    """Percent returns over the last `w` bars for each window, symbols x windows"""
+    filled = prices.ffill().to_numpy(dtype='float64')
+    last = filled[-1] if len(filled) else np.full(prices.shape[1], np.nan)
+    returns = {}
+    for window in windows:
+        if window < len(filled):
+            returns[window] = (last / filled[-window - 1] - 1) * 100
+        else:
+            returns[window] = np.full(prices.shape[1], np.nan)
+    return pd.DataFrame(returns, index=prices.columns)
+
+
+def breadth(returns: pd.DataFrame) -> pd.DataFrame:
+    """Advancers, decliners and advance ratio per return window"""
+    values = returns.to_numpy(dtype='float64')
+    advancers = (values > 0).sum(axis=0)
+    decliners = (values < 0).sum(axis=0)
+    counted = (~np.isnan(values)).sum(axis=0)
+    ratio = np.divide(advancers, counted, out=np.full(len(advancers), np.nan), where=counted > 0)
+    return pd.DataFrame({
+        'advancers': advancers,
+        'decliners': decliners,
+        'advance_ratio': ratio,
+    }, index=returns.columns)
+
+
+def classify_sentiment(positive_ratio: float) -> str:
+    if positive_ratio > POSITIVE_THRESHOLD:
+        return 'positive'
+    if positive_ratio < NEGATIVE_THRESHOLD:
+        return 'negative'
+    return 'neutral'
+
+
+def sentiment_score(index_changes: pd.Series,
+                    yield_change: Optional[float] = None) -> Tuple[str, float]:
+    """Overall sentiment from index trends (up is positive) and yields (falling is supportive)"""
+    changes = index_changes.dropna().to_numpy(dtype='float64')
+    positive = int((changes > 0).sum())
+    total = len(changes)
+    if yield_change is not None and not np.isnan(yield_change):
+        positive += int(yield_change <= 0)
+        total += 1
+    if not total:
+        return 'neutral', float('nan')
+    ratio = positive / total
+    return classify_sentiment(ratio), ratio
@@ -0,0 +1,248 @@
+"""
+Incremental risk for a book of real positions.
+
+``load_positions`` reads holdings from a CSV file with
+``symbol,quantity[,name][,fx]`` rows. ``fx`` converts the symbol's quote
+currency into the book currency and defaults to 1. ``RiskEngine`` keeps the
+last ``window`` daily returns of every held symbol in a ring buffer, together
+with running sums:
+
+- the column sums of the returns;
+- the book's return on every bar, under the current value weights;
+- the cross products of each symbol's returns with the book's returns.
+
+A new bar then adds one row to these sums and evicts the oldest, which costs
+O(n) per bar, or O(k·n) for k bars, all as NumPy array operations. Reading
+exposure, volatility, parametric and historical VaR, expected shortfall,
+each position's contribution to risk, and concentration costs O(n + T). Only
+the full covariance matrix (``covariance``) and re-basing the weights after
+the position values drift (``rebase``) cost a pass over the whole window.
+"""
+import csv
+import math
+from statistics import NormalDist
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_WINDOW = 250
+DEFAULT_CONFIDENCE = 0.99
+# Weights are re-based once the value weights drift this far (L1) from the ones in the sums
+DEFAULT_DRIFT_TOLERANCE = 0.05
+
+
+def load_positions(path: str) -> pd.DataFrame:
+    """Positions indexed by symbol with quantity, name and fx columns"""
+    rows = []
+    with open(path, newline='') as handle:
+        for row in csv.DictReader(handle):
+            symbol = (row.get('symbol') or '').strip()
+            if not symbol:
+                continue
+            rows.append({
+                'symbol': symbol,
+                'quantity': float(row['quantity']),
+                'name': (row.get('name') or symbol).strip(),
+                'fx': float(row.get('fx') or 1.0),
+            })
+    if not rows:
+        raise ValueError(f"No positions found in {path}")
+    positions = pd.DataFrame(rows).groupby('symbol', sort=False).agg(
+        {'quantity': 'sum', 'name': 'first', 'fx': 'first'})
+    return positions[positions['quantity'] != 0]
+
+
+class RiskEngine:
+    def __init__(self, positions: pd.DataFrame, window: int = DEFAULT_WINDOW,
+                 confidence: float = DEFAULT_CONFIDENCE,
+                 drift_tolerance: float = DEFAULT_DRIFT_TOLERANCE):
+        self.symbols = list(positions.index)
+        self.names = positions['name'].tolist() if 'name' in positions else list(self.symbols)
+        fx = positions['fx'] if 'fx' in positions else 1.0
+        # Book-currency value per unit of quote price
+        self.units = (positions['quantity'] * fx).to_numpy(dtype='float64')
+        self.window = window
+        self.confidence = confidence
+        self.drift_tolerance = drift_tolerance
+
+        n = len(self.symbols)
+        self.returns = np.zeros((window, n))
+        self.book_returns = np.zeros(window)
+        self.count = 0
+        self.head = 0
+        self.last_prices = np.full(n, np.nan)
+        self.last_timestamp: Optional[pd.Timestamp] = None
+        self.weights = np.zeros(n)
+        self._sum = np.zeros(n)
+        self._book_sum = 0.0
+        self._book_sq = 0.0
+        self._cross = np.zeros(n)
+
+    def _prices(self, prices: pd.DataFrame) -> np.ndarray:
+        return prices.reindex(columns=self.symbols).to_numpy(dtype='float64')
+
+    def _bar_returns(self, closes: np.ndarray) -> np.ndarray:
+        """Simple returns of consecutive rows; a missing price is carried forward (zero return)"""
+        filled = pd.DataFrame(np.vstack([self.last_prices, closes])).ffill().to_numpy()
+        self.last_prices = np.where(np.isnan(filled[-1]), self.last_prices, filled[-1])
+        with np.errstate(invalid='ignore', divide='ignore'):
+            returns = filled[1:] / filled[:-1] - 1
+        return np.nan_to_num(returns, nan=0.0, posinf=0.0, neginf=0.0)
+
+    def values(self) -> np.ndarray:
+        """Position values in the book currency at the last prices"""
+        return np.nan_to_num(self.units * self.last_prices)
+
+    def _value_weights(self) -> np.ndarray:
+        values = self.values()
+        gross = np.abs(values).sum()
+        return values / gross if gross else np.zeros_like(values)
+
+    def load(self, prices: pd.DataFrame):
+        """Start over from a dates x symbols price panel"""
+        self.count = self.head = 0
+        self.last_prices = np.full(len(self.symbols), np.nan)
+        closes = self._prices(prices)
+        if len(closes):
+            self.last_prices = closes[0].copy()
+            returns = self._bar_returns(closes[1:])[-self.window:]
+            self.count = len(returns)
+            self.returns[:self.count] = returns
+            self.head = self.count % self.window
+            self.last_timestamp = pd.Timestamp(prices.index[-1])
+        self.rebase()
+
+    def rebase(self):
+        """Recompute the running sums under the current value weights, O(n·T)"""
+        self.weights = self._value_weights()
+        returns = self.returns[:self.count]
+        self.book_returns[:self.count] = returns @ self.weights
+        book = self.book_returns[:self.count]
+        self._sum = returns.sum(axis=0)
+        self._book_sum = float(book.sum())
+        self._book_sq = float(book @ book)
+        self._cross = returns.T @ book
+
+    def update(self, prices: pd.DataFrame):
+        """Add new bars (dates x symbols) to the window, O(k·n) for k bars"""
+        if self.last_timestamp is not None:
+            prices = prices[pd.DatetimeIndex(prices.index) > self.last_timestamp]
+        if prices.empty:
+            return
+        if self.last_timestamp is None:
+            return self.load(prices)
+        if len(prices) >= self.window:
+            # Nothing of the old window would survive
+            return self._replace(prices)
+
+        new = self._bar_returns(self._prices(prices))
+        book = new @ self.weights
+        k = len(new)
+        slots = (self.head + np.arange(k)) % self.window
+        # Until the window is full the data sits in [0, count); only slots holding data are evicted
+        evicted = slots if self.count == self.window else slots[slots < self.count]
+        old, old_book = self.returns[evicted], self.book_returns[evicted]
+
+        self._sum += new.sum(axis=0) - old.sum(axis=0)
+        self._book_sum += float(book.sum() - old_book.sum())
+        self._book_sq += float(book @ book - old_book @ old_book)
+        self._cross += new.T @ book - old.T @ old_book
+        self.returns[slots] = new
+        self.book_returns[slots] = book
+        self.head = int((self.head + k) % self.window)
+        self.count = min(self.window, self.count + k)
+        self.last_timestamp = pd.Timestamp(prices.index[-1])
+
+        if np.abs(self._value_weights() - self.weights).sum() > self.drift_tolerance:
+            self.rebase()
+
+    def _replace(self, prices: pd.DataFrame):
+        """A batch longer than the window replaces it, continuing from the last prices"""
+        returns = self._bar_returns(self._prices(prices))[-self.window:]
+        self.count = len(returns)
+        self.returns[:self.count] = returns
+        self.head = self.count % self.window
+        self.last_timestamp = pd.Timestamp(prices.index[-1])
+        self.rebase()
+
+    def mark(self, prices: Dict[str, float]):
+        """Revalue positions at intraday prices without adding a bar, O(n)"""
+        marks = pd.Series(prices, dtype='float64').reindex(self.symbols).to_numpy()
+        self.last_prices = np.where(np.isnan(marks), self.last_prices, marks)
+
+    def covariance(self) -> pd.DataFrame:
+        """Full sample covariance of daily returns, O(n²·T); not needed for the risk summary"""
+        if self.count < 2:
+            return pd.DataFrame(np.nan, index=self.names, columns=self.names)
+        centered = self.returns[:self.count] - self._sum / self.count
+        return pd.DataFrame(centered.T @ centered / (self.count - 1), index=self.names, columns=self.names)
+
+    def summary(self, top: Optional[int] = None) -> Dict[str, Any]:
+        """Exposure, VaR, risk contributions and concentration of the book;
+        per-position figures for the `top` largest positions only, if given"""
+        values = self.values()
+        gross = float(np.abs(values).sum())
+        net = float(values.sum())
+        weights = values / gross if gross else np.zeros_like(values)
+        shown = np.argsort(-np.abs(weights), kind='stable')[:top] if top else np.arange(len(weights))
+        result = {
+            'positions': len(self.symbols),
+            'observations': self.count,
+            'as_of': self.last_timestamp.isoformat() if self.last_timestamp is not None else None,
+            'gross_exposure': gross,
+            'net_exposure': net,
+            'exposure': {self.names[i]: float(weights[i] * 100) for i in shown},
+            'concentration': concentration(weights),
+        }
+        if self.count < 2 or not gross:
+            return result
+
+        t = self.count
+        mean = self._book_sum / t
+        variance = max((self._book_sq - t * mean * mean) / (t - 1), 0.0)
+        volatility = math.sqrt(variance)
+        z = NormalDist().inv_cdf(self.confidence)
+        # Value is scaled from the weights in the sums to today's gross value
+        parametric = max(z * volatility - mean, 0.0) * gross
+        historical, shortfall = historical_var(self.book_returns[:t], self.confidence)
+
+        # w_i·cov(r_i, book) / var(book) is each position's share of the book's variance
+        asset_cov = (self._cross - self._sum * mean) / (t - 1)
+        shares = self.weights * asset_cov / variance if variance else np.zeros_like(asset_cov)
+        result.update({
+            'daily_volatility': volatility * 100,
+            'confidence': self.confidence,
+            'parametric_var': parametric,
+            'historical_var': historical * gross,
+            'expected_shortfall': shortfall * gross,
+            'risk_contribution': {self.names[i]: float(shares[i] * 100) for i in shown},
+        })
+        return result
+
+
+def historical_var(book_returns: np.ndarray, confidence: float) -> Tuple[float, float]:
+    """(VaR, expected shortfall) as positive fractions of value, O(T)"""
+    losses = -np.asarray(book_returns, dtype='float64')
+    if not len(losses):
+        return float('nan'), float('nan')
+    rank = min(len(losses) - 1, int(math.ceil(confidence * len(losses))) - 1)
+    var = float(np.partition(losses, rank)[rank])
+    tail = losses[losses >= var]
+    return max(var, 0.0), max(float(tail.mean()), 0.0)
+
+
+def concentration(weights: np.ndarray) -> Dict[str, float]:
+    """Herfindahl index, effective number of positions and top-position shares"""
+    shares = np.sort(np.abs(np.asarray(weights, dtype='float64')))[::-1]
+    total = shares.sum()
+    if not total:
+        return {'herfindahl': float('nan'), 'effective_positions': 0.0, 'largest': 0.0, 'top5': 0.0}
+    shares = shares / total
+    hhi = float(shares @ shares)
+    return {
+        'herfindahl': hhi,
+        'effective_positions': 1 / hhi,
+        'largest': float(shares[0] * 100),
+        'top5': float(shares[:5].sum() * 100),
+    }
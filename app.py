@@ -1,36 +1,28 @@
 import streamlit as st
 import speech_recognition as sr
-import sounddevice as sd
 import numpy as np
-from gpt4all import GPT4All
 from dotenv import load_dotenv
-import os
-import time
-import subprocess
-import threading
+from voice.streaming import record_utterance
+from voice.tts import SentenceStream, get_default_tts
+from agents.local_llm import get_default_llm_pool
+from orchestrator.executors import PoolSaturated
+import uuid
 
 # Load environment variables
 load_dotenv()
 
 def speak_text(text, rate=175):
-    """Speak the given text using macOS say command"""
+    """Start speaking the given text in the background, sentence by sentence"""
     try:
-        # Make sure we have a string
-        if not isinstance(text, str):
+        # Make sure we have a string or a stream of sentences
+        if not isinstance(text, (str, SentenceStream)):
             text = str(text)
             
         # Adjust the rate (words per minute)
         rate = int(rate * 1.5)  # Convert slider value to appropriate rate
         
-        # Create and start the speech process
-        process = subprocess.Popen(['say', '-r', str(rate), text])
-        
-        # Wait for the speech to complete with a timeout
-        try:
-            process.wait(timeout=30)
-        except subprocess.TimeoutExpired:
-            process.kill()
-            st.warning("Speech synthesis took too long and was interrupted")
+        # Returns as soon as playback starts; a new response interrupts the previous one
+        return get_default_tts().speak(text, rate)
             
     except Exception as e:
         st.error(f"Error in text-to-speech: {str(e)}")
@@ -39,9 +31,10 @@ def speak_text(text, rate=175):
 @st.cache_resource
 def init_llm():
     try:
-        # Initialize GPT4All with a smaller model
-        model = GPT4All("orca-mini-3b-gguf2-q4_0")
-        return model
+        # Pool of warm GPT4All instances shared by every session (LLM_POOL_SIZE, LLM_MODEL)
+        pool = get_default_llm_pool()
+        pool.warm()
+        return pool
     except Exception as e:
         st.error(f"Error initializing model: {str(e)}")
         return None
@@ -49,13 +42,11 @@ def init_llm():
 # Initialize speech recognizer
 recognizer = sr.Recognizer()
 
-def record_audio(duration=5):
-    """Record audio from microphone for specified duration"""
-    sample_rate = 44100
-    recording = sd.rec(int(duration * sample_rate),
-                      samplerate=sample_rate, channels=1, dtype='float64')
-    st.info(f"Recording for {duration} seconds...")
-    sd.wait()
+def record_audio(duration=15):
+    """Record from the microphone until the speaker stops, up to `duration` seconds"""
+    sample_rate = 16000
+    st.info("Listening... recording stops when you stop talking")
+    recording = record_utterance(max_duration=duration, sample_rate=sample_rate)
     return recording, sample_rate
 
 def audio_to_text(audio_data, sample_rate):
@@ -72,23 +63,38 @@ def audio_to_text(audio_data, sample_rate):
         st.error(f"Error in speech recognition: {str(e)}")
         return None
 
-def get_ai_response(llm, prompt):
-    """Get response from GPT4All model"""
+def get_ai_response(llm, prompt, voice_enabled=False, voice_speed=175):
+    """Stream the response from GPT4All into the page, speaking each sentence as it completes"""
+    # Follow-up questions in this browser session reuse the model's open chat session
+    conversation = st.session_state.setdefault("conversation_id", uuid.uuid4().hex)
+    sentences = SentenceStream() if voice_enabled else None
+    if sentences is not None:
+        speak_text(sentences, voice_speed)
+
+    stream = None
+
+    def tokens():
+        for token in stream:
+            if sentences is not None:
+                sentences.feed(token)
+            yield token
+
     try:
-        # Get response from model with streaming disabled
-        response = llm.generate(
-            prompt,
-            max_tokens=512,
-            temp=0.7,
-            top_p=0.95,
-            repeat_penalty=1.1,
-            top_k=40,
-            streaming=False  # Disable streaming to get direct string response
-        )
-        return response
+        stream = llm.stream(prompt, conversation)
+        st.success("AI Response:")
+        return st.write_stream(tokens())
+    except PoolSaturated as e:
+        st.warning(f"The assistant is busy with other requests, please retry in {e.retry_after}s")
+        return None
     except Exception as e:
         st.error(f"Error with GPT4All model: {str(e)}")
         return None
+    finally:
+        # Hand the model back to the pool even if rendering stopped early
+        if stream is not None:
+            stream.close()
+        if sentences is not None:
+            sentences.close()
 
 def main():
     st.title("🎙️ Voice & Text AI Assistant (Offline)")
@@ -121,44 +127,27 @@ def main():
         st.subheader("Voice Input")
         col1, col2 = st.columns([1, 3])
         with col1:
-            duration = st.number_input("Recording duration (seconds)", min_value=1, max_value=10, value=5)
+            duration = st.number_input("Maximum recording (seconds)", min_value=1, max_value=30, value=15)
         if st.button("🎤 Start Recording"):
             with st.spinner("Recording..."):
                 audio_data, sample_rate = record_audio(duration)
                 st.success("Recording completed!")
                 
                 # Convert speech to text
-                text = audio_to_text(audio_data, sample_rate)
+                text = audio_to_text(audio_data, sample_rate) if len(audio_data) else None
                 if text:
                     st.info("You said: " + text)
                     
-                    # Get AI response
-                    with st.spinner("Getting AI response..."):
-                        response = get_ai_response(llm, text)
-                        if response:
-                            st.success("AI Response:")
-                            st.write(response)
-                            
-                            # Speak the response if voice is enabled
-                            if voice_enabled:
-                                with st.spinner("Speaking response..."):
-                                    speak_text(response, voice_speed)
+                    # Get AI response; tokens appear (and are spoken) as the model generates them
+                    get_ai_response(llm, text, voice_enabled, voice_speed)
 
     with tab2:
         st.subheader("Text Input")
         user_input = st.text_area("Enter your message:", height=100)
         if st.button("Send"):
             if user_input:
-                with st.spinner("Getting AI response..."):
-                    response = get_ai_response(llm, user_input)
-                    if response:
-                        st.success("AI Response:")
-                        st.write(response)
-                        
-                        # Speak the response if voice is enabled
-                        if voice_enabled:
-                            with st.spinner("Speaking response..."):
-                                speak_text(response, voice_speed)
+                # Tokens appear (and are spoken) as the model generates them
+                get_ai_response(llm, user_input, voice_enabled, voice_speed)
             else:
                 st.warning("Please enter some text!")
 
@@ -0,0 +1,4 @@
+"""
+Offline benchmarks: market data, the crew and the API run against local
+stand-ins for Yahoo Finance, the LLM and Whisper. See ``benchmarks.run``.
+"""
@@ -0,0 +1,83 @@
+"""
+Compare two benchmark result files and fail on regressions::
+
+    python -m benchmarks.compare baseline.json candidate.json --threshold 0.15
+
+A scenario regresses when its p95 latency grows, or its throughput drops, by
+more than the threshold (a fraction), or when it starts returning errors.
+Latency differences below ``--min-delta`` seconds are treated as noise.
+Exits with status 1 if any scenario regressed.
+"""
+import argparse
+import json
+import sys
+from typing import Any, Dict, List, Optional
+
+
+def load(path: str) -> Dict[str, Any]:
+    with open(path) as f:
+        return json.load(f)
+
+
+def change(before: float, after: float) -> float:
+    return (after - before) / before if before else 0.0
+
+
+def compare(baseline: Dict[str, Any], candidate: Dict[str, Any],
+            threshold: float = 0.1, min_delta: float = 0.001) -> List[Dict[str, Any]]:
+    """One row per scenario present in both files"""
+    rows = []
+    for name, before in sorted(baseline['results'].items()):
+        after = candidate['results'].get(name)
+        if after is None or 'p95' not in before or 'p95' not in after:
+            continue
+        p95_change = change(before['p95'], after['p95'])
+        throughput_change = change(before['throughput'], after['throughput'])
+        significant = abs(after['p95'] - before['p95']) >= min_delta
+        reasons = []
+        if significant and p95_change > threshold:
+            reasons.append(f"p95 +{p95_change:.0%}")
+        if significant and throughput_change < -threshold:
+            reasons.append(f"throughput {throughput_change:.0%}")
+        if after['errors'] > before['errors']:
+            reasons.append(f"errors {before['errors']} -> {after['errors']}")
+        rows.append({
+            'scenario': name,
+            'p95_before': before['p95'],
+            'p95_after': after['p95'],
+            'p95_change': p95_change,
+            'throughput_change': throughput_change,
+            'regressions': reasons,
+        })
+    return rows
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Compare two benchmark result files")
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument("--threshold", type=float, default=0.1,
+                        help="allowed relative change before flagging a regression")
+    parser.add_argument("--min-delta", type=float, default=0.001,
+                        help="ignore p95 differences smaller than this many seconds")
+    args = parser.parse_args(argv)
+
+    baseline, candidate = load(args.baseline), load(args.candidate)
+    rows = compare(baseline, candidate, args.threshold, args.min_delta)
+    print(f"baseline  {baseline['meta'].get('commit')}")
+    print(f"candidate {candidate['meta'].get('commit')}")
+    print(f"{'scenario':<45} {'p95 before':>11} {'p95 after':>11} {'p95':>7} {'tput':>7}")
+    for row in rows:
+        flag = "  REGRESSION: " + ", ".join(row['regressions']) if row['regressions'] else ""
+        print(f"{row['scenario']:<45} {row['p95_before']:>11.4f} {row['p95_after']:>11.4f} "
+              f"{row['p95_change']:>+7.0%} {row['throughput_change']:>+7.0%}{flag}")
+
+    regressed = [row['scenario'] for row in rows if row['regressions']]
+    if regressed:
+        print(f"\n{len(regressed)} scenario(s) regressed beyond {args.threshold:.0%}")
+        sys.exit(1)
+    print("\nNo regressions")
+
+
+if __name__ == "__main__":
+    main()
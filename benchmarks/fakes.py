@@ -0,0 +1,204 @@
+"""
+Local stand-ins for the LLMs and Whisper, plus a synthetic audio corpus.
+
+Market data comes from ``data_ingestion.providers.FakeProvider``. Everything
+here is deterministic for a given seed so results are comparable across
+commits.
+"""
+import io
+import tempfile
+import time
+import wave
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+import numpy as np
+
+from voice.audio import WHISPER_SAMPLE_RATE
+
+STUB_BRIEF = ("Asia tech exposure is steady. Earnings surprises were mixed "
+              "and regional sentiment is neutral.")
+STUB_TRANSCRIPT = ("What's our risk exposure in Asia tech stocks today, "
+                   "and highlight any earnings surprises?")
+
+
+def _reply(latency: float) -> str:
+    if latency:
+        time.sleep(latency)
+    # The ReAct parser ends an agent's turn on a final answer
+    return f"Thought: I now know the final answer\nFinal Answer: {STUB_BRIEF}"
+
+
+def make_stub_llm(latency: float = 0.0) -> Any:
+    """An LLM for crewai agents that answers immediately after `latency` seconds
+
+    Recent crewai releases take a ``BaseLLM``; older ones take a langchain
+    chat model, so whichever is installed is used.
+    """
+    try:
+        from crewai.llms.base_llm import BaseLLM
+    except ImportError:
+        BaseLLM = None
+
+    if BaseLLM is not None:
+        class StubLLM(BaseLLM):
+            def call(self, messages, *args, **kwargs) -> str:
+                return _reply(latency)
+
+            def supports_function_calling(self) -> bool:
+                return False
+
+            def supports_stop_words(self) -> bool:
+                return False
+
+            def get_context_window_size(self) -> int:
+                return 8192
+
+        return StubLLM(model="stub")
+
+    from langchain_core.language_models.fake_chat_models import FakeListChatModel
+    return FakeListChatModel(responses=[_reply(0.0)], sleep=latency or None)
+
+
+class StubLocalLLM:
+    """Drop-in for a GPT4All model that streams a fixed reply word by word
+
+    Every prompt word not yet in the chat session's context costs `prefill`
+    seconds before the first token, and every generated token `per_token`.
+    As with GPT4All, the system prompt is evaluated with the first message of
+    a session and later messages only add their own words.
+    """
+
+    def __init__(self, prefill: float = 0.0, per_token: float = 0.0, text: str = STUB_BRIEF):
+        self.prefill = prefill
+        self.per_token = per_token
+        self.text = text
+        self.evaluated = 0
+        self.sessions = 0
+        self._system: Optional[str] = None
+        self._fresh = False
+
+    @contextmanager
+    def chat_session(self, system_prompt: str = ''):
+        self.sessions += 1
+        self._system, self._fresh = system_prompt, True
+        try:
+            yield self
+        finally:
+            self._system = None
+
+    def _tokens(self, prompt: str, max_tokens: int, callback: Optional[Callable]) -> Iterator[str]:
+        words = len(prompt.split())
+        if self._fresh and self._system:
+            words += len(self._system.split())
+        self._fresh = False
+        self.evaluated += words
+        if self.prefill:
+            time.sleep(self.prefill * words)
+        for i, word in enumerate(self.text.split()[:max_tokens]):
+            if self.per_token:
+                time.sleep(self.per_token)
+            token = word if i == 0 else f" {word}"
+            if callback is not None and not callback(i, token):
+                return
+            yield token
+
+    def generate(self, prompt: str, max_tokens: int = 200, streaming: bool = False,
+                 callback: Optional[Callable] = None, **kwargs):
+        tokens = self._tokens(prompt, max_tokens, callback)
+        return tokens if streaming else ''.join(tokens)
+
+
+class StubWhisper:
+    """Drop-in for a Whisper model: fixed transcript after a simulated decode
+
+    Decode time is `latency` plus `per_second` for every second of audio.
+    """
+
+    def __init__(self, latency: float = 0.0, per_second: float = 0.0,
+                 text: str = STUB_TRANSCRIPT):
+        self.latency = latency
+        self.per_second = per_second
+        self.text = text
+        self.calls = 0
+
+    def transcribe(self, audio: np.ndarray, **kwargs) -> Dict[str, Any]:
+        self.calls += 1
+        seconds = len(audio) / WHISPER_SAMPLE_RATE
+        delay = self.latency + self.per_second * seconds
+        if delay:
+            time.sleep(delay)
+        return {'text': self.text, 'language': 'en'}
+
+
+def synthetic_utterance(seconds: float, sample_rate: int = WHISPER_SAMPLE_RATE,
+                        seed: int = 0) -> np.ndarray:
+    """Speech-like float32 audio: voiced syllables with pauses over a noise floor"""
+    rng = np.random.default_rng(seed)
+    n = int(seconds * sample_rate)
+    t = np.arange(n, dtype=np.float32) / sample_rate
+    audio = rng.normal(0, 0.002, n).astype(np.float32)
+
+    position = int(0.3 * sample_rate)
+    while position < n - int(0.3 * sample_rate):
+        length = int(rng.uniform(0.12, 0.35) * sample_rate)
+        end = min(n, position + length)
+        pitch = rng.uniform(100, 220)
+        envelope = np.hanning(end - position).astype(np.float32)
+        span = t[position:end]
+        voiced = sum(np.sin(2 * np.pi * pitch * k * span) / k for k in range(1, 5))
+        audio[position:end] += 0.3 * envelope * voiced.astype(np.float32)
+        # Short gaps between syllables, the occasional longer pause between words
+        position = end + int(rng.choice([0.05, 0.08, 0.4], p=[0.5, 0.35, 0.15]) * sample_rate)
+    return np.clip(audio, -1.0, 1.0)
+
+
+def to_wav_bytes(audio: np.ndarray, sample_rate: int = WHISPER_SAMPLE_RATE) -> bytes:
+    """Encode float32 samples as a 16-bit mono WAV file"""
+    buffer = io.BytesIO()
+    with wave.open(buffer, 'wb') as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+        wav.writeframes((np.clip(audio, -1.0, 1.0) * 32767).astype('<i2').tobytes())
+    return buffer.getvalue()
+
+
+def audio_corpus(count: int = 8, min_seconds: float = 2.0, max_seconds: float = 8.0,
+                 seed: int = 42, sample_rate: int = WHISPER_SAMPLE_RATE) -> List[Dict[str, Any]]:
+    """`count` utterances of varying length as float32 arrays and WAV bytes"""
+    rng = np.random.default_rng(seed)
+    corpus = []
+    for i in range(count):
+        seconds = float(rng.uniform(min_seconds, max_seconds))
+        audio = synthetic_utterance(seconds, sample_rate, seed=seed + i)
+        corpus.append({
+            'seconds': round(seconds, 3),
+            'sample_rate': sample_rate,
+            'audio': audio,
+            'wav': to_wav_bytes(audio, sample_rate),
+        })
+    return corpus
+
+
+def fake_market_data(latency: float = 0.0, failure_rate: float = 0.0, seed: int = 42,
+                     store_dir: Optional[str] = None, use_cache: bool = True,
+                     snapshot_store: Any = None):
+    """A MarketDataAgent over FakeProvider with its own fetcher, cache, history store
+    and in-memory earnings index
+
+    The store lives in a fresh temporary directory unless `store_dir` is given.
+    """
+    from agents.market_data_agent import MarketDataAgent
+    from data_ingestion.cache import MarketDataCache
+    from data_ingestion.earnings_index import EarningsIndex
+    from data_ingestion.fetcher import MarketDataFetcher
+    from data_ingestion.history_store import HistoryStore
+    from data_ingestion.providers import FakeProvider
+
+    provider = FakeProvider(latency=latency, failure_rate=failure_rate, seed=seed)
+    fetcher = MarketDataFetcher(provider, backoff=0.01)
+    store = HistoryStore(store_dir or tempfile.mkdtemp(prefix='bench-history-'))
+    return MarketDataAgent(fetcher=fetcher, cache=MarketDataCache(), use_cache=use_cache,
+                           history_store=store, earnings_index=EarningsIndex(),
+                           snapshot_store=snapshot_store)
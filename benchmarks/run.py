@@ -0,0 +1,325 @@
+"""
+Offline benchmark runner.
+
+Market data comes from FakeProvider, the crew uses a stub LLM, the offline
+assistant a stub GPT4All and speech recognition a stub Whisper, so nothing
+leaves the machine. Each scenario is
+run with a fixed number of requests at a given concurrency and reports
+latency percentiles, throughput, errors and the process's peak RSS::
+
+    python -m benchmarks.run --output results.json
+    python -m benchmarks.compare baseline.json results.json
+
+Scenarios whose dependencies are not installed (crewai, fastapi) are reported
+as skipped rather than failing the run.
+"""
+import argparse
+import asyncio
+import functools
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fakes import (StubLocalLLM, StubWhisper, audio_corpus, fake_market_data,
+                              make_stub_llm)
+
+GROUPS = ('market_data', 'crew', 'local_llm', 'api')
+
+
+def peak_rss_mb() -> float:
+    """High-water mark of this process's resident set size"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 2)
+
+
+def summarize(latencies: List[float], errors: Counter, elapsed: float,
+              concurrency: int) -> Dict[str, Any]:
+    requests = len(latencies) + sum(errors.values())
+    result = {
+        'requests': requests,
+        'concurrency': concurrency,
+        'errors': sum(errors.values()),
+        'error_kinds': dict(errors),
+        'elapsed': round(elapsed, 4),
+        'throughput': round(len(latencies) / elapsed, 3) if elapsed > 0 else 0.0,
+        'peak_rss_mb': peak_rss_mb(),
+    }
+    if latencies:
+        p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+        result.update({
+            'p50': round(float(p50), 5),
+            'p95': round(float(p95), 5),
+            'p99': round(float(p99), 5),
+            'mean': round(float(np.mean(latencies)), 5),
+            'max': round(float(np.max(latencies)), 5),
+        })
+    return result
+
+
+def measure(call: Callable[[int], Any], requests: int, concurrency: int) -> Dict[str, Any]:
+    """Run call(i) for i in range(requests) on `concurrency` threads"""
+    latencies: List[float] = []
+    errors = Counter()
+
+    def timed(i: int):
+        started = time.perf_counter()
+        try:
+            call(i)
+        except Exception as e:
+            errors[type(e).__name__] += 1
+            return
+        latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(timed, range(requests)))
+    return summarize(latencies, errors, time.perf_counter() - started, concurrency)
+
+
+async def measure_async(call: Callable[[int], Awaitable[Any]], requests: int,
+                        concurrency: int) -> Dict[str, Any]:
+    """Await call(i) for i in range(requests) with at most `concurrency` in flight"""
+    latencies: List[float] = []
+    errors = Counter()
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def timed(i: int):
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                response = await call(i)
+            except Exception as e:
+                errors[type(e).__name__] += 1
+                return
+            if response.status_code >= 400:
+                errors[f"http_{response.status_code}"] += 1
+                return
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(timed(i) for i in range(requests)))
+    return summarize(latencies, errors, time.perf_counter() - started, concurrency)
+
+
+def bench_market_data(args) -> Dict[str, Dict[str, Any]]:
+    """Every crew tool, cold (new agent, cache and history store per call) and warm"""
+    methods = {
+        'portfolio_exposure': lambda agent: agent.get_portfolio_exposure(),
+        'earnings_surprises': lambda agent: agent.get_earnings_surprises(),
+        'market_sentiment': lambda agent: agent.get_market_sentiment(),
+        'sector_breadth': lambda agent: agent.get_sector_breadth(),
+        'snapshot': lambda agent: agent.get_snapshot(),
+    }
+
+    def new_agent():
+        return fake_market_data(args.latency, args.failure_rate, args.seed)
+
+    results = {}
+    for name, method in methods.items():
+        results[f"market_data.{name}.cold"] = measure(
+            lambda i: method(new_agent()), args.cold_requests, args.concurrency)
+        warm = new_agent()
+        method(warm)
+        results[f"market_data.{name}.warm"] = measure(
+            lambda i: method(warm), args.requests, args.concurrency)
+
+    # Each new agent stands in for another worker process reading the same snapshot file
+    from data_ingestion.snapshot import SnapshotStore
+    shared = SnapshotStore(tempfile.mkdtemp(prefix='bench-snapshot-'))
+    results["market_data.snapshot.shared"] = measure(
+        lambda i: fake_market_data(args.latency, args.failure_rate, args.seed,
+                                   snapshot_store=shared).get_snapshot(),
+        args.cold_requests, args.concurrency)
+    return results
+
+
+def crew_factory(args) -> Callable[[], Any]:
+    from orchestrator.crew_manager import FinancialCrew
+    market_data = fake_market_data(args.latency, args.failure_rate, args.seed)
+    return functools.partial(FinancialCrew, market_data=market_data,
+                             llm=make_stub_llm(args.llm_latency))
+
+
+def bench_crew(args) -> Dict[str, Dict[str, Any]]:
+    from orchestrator.crew_manager import PARALLEL, SEQUENTIAL
+    new_crew = crew_factory(args)
+    # Same crew and stub LLM in both modes, so the difference is the fan-out
+    return {
+        'crew.run_crew': measure(lambda i: new_crew(mode=SEQUENTIAL).run_crew(f"benchmark query {i}"),
+                                 args.crew_requests, args.concurrency),
+        'crew.run_crew.parallel': measure(lambda i: new_crew(mode=PARALLEL).run_crew(f"benchmark query {i}"),
+                                          args.crew_requests, args.concurrency),
+    }
+
+
+def bench_local_llm(args) -> Dict[str, Dict[str, Any]]:
+    from agents.local_llm import ModelPool
+
+    def new_pool() -> ModelPool:
+        factory = functools.partial(StubLocalLLM, prefill=args.llm_prefill, per_token=args.llm_per_token)
+        pool = ModelPool(factory, size=args.llm_pool_size, max_queue=args.requests)
+        pool.warm()
+        return pool
+
+    def first_token(pool: ModelPool, conversation: Callable[[int], Optional[str]]) -> Callable[[int], Any]:
+        def call(i: int):
+            tokens = pool.stream(f"benchmark question number {i} about markets", conversation(i))
+            try:
+                return next(tokens)
+            finally:
+                tokens.close()
+        return call
+
+    pool = new_pool()
+    # One caller at a time, so time to first token is not queueing behind other requests.
+    # A new conversation evaluates the system prompt; a follow-up only its own message
+    return {
+        'llm.first_token': measure(first_token(pool, lambda i: None), args.crew_requests, 1),
+        'llm.first_token.follow_up': measure(first_token(new_pool(), lambda i: 'session'),
+                                             args.crew_requests, 1),
+        'llm.generate': measure(lambda i: pool.generate(f"benchmark question number {i}"),
+                                args.crew_requests, args.concurrency),
+    }
+
+
+async def _bench_api(args) -> Dict[str, Dict[str, Any]]:
+    import httpx
+    from orchestrator import api
+
+    # Injected values bypass the loaders, so nothing real is imported or downloaded
+    api.crew_class.set(crew_factory(args))
+    api.stt_model.set(StubWhisper(args.stt_latency, args.stt_per_second))
+    corpus = audio_corpus(args.corpus_size, seed=args.seed)
+    run_id = time.time_ns()
+
+    results = {}
+    transport = httpx.ASGITransport(app=api.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench",
+                                 timeout=api.REQUEST_TIMEOUT) as client:
+        # Unique questions all run the crew; a repeated one is coalesced and cached
+        results['api.process_text.unique'] = await measure_async(
+            lambda i: client.post("/process_text", json={'text': f"question {run_id}-{i}"}),
+            args.crew_requests, args.concurrency)
+        # Structured questions are answered by the intent router without the crew
+        results['api.process_text.fast_path'] = await measure_async(
+            lambda i: client.post("/process_text", json={'text': "What's our exposure and any earnings surprises?"}),
+            args.requests, args.concurrency)
+        results['api.process_text.identical'] = await measure_async(
+            lambda i: client.post("/process_text", json={'text': f"question {run_id}"}),
+            args.requests, args.concurrency)
+
+        def clip(i: int) -> Dict[str, Any]:
+            return corpus[i % len(corpus)]
+
+        results['api.process_audio'] = await measure_async(
+            lambda i: client.post("/process_audio", json={
+                'audio_data': clip(i)['audio'].tolist(),
+                'sample_rate': clip(i)['sample_rate'],
+            }),
+            args.requests, args.concurrency)
+        results['api.process_audio_raw'] = await measure_async(
+            lambda i: client.post("/process_audio/raw", content=clip(i)['wav'],
+                                  headers={'content-type': 'audio/wav'}),
+            args.requests, args.concurrency)
+    return results
+
+
+def bench_api(args) -> Dict[str, Dict[str, Any]]:
+    return asyncio.run(_bench_api(args))
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'], stderr=subprocess.DEVNULL,
+                                       cwd=os.path.dirname(os.path.abspath(__file__))).decode().strip()
+    except Exception:
+        return None
+
+
+def run(args) -> Dict[str, Any]:
+    benchmarks = {'market_data': bench_market_data, 'crew': bench_crew, 'local_llm': bench_local_llm,
+                  'api': bench_api}
+    results: Dict[str, Any] = {}
+    skipped: Dict[str, str] = {}
+    for group in args.only or GROUPS:
+        print(f"Running {group} benchmarks...", file=sys.stderr)
+        try:
+            results.update(benchmarks[group](args))
+        except ImportError as e:
+            skipped[group] = f"missing dependency: {e.name or str(e)}"
+            print(f"Skipping {group}: {skipped[group]}", file=sys.stderr)
+
+    config = {key: value for key, value in vars(args).items() if key != 'output'}
+    return {
+        'meta': {
+            'commit': git_commit(),
+            'timestamp': datetime.now(timezone.utc).isoformat(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'config': config,
+        },
+        'results': results,
+        'skipped': skipped,
+        'peak_rss_mb': peak_rss_mb(),
+    }
+
+
+def parse_args(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Run the offline benchmark suite")
+    parser.add_argument("--requests", type=int, default=200,
+                        help="requests per warm/cached scenario")
+    parser.add_argument("--cold-requests", type=int, default=20,
+                        help="requests per cold market data scenario")
+    parser.add_argument("--crew-requests", type=int, default=20,
+                        help="requests per scenario that runs the crew")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--latency", type=float, default=0.02,
+                        help="simulated market data latency per provider call (s)")
+    parser.add_argument("--failure-rate", type=float, default=0.0,
+                        help="probability that a provider call fails")
+    parser.add_argument("--llm-latency", type=float, default=0.2,
+                        help="simulated latency per LLM call (s)")
+    parser.add_argument("--llm-prefill", type=float, default=0.002,
+                        help="simulated local model time per prompt word evaluated (s)")
+    parser.add_argument("--llm-per-token", type=float, default=0.01,
+                        help="simulated local model time per generated token (s)")
+    parser.add_argument("--llm-pool-size", type=int, default=2,
+                        help="warm local model instances")
+    parser.add_argument("--stt-latency", type=float, default=0.1,
+                        help="simulated fixed latency per transcription (s)")
+    parser.add_argument("--stt-per-second", type=float, default=0.02,
+                        help="simulated transcription time per second of audio (s)")
+    parser.add_argument("--corpus-size", type=int, default=8)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--only", nargs="+", choices=GROUPS)
+    parser.add_argument("--output", help="write JSON results here instead of stdout")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None):
+    args = parse_args(argv)
+    report = json.dumps(run(args), indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(report + "\n")
+        print(f"Results written to {args.output}", file=sys.stderr)
+    else:
+        print(report)
+
+
+if __name__ == "__main__":
+    main()
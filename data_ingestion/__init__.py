@@ -0,0 +1,3 @@
+"""
+Data ingestion package for market data providers, fetching and storage.
+"""
@@ -0,0 +1,178 @@
+"""
+Process-wide TTL cache for market data results.
+
+Entries expire on a TTL that depends on the kind of data and on whether any
+of the Asian exchanges we cover (TSE, HKEX, KRX, TWSE) is currently trading:
+short while prices move, long while every market is closed. The cache is
+size-bounded with LRU eviction, collapses concurrent misses for the same key
+into a single load and keeps hit/miss counters.
+"""
+import copy
+import functools
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from datetime import datetime, time as dtime
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+import pytz
+
+# Regular trading sessions in local exchange time, lunch breaks excluded
+MARKET_SESSIONS = {
+    'TSE': ('Asia/Tokyo', [(dtime(9, 0), dtime(11, 30)), (dtime(12, 30), dtime(15, 30))]),
+    'HKEX': ('Asia/Hong_Kong', [(dtime(9, 30), dtime(12, 0)), (dtime(13, 0), dtime(16, 0))]),
+    'KRX': ('Asia/Seoul', [(dtime(9, 0), dtime(15, 30))]),
+    'TWSE': ('Asia/Taipei', [(dtime(9, 0), dtime(13, 30))]),
+}
+
+# TTL in seconds per data kind: (any market open, all markets closed)
+DEFAULT_TTLS = {
+    'info': (300, 3600),
+    'earnings': (3600, 6 * 3600),
+    'history': (60, 1800),
+}
+
+
+def is_market_open(exchange: str, now: Optional[datetime] = None) -> bool:
+    """Check whether an exchange is inside a regular trading session"""
+    tz_name, sessions = MARKET_SESSIONS[exchange]
+    now = now or datetime.now(pytz.utc)
+    if now.tzinfo is None:
+        now = pytz.utc.localize(now)
+    local = now.astimezone(pytz.timezone(tz_name))
+    if local.weekday() >= 5:
+        return False
+    return any(start <= local.time() < end for start, end in sessions)
+
+
+def any_market_open(now: Optional[datetime] = None) -> bool:
+    """Check whether any of the covered exchanges is trading"""
+    return any(is_market_open(exchange, now) for exchange in MARKET_SESSIONS)
+
+
+class MarketDataCache:
+    def __init__(self, maxsize: int = 256, ttls: Optional[Dict[str, Tuple[float, float]]] = None,
+                 clock: Callable[[], float] = time.monotonic,
+                 market_open: Callable[[], bool] = any_market_open):
+        self.maxsize = maxsize
+        self.ttls = dict(DEFAULT_TTLS, **(ttls or {}))
+        self.clock = clock
+        self.market_open = market_open
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        # Loads in flight; callers that miss while one runs wait for its result
+        self._loading: Dict[Hashable, Future] = {}
+
+    def ttl_for(self, kind: str) -> float:
+        """TTL for a data kind given the current exchange session"""
+        open_ttl, closed_ttl = self.ttls.get(kind, self.ttls['info'])
+        return open_ttl if self.market_open() else closed_ttl
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > self.clock():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return copy.deepcopy(entry[1])
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return default
+
+    def set(self, key: Hashable, value: Any, kind: str = 'info', ttl: Optional[float] = None):
+        ttl = self.ttl_for(kind) if ttl is None else ttl
+        with self._lock:
+            self._entries[key] = (self.clock() + ttl, copy.deepcopy(value))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def get_or_load(self, key: Hashable, loader: Callable[[], Any], kind: str = 'info',
+                    cacheable: Callable[[Any], bool] = bool) -> Any:
+        """Return a cached value or load it, letting only one caller per key hit the network"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > self.clock():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return copy.deepcopy(entry[1])
+            future = self._loading.get(key)
+            owner = future is None
+            if owner:
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                future = self._loading[key] = Future()
+            else:
+                # Served by the load already in flight, so it counts as a hit
+                self.hits += 1
+        if not owner:
+            return copy.deepcopy(future.result())
+
+        try:
+            value = loader()
+            if cacheable(value):
+                self.set(key, value, kind)
+            future.set_result(copy.deepcopy(value))
+            return value
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._loading.pop(key, None)
+
+    def invalidate(self, key: Optional[Hashable] = None):
+        """Drop one entry, or everything when no key is given"""
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / total if total else 0.0,
+                'market_open': self.market_open(),
+            }
+
+
+def cached(kind: str, cacheable: Callable[[Any], bool] = bool):
+    """Cache a MarketDataAgent method in the agent's cache, keyed by its universe"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(self, *args, **kwargs):
+            cache = getattr(self, 'cache', None)
+            if cache is None:
+                return func(self, *args, **kwargs)
+            key = (func.__name__, self.cache_key(), args, tuple(sorted(kwargs.items())))
+            return cache.get_or_load(key, lambda: func(self, *args, **kwargs), kind, cacheable)
+        return wrapper
+    return decorator
+
+
+_default_cache: Optional[MarketDataCache] = None
+_default_lock = threading.Lock()
+
+
+def get_default_cache() -> MarketDataCache:
+    """Process-wide cache shared by every MarketDataAgent"""
+    global _default_cache
+    with _default_lock:
+        if _default_cache is None:
+            _default_cache = MarketDataCache(maxsize=int(os.getenv("MARKET_DATA_CACHE_SIZE", "256")))
+        return _default_cache
@@ -0,0 +1,246 @@
+"""
+Persistent, date-sorted index of earnings announcements.
+
+Every announcement of every indexed symbol is one ``EarningsEvent``. The
+index keeps all events in one list sorted by date, so range queries such as
+"surprises in the last N days" or "reporting within a week" are two binary
+searches. It also keeps each symbol's latest reported surprise and next
+scheduled date.
+
+Earnings data only changes around announcements. ``refresh`` therefore
+refetches only the symbols that are due:
+- symbols never indexed;
+- symbols with an announcement inside the active window (``lead`` before to
+  ``grace`` after), at most every ``active_ttl``;
+- every other symbol once per ``idle_ttl``, to pick up rescheduled dates.
+
+The index is saved as JSON after each refresh that changed it and reloaded
+on start.
+"""
+import bisect
+import heapq
+import json
+import math
+import os
+import threading
+import time
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional
+
+import pandas as pd
+
+from data_ingestion.fetcher import FetchResult, MarketDataFetcher
+from observability.metrics import counter
+
+DAY = 24 * 3600
+
+earnings_refreshes = counter('earnings_index_refreshes', "Earnings index symbol refreshes", ['reason'])
+
+
+class EarningsEvent(NamedTuple):
+    date: float
+    symbol: str
+    estimate: float
+    reported: float
+    surprise: float
+
+    @property
+    def announced(self) -> bool:
+        return not math.isnan(self.surprise)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'date': pd.Timestamp(self.date, unit='s', tz='UTC').isoformat(),
+            'symbol': self.symbol,
+            'estimate': self.estimate,
+            'reported': self.reported,
+            'surprise': self.surprise,
+        }
+
+
+def _number(value: Any) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return float('nan')
+
+
+def events_from_frame(symbol: str, frame: pd.DataFrame) -> List[EarningsEvent]:
+    """Events from a provider's earnings_dates frame (any order, any timezone)"""
+    if frame is None or frame.empty:
+        return []
+    index = pd.DatetimeIndex(frame.index)
+    if index.tz is None:
+        index = index.tz_localize('UTC')
+    dates = index.tz_convert('UTC').as_unit('ns').asi8 / 1e9
+    columns = {name: frame[name].tolist() if name in frame else [float('nan')] * len(frame)
+               for name in ('EPS Estimate', 'Reported EPS', 'Surprise(%)')}
+    return sorted(
+        EarningsEvent(float(date), symbol, _number(estimate), _number(reported), _number(surprise))
+        for date, estimate, reported, surprise in zip(dates, columns['EPS Estimate'],
+                                                      columns['Reported EPS'], columns['Surprise(%)'])
+    )
+
+
+class EarningsIndex:
+    def __init__(self, path: Optional[str] = None, lead: float = 2 * DAY, grace: float = 3 * DAY,
+                 active_ttl: float = 3600, idle_ttl: float = 7 * DAY,
+                 clock=time.time):
+        self.path = os.path.expanduser(path) if path else None
+        self.lead = lead
+        self.grace = grace
+        self.active_ttl = active_ttl
+        self.idle_ttl = idle_ttl
+        self.clock = clock
+        # (date, symbol) keys kept parallel to the events, both sorted by date
+        self._keys: List[tuple] = []
+        self._events: List[EarningsEvent] = []
+        self._latest: Dict[str, EarningsEvent] = {}
+        self._next: Dict[str, float] = {}
+        self._refreshed: Dict[str, float] = {}
+        self._lock = threading.RLock()
+        self._refresh_lock = threading.Lock()
+        self.fetches = 0
+        if self.path and os.path.exists(self.path):
+            self.load()
+
+    def _replace(self, symbol: str, events: List[EarningsEvent], refreshed_at: float):
+        """Swap in a symbol's events, keeping the date order"""
+        # Both sides are already in date order, so a linear merge keeps the index sorted
+        kept = (event for event in self._events if event.symbol != symbol)
+        self._events = list(heapq.merge(kept, sorted(events)))
+        self._keys = [(event.date, event.symbol) for event in self._events]
+        self._track(symbol, events, refreshed_at)
+
+    def _track(self, symbol: str, events: List[EarningsEvent], refreshed_at: float):
+        """Remember a symbol's latest reported and next scheduled announcement"""
+        announced = [event for event in events if event.announced and event.date <= refreshed_at]
+        upcoming = [event.date for event in events
+                    if not event.announced and event.date > refreshed_at - self.grace]
+        if announced:
+            self._latest[symbol] = announced[-1]
+        else:
+            self._latest.pop(symbol, None)
+        if upcoming:
+            self._next[symbol] = min(upcoming)
+        else:
+            self._next.pop(symbol, None)
+        self._refreshed[symbol] = refreshed_at
+
+    def due(self, symbols: Iterable[str], now: Optional[float] = None) -> Dict[str, str]:
+        """Symbols that need refetching, with the reason"""
+        now = self.clock() if now is None else now
+        due = {}
+        with self._lock:
+            for symbol in symbols:
+                refreshed = self._refreshed.get(symbol)
+                scheduled = self._next.get(symbol)
+                if refreshed is None:
+                    due[symbol] = 'new'
+                elif scheduled is not None and scheduled - self.lead <= now <= scheduled + self.grace:
+                    if now - refreshed >= self.active_ttl:
+                        due[symbol] = 'announcement'
+                elif now - refreshed >= self.idle_ttl:
+                    due[symbol] = 'stale'
+        return due
+
+    def refresh(self, symbols: Iterable[str], fetcher: MarketDataFetcher) -> FetchResult:
+        """Refetch only the symbols that are due; errors are per symbol as in the fetcher"""
+        # One refresh at a time, so concurrent callers never refetch the same symbols
+        with self._refresh_lock:
+            due = self.due(symbols)
+            if not due:
+                return FetchResult()
+            result = fetcher.fetch_earnings(list(due))
+            now = self.clock()
+            with self._lock:
+                for symbol, frame in result.data.items():
+                    self._replace(symbol, events_from_frame(symbol, frame), now)
+                    earnings_refreshes.inc(reason=due[symbol])
+                self.fetches += len(result.data)
+            if result.data:
+                self.save()
+            return result
+
+    def range(self, start: float, end: float, symbols: Optional[Iterable[str]] = None) -> List[EarningsEvent]:
+        """Events dated start <= date < end (epoch seconds), by binary search"""
+        wanted = set(symbols) if symbols is not None else None
+        with self._lock:
+            lo = bisect.bisect_left(self._keys, (start,))
+            hi = bisect.bisect_left(self._keys, (end,))
+            events = self._events[lo:hi]
+        return [event for event in events if wanted is None or event.symbol in wanted]
+
+    def recent(self, days: float, symbols: Optional[Iterable[str]] = None,
+               now: Optional[float] = None) -> List[EarningsEvent]:
+        """Reported announcements in the last `days` days, oldest first"""
+        now = self.clock() if now is None else now
+        return [event for event in self.range(now - days * DAY, now, symbols) if event.announced]
+
+    def upcoming(self, days: float, symbols: Optional[Iterable[str]] = None,
+                 now: Optional[float] = None) -> List[EarningsEvent]:
+        """Announcements scheduled within the next `days` days"""
+        now = self.clock() if now is None else now
+        return [event for event in self.range(now, now + days * DAY, symbols) if not event.announced]
+
+    def latest(self, symbols: Iterable[str]) -> Dict[str, EarningsEvent]:
+        """Each symbol's most recent reported announcement"""
+        with self._lock:
+            return {symbol: self._latest[symbol] for symbol in symbols if symbol in self._latest}
+
+    def save(self):
+        if not self.path:
+            return
+        with self._lock:
+            state = {
+                'events': [list(event) for event in self._events],
+                'refreshed': self._refreshed,
+            }
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        temporary = f"{self.path}.{os.getpid()}.tmp"
+        with open(temporary, 'w') as handle:
+            json.dump(state, handle)
+        os.replace(temporary, self.path)
+
+    def load(self):
+        with open(self.path) as handle:
+            state = json.load(handle)
+        events = sorted(EarningsEvent(float(date), symbol, _number(estimate), _number(reported), _number(surprise))
+                        for date, symbol, estimate, reported, surprise in state.get('events', []))
+        by_symbol: Dict[str, List[EarningsEvent]] = {}
+        for event in events:
+            by_symbol.setdefault(event.symbol, []).append(event)
+        with self._lock:
+            self._events = events
+            self._keys = [(event.date, event.symbol) for event in events]
+            for symbol, refreshed_at in state.get('refreshed', {}).items():
+                self._track(symbol, by_symbol.get(symbol, []), float(refreshed_at))
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'symbols': len(self._refreshed),
+                'events': len(self._events),
+                'fetches': self.fetches,
+                # Symbols inside their announcement window, refreshed every active_ttl
+                'active': sum(1 for date in self._next.values()
+                              if date - self.lead <= self.clock() <= date + self.grace),
+            }
+
+
+_default_index: Optional[EarningsIndex] = None
+_default_lock = threading.Lock()
+
+
+def get_default_earnings_index() -> EarningsIndex:
+    """Process-wide index saved to EARNINGS_INDEX_PATH; an empty value keeps it in memory only"""
+    global _default_index
+    with _default_lock:
+        if _default_index is None:
+            _default_index = EarningsIndex(
+                os.getenv("EARNINGS_INDEX_PATH", "~/.cache/financial_agent/earnings.json"),
+                lead=float(os.getenv("EARNINGS_LEAD_DAYS", "2")) * DAY,
+                grace=float(os.getenv("EARNINGS_GRACE_DAYS", "3")) * DAY,
+                active_ttl=float(os.getenv("EARNINGS_ACTIVE_TTL", "3600")),
+                idle_ttl=float(os.getenv("EARNINGS_IDLE_DAYS", "7")) * DAY
+            )
+        return _default_index
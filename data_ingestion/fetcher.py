@@ -0,0 +1,236 @@
+"""
+Concurrent fetch layer between the agents and a market data provider.
+
+Symbols are split into shards that run on a bounded thread pool. History
+shards are one batched multi-ticker provider call each; per-symbol calls
+(info, earnings) run one after another inside their shard. Every provider
+call goes through a shared token bucket and is retried with jittered backoff.
+Each fetch has a deadline and returns whatever finished in time together with
+per-symbol errors and per-shard throughput, so one slow or failing ticker
+never holds up a brief.
+"""
+import logging
+import math
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+import pandas as pd
+
+from data_ingestion.providers import MarketDataProvider, YahooProvider
+from data_ingestion.rate_limit import TokenBucket, call_with_retry
+from observability.metrics import counter
+from observability.tracing import span
+
+logger = logging.getLogger(__name__)
+
+fetched_symbols = counter('market_data_symbols', "Symbols fetched from the provider", ['kind', 'outcome'])
+provider_retries = counter('market_data_retries', "Provider calls retried after a failure", ['kind'])
+
+
+@dataclass
+class ShardStats:
+    """Outcome of one shard of a fetch"""
+    shard: int
+    kind: str
+    symbols: int
+    succeeded: int = 0
+    failed: int = 0
+    retries: int = 0
+    elapsed: float = 0.0
+
+    @property
+    def throughput(self) -> float:
+        """Symbols fetched successfully per second"""
+        return self.succeeded / self.elapsed if self.elapsed else 0.0
+
+
+@dataclass
+class FetchResult:
+    """Partial result of a fetch: data per symbol plus errors per symbol"""
+    data: Dict[str, Any] = field(default_factory=dict)
+    errors: Dict[str, str] = field(default_factory=dict)
+    shards: List[ShardStats] = field(default_factory=list)
+
+    def summary(self) -> Dict[str, Any]:
+        elapsed = max((shard.elapsed for shard in self.shards), default=0.0)
+        return {
+            'symbols': len(self.data) + len(self.errors),
+            'succeeded': len(self.data),
+            'failed': len(self.errors),
+            'shards': len(self.shards),
+            'retries': sum(shard.retries for shard in self.shards),
+            'elapsed': elapsed,
+            'throughput': len(self.data) / elapsed if elapsed else 0.0,
+        }
+
+
+def shard(symbols: List[str], size: int) -> List[List[str]]:
+    """Split symbols into consecutive chunks of at most `size`"""
+    size = max(1, size)
+    return [symbols[i:i + size] for i in range(0, len(symbols), size)]
+
+
+class MarketDataFetcher:
+    def __init__(self, provider: Optional[MarketDataProvider] = None,
+                 max_workers: int = 8, timeout: float = 10.0,
+                 rate_limit: float = 0.0, burst: Optional[float] = None,
+                 retries: int = 2, backoff: float = 0.5,
+                 history_shard_size: int = 200):
+        self.provider = provider or YahooProvider()
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.limiter = TokenBucket(rate_limit, burst) if rate_limit > 0 else None
+        self.retries = retries
+        self.backoff = backoff
+        self.history_shard_size = history_shard_size
+        self._executor = ThreadPoolExecutor(max_workers=max_workers,
+                                            thread_name_prefix='market-data')
+
+    def _call(self, func: Callable[..., Any], *args, deadline: float,
+              stats: ShardStats) -> Any:
+        def on_retry():
+            stats.retries += 1
+        return call_with_retry(func, *args, limiter=self.limiter, retries=self.retries,
+                               base_delay=self.backoff, deadline=deadline, on_retry=on_retry)
+
+    def _run(self, kind: str, shards: List[List[str]],
+             run_shard: Callable[[List[str], float, ShardStats, Callable], None],
+             timeout: Optional[float]) -> FetchResult:
+        """Run every shard on the pool and collect what finishes before the deadline"""
+        with span(f'fetch.{kind}', symbols=sum(len(symbols) for symbols in shards),
+                  shards=len(shards)) as fetch_span:
+            result = self._run_shards(kind, shards, run_shard, timeout)
+            summary = result.summary()
+            fetch_span.set(succeeded=summary['succeeded'], failed=summary['failed'],
+                           retries=summary['retries'])
+        fetched_symbols.inc(summary['succeeded'], kind=kind, outcome='ok')
+        fetched_symbols.inc(summary['failed'], kind=kind, outcome='error')
+        provider_retries.inc(summary['retries'], kind=kind)
+        return result
+
+    def _run_shards(self, kind: str, shards: List[List[str]],
+                    run_shard: Callable[[List[str], float, ShardStats, Callable], None],
+                    timeout: Optional[float]) -> FetchResult:
+        timeout = self.timeout if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+        result = FetchResult()
+        lock = threading.Lock()
+        closed = threading.Event()
+
+        def record(symbol: str, value: Any = None, error: Optional[str] = None):
+            # Calls that outlive the deadline cannot be interrupted; their results are dropped
+            with lock:
+                if closed.is_set():
+                    return
+                if error is None:
+                    result.data[symbol] = value
+                else:
+                    result.errors[symbol] = error
+
+        def task(symbols: List[str], stats: ShardStats):
+            started = time.monotonic()
+            try:
+                run_shard(symbols, deadline, stats, record)
+            finally:
+                stats.elapsed = time.monotonic() - started
+
+        stats = [ShardStats(shard=i, kind=kind, symbols=len(symbols)) for i, symbols in enumerate(shards)]
+        futures = [self._executor.submit(task, symbols, shard_stats)
+                   for symbols, shard_stats in zip(shards, stats)]
+        wait(futures, timeout=max(0.0, deadline - time.monotonic()))
+
+        with lock:
+            closed.set()
+            for future in futures:
+                future.cancel()
+            for symbols, shard_stats in zip(shards, stats):
+                for symbol in symbols:
+                    if symbol not in result.data and symbol not in result.errors:
+                        result.errors[symbol] = f"timed out after {timeout}s"
+                shard_stats.succeeded = sum(1 for symbol in symbols if symbol in result.data)
+                shard_stats.failed = shard_stats.symbols - shard_stats.succeeded
+                if not shard_stats.elapsed:
+                    shard_stats.elapsed = timeout
+        result.shards = stats
+        for shard_stats in stats:
+            logger.debug("%s shard %d: %d/%d ok, %d retries, %.1f symbols/s",
+                         kind, shard_stats.shard, shard_stats.succeeded, shard_stats.symbols,
+                         shard_stats.retries, shard_stats.throughput)
+        return result
+
+    def _map(self, kind: str, func: Callable[[str], Any], symbols: List[str],
+             timeout: Optional[float] = None) -> FetchResult:
+        """Run a per-symbol call for every symbol, one shard per worker"""
+        def run_shard(chunk, deadline, stats, record):
+            for symbol in chunk:
+                if time.monotonic() >= deadline:
+                    return
+                try:
+                    record(symbol, self._call(func, symbol, deadline=deadline, stats=stats))
+                except Exception as e:
+                    record(symbol, error=str(e))
+
+        size = math.ceil(len(symbols) / self.max_workers) if symbols else 1
+        return self._run(kind, shard(list(symbols), size), run_shard, timeout)
+
+    def fetch_info(self, symbols: List[str], timeout: Optional[float] = None) -> FetchResult:
+        """Fetch quote/profile info for each symbol concurrently"""
+        return self._map('info', self.provider.get_info, symbols, timeout)
+
+    def fetch_earnings(self, symbols: List[str], timeout: Optional[float] = None) -> FetchResult:
+        """Fetch earnings dates for each symbol concurrently"""
+        return self._map('earnings', self.provider.get_earnings_dates, symbols, timeout)
+
+    def fetch_history(self, symbols: List[str], period: str = '5d',
+                      start: Optional[pd.Timestamp] = None,
+                      timeout: Optional[float] = None) -> FetchResult:
+        """Fetch OHLCV history with one batched provider call per shard"""
+        def run_shard(chunk, deadline, stats, record):
+            try:
+                history = self._call(self.provider.get_history, chunk, period, start,
+                                     deadline=deadline, stats=stats)
+            except Exception as e:
+                for symbol in chunk:
+                    record(symbol, error=str(e))
+                return
+            for symbol in chunk:
+                frame = history.get(symbol)
+                if frame is None or frame.empty:
+                    record(symbol, error="no history returned")
+                else:
+                    record(symbol, frame)
+
+        return self._run('history', shard(list(symbols), self.history_shard_size), run_shard, timeout)
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+_default_fetcher: Optional[MarketDataFetcher] = None
+_default_lock = threading.Lock()
+
+
+def get_default_fetcher() -> MarketDataFetcher:
+    """Process-wide fetcher shared by every MarketDataAgent"""
+    global _default_fetcher
+    with _default_lock:
+        if _default_fetcher is None:
+            _default_fetcher = MarketDataFetcher(
+                max_workers=int(os.getenv("MARKET_DATA_MAX_WORKERS", "8")),
+                timeout=float(os.getenv("MARKET_DATA_TIMEOUT", "10")),
+                rate_limit=float(os.getenv("MARKET_DATA_RATE_LIMIT", "10")),
+                retries=int(os.getenv("MARKET_DATA_RETRIES", "2")),
+                history_shard_size=int(os.getenv("MARKET_DATA_HISTORY_SHARD_SIZE", "200"))
+            )
+        return _default_fetcher
+
+
+def set_default_fetcher(fetcher: Optional[MarketDataFetcher]):
+    """Replace the shared fetcher, e.g. with one backed by FakeProvider"""
+    global _default_fetcher
+    with _default_lock:
+        _default_fetcher = fetcher
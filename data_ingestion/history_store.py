@@ -0,0 +1,187 @@
+"""
+Incremental on-disk OHLCV history store.
+
+Bars are kept per symbol in a columnar layout: one flat little-endian file per
+column (timestamps as int64 UTC nanoseconds, prices and volume as float64).
+New bars are appended, so a refresh only asks the provider for bars from the
+last stored timestamp onwards. Reads memory-map the column files and return
+slices of the mapping, so any lookback window is served without copying.
+Appends hold a per-symbol file lock, so several worker processes can share
+one store.
+"""
+import os
+import threading
+from typing import Dict, List, Optional
+from urllib.parse import quote, unquote
+
+import numpy as np
+import pandas as pd
+
+from data_ingestion.fetcher import FetchResult, MarketDataFetcher
+
+try:
+    import fcntl
+except ImportError:
+    # No cross-process lock on Windows; only one process should then write the store
+    fcntl = None
+
+TIMESTAMP = 'ts'
+COLUMNS = ('Open', 'High', 'Low', 'Close', 'Volume')
+_DTYPES = dict({TIMESTAMP: np.dtype('<i8')}, **{column: np.dtype('<f8') for column in COLUMNS})
+
+
+def _to_utc_nanos(index: pd.Index) -> np.ndarray:
+    index = pd.DatetimeIndex(index)
+    if index.tz is None:
+        index = index.tz_localize('UTC')
+    return index.tz_convert('UTC').as_unit('ns').asi8
+
+
+class HistoryStore:
+    def __init__(self, root: str, backfill_period: str = '1y'):
+        self.root = os.path.expanduser(root)
+        self.backfill_period = backfill_period
+        self._maps: Dict[str, Dict[str, np.ndarray]] = {}
+        self._lock = threading.RLock()
+        os.makedirs(self.root, exist_ok=True)
+
+    def _path(self, symbol: str, column: str) -> str:
+        return os.path.join(self.root, quote(symbol, safe=''), f'{column}.bin')
+
+    def symbols(self) -> List[str]:
+        return sorted(unquote(name) for name in os.listdir(self.root)
+                      if os.path.isfile(os.path.join(self.root, name, f'{TIMESTAMP}.bin')))
+
+    def columns(self, symbol: str) -> Dict[str, np.ndarray]:
+        """Read-only memory maps of every column for a symbol"""
+        with self._lock:
+            maps = self._maps.get(symbol)
+            if maps is not None:
+                return maps
+
+            maps = {}
+            for column, dtype in _DTYPES.items():
+                path = self._path(symbol, column)
+                size = os.path.getsize(path) // dtype.itemsize if os.path.exists(path) else 0
+                maps[column] = (np.memmap(path, dtype=dtype, mode='r', shape=(size,))
+                                if size else np.empty(0, dtype=dtype))
+            # Columns are written timestamp-last, so a torn append is cut off here
+            length = min(len(array) for array in maps.values())
+            maps = {column: array[:length] for column, array in maps.items()}
+            self._maps[symbol] = maps
+            return maps
+
+    def length(self, symbol: str) -> int:
+        return len(self.columns(symbol)[TIMESTAMP])
+
+    def last_timestamp(self, symbol: str) -> Optional[pd.Timestamp]:
+        timestamps = self.columns(symbol)[TIMESTAMP]
+        return pd.Timestamp(int(timestamps[-1]), tz='UTC') if len(timestamps) else None
+
+    def append(self, symbol: str, frame: pd.DataFrame) -> int:
+        """Store bars newer than the last stored one; a bar at the last timestamp replaces it"""
+        if frame is None or frame.empty:
+            return 0
+
+        frame = frame.sort_index()
+        timestamps = _to_utc_nanos(frame.index)
+        directory = os.path.dirname(self._path(symbol, TIMESTAMP))
+        os.makedirs(directory, exist_ok=True)
+        with self._lock, open(os.path.join(directory, 'append.lock'), 'a') as lock:
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                return self._append_locked(symbol, frame, timestamps)
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _append_locked(self, symbol: str, frame: pd.DataFrame, timestamps: np.ndarray) -> int:
+        # Another process may have appended since we mapped the files, so map them afresh
+        self._maps.pop(symbol, None)
+        stored = self.columns(symbol)[TIMESTAMP]
+        length = len(stored)
+        last = int(stored[-1]) if length else None
+        # Release our maps before writing to the files underneath them
+        self._maps.pop(symbol, None)
+
+        if last is not None:
+            keep = timestamps >= last
+            frame, timestamps = frame[keep], timestamps[keep]
+            if not len(timestamps):
+                return 0
+        # The most recent bar may still be forming, so rewrite it in place
+        overwrite = last is not None and timestamps[0] == last
+        offset = length - 1 if overwrite else length
+
+        for column in COLUMNS + (TIMESTAMP,):
+            dtype = _DTYPES[column]
+            if column == TIMESTAMP:
+                values = timestamps.astype(dtype)
+            elif column in frame:
+                values = frame[column].to_numpy(dtype=dtype, na_value=np.nan)
+            else:
+                values = np.full(len(frame), np.nan, dtype=dtype)
+            path = self._path(symbol, column)
+            with open(path, 'r+b' if os.path.exists(path) else 'wb') as handle:
+                handle.seek(offset * dtype.itemsize)
+                handle.write(values.tobytes())
+                handle.truncate()
+        return len(timestamps) - (1 if overwrite else 0)
+
+    def window(self, symbol: str, lookback: Optional[int] = None,
+               start: Optional[pd.Timestamp] = None,
+               end: Optional[pd.Timestamp] = None) -> Dict[str, np.ndarray]:
+        """Zero-copy column slices for the last `lookback` bars and/or a time range"""
+        columns = self.columns(symbol)
+        timestamps = columns[TIMESTAMP]
+        lo, hi = 0, len(timestamps)
+        if start is not None:
+            lo = int(np.searchsorted(timestamps, _to_utc_nanos([start])[0], side='left'))
+        if end is not None:
+            hi = int(np.searchsorted(timestamps, _to_utc_nanos([end])[0], side='right'))
+        if lookback is not None:
+            lo = max(lo, hi - lookback)
+        return {column: array[lo:hi] for column, array in columns.items()}
+
+    def frame(self, symbol: str, lookback: Optional[int] = None, **kwargs) -> pd.DataFrame:
+        """Window as a DataFrame indexed by UTC timestamp"""
+        window = self.window(symbol, lookback, **kwargs)
+        index = pd.to_datetime(np.asarray(window[TIMESTAMP]), utc=True)
+        return pd.DataFrame({column: window[column] for column in COLUMNS}, index=index, copy=False)
+
+    def refresh(self, symbols: List[str], fetcher: MarketDataFetcher) -> FetchResult:
+        """Fetch only missing bars: a backfill for new symbols, a delta for the rest"""
+        result = FetchResult()
+        new = [symbol for symbol in symbols if self.last_timestamp(symbol) is None]
+        known = [symbol for symbol in symbols if symbol not in new]
+
+        batches = []
+        if new:
+            batches.append(fetcher.fetch_history(new, period=self.backfill_period))
+        if known:
+            # One batched request from the oldest last bar still covers every symbol
+            since = min(self.last_timestamp(symbol) for symbol in known)
+            batches.append(fetcher.fetch_history(known, start=since.tz_convert(None).normalize()))
+
+        for batch in batches:
+            result.errors.update(batch.errors)
+            for symbol, frame in batch.data.items():
+                result.data[symbol] = self.append(symbol, frame)
+        return result
+
+
+_default_store: Optional[HistoryStore] = None
+_default_lock = threading.Lock()
+
+
+def get_default_store() -> Optional[HistoryStore]:
+    """Process-wide store under MARKET_DATA_STORE_DIR; an empty value disables it"""
+    global _default_store
+    root = os.getenv("MARKET_DATA_STORE_DIR", "~/.cache/financial_agent/history")
+    if not root:
+        return None
+    with _default_lock:
+        if _default_store is None:
+            _default_store = HistoryStore(root, backfill_period=os.getenv("MARKET_DATA_BACKFILL", "1y"))
+        return _default_store
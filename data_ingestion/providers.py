@@ -0,0 +1,195 @@
+"""
+Market data providers.
+
+A provider is the only component that talks to an upstream data source.
+Everything above it (the fetch layer, caches and agents) depends only on
+the ``MarketDataProvider`` interface, so the local ``FakeProvider`` can stand
+in for Yahoo Finance in tests and benchmarks.
+"""
+import random
+import threading
+import time
+import zlib
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+# Approximate number of daily bars per yfinance period string
+PERIOD_BARS = {
+    '1d': 1, '5d': 5, '1mo': 21, '3mo': 63, '6mo': 126,
+    '1y': 252, '2y': 504, '5y': 1260, '10y': 2520, 'max': 5040,
+}
+
+
+def period_for_bars(bars: int) -> str:
+    """Smallest yfinance period string covering at least `bars` daily bars"""
+    for period, count in sorted(PERIOD_BARS.items(), key=lambda item: item[1]):
+        if count >= bars:
+            return period
+    return 'max'
+
+
+class ProviderError(Exception):
+    """Raised when a provider cannot serve a request"""
+
+
+class MarketDataProvider:
+    """Interface implemented by every market data source"""
+
+    name = 'base'
+
+    def get_info(self, symbol: str) -> Dict[str, Any]:
+        """Return the quote/profile dictionary for a symbol"""
+        raise NotImplementedError
+
+    def get_earnings_dates(self, symbol: str) -> pd.DataFrame:
+        """Return earnings dates, most recent first, with a 'Surprise(%)' column"""
+        raise NotImplementedError
+
+    def get_history(self, symbols: List[str], period: str = '5d',
+                    start: Optional[pd.Timestamp] = None) -> Dict[str, pd.DataFrame]:
+        """Return daily OHLCV bars for several symbols in a single request"""
+        raise NotImplementedError
+
+
+class YahooProvider(MarketDataProvider):
+    """Yahoo Finance provider backed by yfinance"""
+
+    name = 'yahoo'
+
+    def get_info(self, symbol: str) -> Dict[str, Any]:
+        import yfinance as yf
+        return yf.Ticker(symbol).info
+
+    def get_earnings_dates(self, symbol: str) -> pd.DataFrame:
+        import yfinance as yf
+        earnings = yf.Ticker(symbol).earnings_dates
+        return earnings if earnings is not None else pd.DataFrame()
+
+    def get_history(self, symbols: List[str], period: str = '5d',
+                    start: Optional[pd.Timestamp] = None) -> Dict[str, pd.DataFrame]:
+        import yfinance as yf
+        if not symbols:
+            return {}
+
+        kwargs = {'start': start} if start is not None else {'period': period}
+        data = yf.download(
+            list(symbols),
+            group_by='ticker',
+            auto_adjust=False,
+            progress=False,
+            threads=True,
+            **kwargs
+        )
+
+        history = {}
+        if isinstance(data.columns, pd.MultiIndex):
+            available = set(data.columns.get_level_values(0))
+            for symbol in symbols:
+                if symbol in available:
+                    frame = data[symbol].dropna(how='all')
+                    if not frame.empty:
+                        history[symbol] = frame
+        elif not data.empty and len(symbols) == 1:
+            history[symbols[0]] = data.dropna(how='all')
+        return history
+
+
+class FakeProvider(MarketDataProvider):
+    """Deterministic local stand-in for Yahoo Finance.
+
+    Every symbol gets its own seeded random walk, market cap and earnings
+    history, so repeated runs produce identical data. ``latency`` (seconds per
+    call) and ``failure_rate`` (probability that a call raises) simulate a
+    slow or flaky upstream. ``calls`` counts requests per method.
+    """
+
+    name = 'fake'
+
+    def __init__(self, latency: float = 0.0, failure_rate: float = 0.0,
+                 seed: int = 42, end: Optional[pd.Timestamp] = None):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.seed = seed
+        self.end = pd.Timestamp(end).normalize() if end is not None else None
+        self.calls = Counter()
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def _symbol_seed(self, symbol: str) -> int:
+        return zlib.crc32(symbol.encode()) ^ self.seed
+
+    def _call(self, method: str, symbol: str = ''):
+        with self._lock:
+            self.calls[method] += 1
+            failed = self._rng.random() < self.failure_rate
+        if self.latency:
+            time.sleep(self.latency)
+        if failed:
+            raise ProviderError(f"Simulated {method} failure for {symbol or 'batch'}")
+
+    def _end_date(self) -> pd.Timestamp:
+        end = self.end if self.end is not None else pd.Timestamp.now().normalize()
+        # Roll weekends back to the previous business day
+        if end.weekday() >= 5:
+            end = end - pd.offsets.BDay(1)
+        return end
+
+    def get_info(self, symbol: str) -> Dict[str, Any]:
+        self._call('info', symbol)
+        rng = np.random.default_rng(self._symbol_seed(symbol))
+        return {
+            'symbol': symbol,
+            'shortName': symbol,
+            'marketCap': int(rng.uniform(1e10, 8e11)),
+            'currency': 'USD',
+        }
+
+    def get_earnings_dates(self, symbol: str) -> pd.DataFrame:
+        self._call('earnings_dates', symbol)
+        rng = np.random.default_rng(self._symbol_seed(symbol) + 1)
+        end = self._end_date()
+        # One upcoming and seven past quarterly announcements
+        offset = int(rng.integers(5, 60))
+        dates = [end + pd.Timedelta(days=offset - 91 * i) for i in range(8)]
+        estimates = rng.uniform(0.5, 5.0, size=8).round(2)
+        reported = (estimates * (1 + rng.normal(0, 0.1, size=8))).round(2)
+        surprise = ((reported - estimates) / estimates * 100).round(2)
+        reported[0] = np.nan
+        surprise[0] = np.nan
+        return pd.DataFrame(
+            {'EPS Estimate': estimates, 'Reported EPS': reported, 'Surprise(%)': surprise},
+            index=pd.DatetimeIndex(dates, name='Earnings Date')
+        )
+
+    def _history(self, symbol: str, index: pd.DatetimeIndex) -> pd.DataFrame:
+        # The walk is anchored at a fixed origin so overlapping requests agree
+        origin = pd.Timestamp('2000-01-03')
+        positions = ((index - origin).days // 7 * 5 + np.minimum(index.weekday, 4)).to_numpy()
+        rng = np.random.default_rng(self._symbol_seed(symbol) + 2)
+        base = rng.uniform(20, 500)
+        drift = rng.normal(0, 0.0004)
+        # Prices are a function of the bar position only, never of the call
+        close = base * np.exp(positions * drift + np.sin(positions * 0.05 + base) * 0.1
+                              + np.sin(positions * 0.7 + base) * 0.01)
+        spread = np.abs(np.cos(positions * 1.3 + base)) * 0.01 * close
+        return pd.DataFrame({
+            'Open': close - spread / 2,
+            'High': close + spread,
+            'Low': close - spread,
+            'Close': close,
+            'Adj Close': close,
+            'Volume': (1e6 * (1.5 + np.sin(positions + base))).astype('int64'),
+        }, index=index)
+
+    def get_history(self, symbols: List[str], period: str = '5d',
+                    start: Optional[pd.Timestamp] = None) -> Dict[str, pd.DataFrame]:
+        self._call('history')
+        end = self._end_date()
+        if start is not None:
+            index = pd.bdate_range(pd.Timestamp(start).normalize(), end)
+        else:
+            index = pd.bdate_range(end=end, periods=PERIOD_BARS.get(period, 5))
+        return {symbol: self._history(symbol, index) for symbol in symbols if len(index)}
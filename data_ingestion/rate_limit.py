@@ -0,0 +1,70 @@
+"""
+Rate limiting and retry helpers for provider calls.
+"""
+import random
+import threading
+import time
+from typing import Any, Callable, Optional
+
+
+class TokenBucket:
+    """Thread-safe token bucket allowing `rate` calls per second with bursts up to `capacity`"""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None,
+                 clock: Callable[[], float] = time.monotonic):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(rate, 1.0)
+        self.clock = clock
+        self._tokens = self.capacity
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, tokens: float = 1.0, timeout: Optional[float] = None) -> bool:
+        """Take tokens, waiting until they are available; False if that would exceed timeout"""
+        if self.rate <= 0:
+            return True
+        deadline = None if timeout is None else self.clock() + timeout
+        while True:
+            with self._lock:
+                now = self.clock()
+                self._refill(now)
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return True
+                wait = (tokens - self._tokens) / self.rate
+            if deadline is not None and now + wait > deadline:
+                return False
+            time.sleep(wait)
+
+
+def backoff_delay(attempt: int, base_delay: float = 0.5, max_delay: float = 8.0) -> float:
+    """Exponential backoff with full jitter for the given retry attempt (1-based)"""
+    return random.uniform(0, min(max_delay, base_delay * 2 ** (attempt - 1)))
+
+
+def call_with_retry(func: Callable[..., Any], *args, limiter: Optional[TokenBucket] = None,
+                    retries: int = 2, base_delay: float = 0.5, max_delay: float = 8.0,
+                    deadline: Optional[float] = None, on_retry: Optional[Callable[[], None]] = None,
+                    **kwargs) -> Any:
+    """Call func under the rate limiter, retrying failures with jittered backoff until the deadline"""
+    attempt = 0
+    while True:
+        remaining = None if deadline is None else deadline - time.monotonic()
+        if limiter is not None and not limiter.acquire(timeout=remaining):
+            raise TimeoutError("rate limit wait would exceed the deadline")
+        try:
+            return func(*args, **kwargs)
+        except Exception:
+            attempt += 1
+            if attempt > retries:
+                raise
+            delay = backoff_delay(attempt, base_delay, max_delay)
+            if deadline is not None and time.monotonic() + delay >= deadline:
+                raise
+            if on_retry is not None:
+                on_retry()
+            time.sleep(delay)
@@ -0,0 +1,317 @@
+"""
+Compact, versioned market snapshots shared by every worker process.
+
+A ``MarketSnapshot`` holds what ``MarketDataAgent.get_snapshot`` returns:
+exposure, earnings surprises and sentiment. Instead of dicts and lists of
+dicts, it stores them as NumPy structured arrays with fixed-width UTF-8 names
+(cut to 64 bytes).
+Its id is a content hash of those arrays and the few scalars, so equal data
+always has the same id, in any process.
+
+``to_bytes`` writes a flat little-endian layout:
+- an 8-byte magic and the format version;
+- the length of a small JSON header, then the header (scalars, plus each
+  array's offset and length; the format version fixes the dtypes);
+- every array at a 64-byte aligned offset.
+
+``SnapshotStore`` publishes snapshots as files (ideally under /dev/shm) by
+atomic rename. Readers memory-map the current file, and the arrays are views
+of that mapping, so every uvicorn and Streamlit worker on the host reads the
+same pages instead of holding its own copy. When a snapshot is stale, one
+worker rebuilds it under a file lock while the others wait and then read its
+result, so the provider is asked once per host rather than once per worker.
+"""
+import hashlib
+import json
+import logging
+import mmap
+import os
+import struct
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+from urllib.parse import quote
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:
+    # No cross-process lock on Windows; workers may then rebuild concurrently
+    fcntl = None
+
+MAGIC = b'MKTSNAP\0'
+FORMAT_VERSION = 1
+ALIGN = 64
+NAME_BYTES = 64
+_PREAMBLE = struct.Struct('<8sII')
+
+EXPOSURE_DTYPE = np.dtype([('name', f'S{NAME_BYTES}'), ('weight', '<f8')])
+SURPRISE_DTYPE = np.dtype([('name', f'S{NAME_BYTES}'), ('surprise', '<f8')])
+FACTOR_DTYPE = np.dtype([('label', f'S{NAME_BYTES}'), ('kind', 'u1'), ('change', '<f8')])
+# Sentiment factor kinds: a regional index (percent change) or a rate (point change)
+INDEX, RATE = 0, 1
+SECTIONS = {'exposure': EXPOSURE_DTYPE, 'surprises': SURPRISE_DTYPE, 'factors': FACTOR_DTYPE}
+
+logger = logging.getLogger(__name__)
+
+
+class SnapshotFormatError(Exception):
+    """Raised when bytes are not a snapshot this version can read"""
+
+
+def _name(value: str) -> bytes:
+    """UTF-8 name for a fixed-width field; longer names are cut at a character boundary"""
+    encoded = str(value).encode('utf-8')
+    if len(encoded) > NAME_BYTES:
+        encoded = encoded[:NAME_BYTES].decode('utf-8', 'ignore').encode('utf-8')
+    return encoded
+
+
+def _aligned(offset: int) -> int:
+    return -(-offset // ALIGN) * ALIGN
+
+
+class MarketSnapshot:
+    __slots__ = ('universe', 'created_at', 'total_exposure', 'exposure', 'surprises', 'factors',
+                 'overall', 'extra', 'id', '_buffer')
+
+    def __init__(self, universe: str, total_exposure: float, exposure: np.ndarray, surprises: np.ndarray,
+                 factors: np.ndarray, overall: str = 'neutral', extra: Optional[Dict[str, Any]] = None,
+                 created_at: Optional[float] = None, id: Optional[str] = None, buffer: Any = None):
+        self.universe = universe
+        self.total_exposure = float(total_exposure)
+        self.exposure = exposure
+        self.surprises = surprises
+        self.factors = factors
+        self.overall = overall
+        # Other sentiment keys, e.g. 'source' for streamed data or an 'error'
+        self.extra = extra or {}
+        self.created_at = time.time() if created_at is None else created_at
+        # Keeps the memory map alive for as long as the arrays are views of it
+        self._buffer = buffer
+        self.id = id or self.content_hash()
+
+    @classmethod
+    def from_dict(cls, snapshot: Dict[str, Any], created_at: Optional[float] = None) -> 'MarketSnapshot':
+        """From the dict ``MarketDataAgent.get_snapshot`` used to return"""
+        sentiment = snapshot.get('sentiment') or {}
+        factors = []
+        for factor in sentiment.get('factors', []):
+            if 'index' in factor:
+                factors.append((_name(factor['index']), INDEX, float(factor['change'])))
+            else:
+                factors.append((_name(factor['factor']), RATE, float(factor['change'])))
+        return cls(
+            snapshot.get('universe', ''),
+            snapshot.get('total_exposure', 0.0),
+            np.array([(_name(name), weight) for name, weight in snapshot.get('exposure', {}).items()],
+                     dtype=EXPOSURE_DTYPE),
+            np.array([(_name(name), surprise) for name, surprise in snapshot.get('surprises', {}).items()],
+                     dtype=SURPRISE_DTYPE),
+            np.array(factors, dtype=FACTOR_DTYPE),
+            overall=sentiment.get('overall', 'neutral'),
+            extra={key: value for key, value in sentiment.items() if key not in ('overall', 'factors')},
+            created_at=created_at
+        )
+
+    def sentiment(self) -> Dict[str, Any]:
+        factors = []
+        for label, kind, change in self.factors.tolist():
+            change = float(change)
+            if kind == INDEX:
+                factors.append({'index': label.decode('utf-8'), 'change': change,
+                                'trend': 'up' if change > 0 else 'down'})
+            else:
+                factors.append({'factor': label.decode('utf-8'), 'change': change,
+                                'impact': 'cautionary' if change > 0 else 'supportive'})
+        return dict({'overall': self.overall, 'factors': factors}, **self.extra)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'universe': self.universe,
+            'total_exposure': self.total_exposure,
+            'exposure': {name.decode('utf-8'): float(weight) for name, weight in self.exposure.tolist()},
+            'surprises': {name.decode('utf-8'): float(surprise) for name, surprise in self.surprises.tolist()},
+            'sentiment': self.sentiment(),
+        }
+
+    def tool_results(self) -> Dict[str, Any]:
+        """The snapshot as the results of the market data methods it was built from"""
+        snapshot = self.to_dict()
+        return {
+            'get_portfolio_exposure': (snapshot['total_exposure'], snapshot['exposure']),
+            'get_earnings_surprises': snapshot['surprises'],
+            'get_market_sentiment': snapshot['sentiment'],
+        }
+
+    @property
+    def complete(self) -> bool:
+        """Whether every dataset loaded, i.e. the snapshot is worth sharing"""
+        return bool(len(self.exposure)) and bool(len(self.factors)) and 'error' not in self.extra
+
+    @property
+    def age(self) -> float:
+        return time.time() - self.created_at
+
+    def _scalars(self) -> Dict[str, Any]:
+        return {'universe': self.universe, 'total_exposure': self.total_exposure,
+                'overall': self.overall, 'extra': self.extra}
+
+    def content_hash(self) -> str:
+        """Hash of the data only, so equal snapshots share an id whenever they were built"""
+        digest = hashlib.sha256(json.dumps(self._scalars(), sort_keys=True, default=str).encode())
+        for section in SECTIONS:
+            digest.update(np.ascontiguousarray(getattr(self, section)).tobytes())
+        return digest.hexdigest()[:16]
+
+    def to_bytes(self) -> bytes:
+        arrays = {section: np.ascontiguousarray(getattr(self, section)) for section in SECTIONS}
+        header = dict(self._scalars(), id=self.id, created_at=self.created_at, sections={})
+        # Offsets depend on the header's length, which depends on the offsets; repeat until they settle
+        while True:
+            encoded = json.dumps(header, default=str).encode()
+            offset = _aligned(_PREAMBLE.size + len(encoded))
+            sections = {}
+            for section, array in arrays.items():
+                sections[section] = {'offset': offset, 'count': len(array)}
+                offset = _aligned(offset + array.nbytes)
+            if sections == header['sections']:
+                break
+            header['sections'] = sections
+
+        output = bytearray(offset)
+        output[:_PREAMBLE.size] = _PREAMBLE.pack(MAGIC, FORMAT_VERSION, len(encoded))
+        output[_PREAMBLE.size:_PREAMBLE.size + len(encoded)] = encoded
+        for section, array in arrays.items():
+            start = header['sections'][section]['offset']
+            output[start:start + array.nbytes] = array.tobytes()
+        return bytes(output)
+
+    @classmethod
+    def from_buffer(cls, buffer: Any) -> 'MarketSnapshot':
+        """Read a snapshot whose arrays are views of `buffer` (bytes or a memory map), not copies"""
+        if len(buffer) < _PREAMBLE.size:
+            raise SnapshotFormatError("Snapshot is truncated")
+        magic, version, length = _PREAMBLE.unpack_from(buffer, 0)
+        if magic != MAGIC:
+            raise SnapshotFormatError("Not a market snapshot")
+        if version != FORMAT_VERSION:
+            raise SnapshotFormatError(f"Unsupported snapshot format version {version}")
+        header = json.loads(bytes(buffer[_PREAMBLE.size:_PREAMBLE.size + length]))
+        arrays = {}
+        for section, dtype in SECTIONS.items():
+            layout = header['sections'][section]
+            arrays[section] = np.frombuffer(buffer, dtype=dtype, count=layout['count'], offset=layout['offset'])
+        return cls(header['universe'], header['total_exposure'], arrays['exposure'], arrays['surprises'],
+                   arrays['factors'], overall=header['overall'], extra=header['extra'],
+                   created_at=header['created_at'], id=header['id'], buffer=buffer)
+
+
+class SnapshotStore:
+    def __init__(self, root: str, max_age: float = 60.0):
+        self.root = os.path.expanduser(root)
+        self.max_age = max_age
+        self.hits = 0
+        self.builds = 0
+        self.waits = 0
+        # Per key: the file identity we mapped and the snapshot read from it
+        self._mapped: Dict[str, Tuple[Tuple[int, int, int], MarketSnapshot]] = {}
+        self._lock = threading.Lock()
+        os.makedirs(self.root, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root, f"{quote(key, safe='')}.snap")
+
+    def read(self, key: str) -> Optional[MarketSnapshot]:
+        """The published snapshot for `key`, mapped once per version of the file"""
+        path = self._path(key)
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return None
+        identity = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            mapped = self._mapped.get(key)
+            if mapped is not None and mapped[0] == identity:
+                return mapped[1]
+        try:
+            with open(path, 'rb') as handle:
+                buffer = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+            snapshot = MarketSnapshot.from_buffer(buffer)
+        except (OSError, ValueError, KeyError, SnapshotFormatError) as e:
+            logger.warning(f"Ignoring unreadable snapshot {path}: {str(e)}")
+            return None
+        with self._lock:
+            self._mapped[key] = (identity, snapshot)
+        return snapshot
+
+    def publish(self, key: str, snapshot: MarketSnapshot):
+        """Replace the snapshot for `key`; readers switch to it on their next read"""
+        path = self._path(key)
+        temporary = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temporary, 'wb') as handle:
+            handle.write(snapshot.to_bytes())
+        os.replace(temporary, path)
+
+    def get_or_build(self, key: str, build: Callable[[], MarketSnapshot],
+                     max_age: Optional[float] = None, refresh: bool = False) -> MarketSnapshot:
+        """The shared snapshot while it is fresh; otherwise one worker on the host rebuilds it.
+        With `refresh`, only a snapshot built after this call started is fresh enough"""
+        max_age = self.max_age if max_age is None else max_age
+        requested = time.time()
+
+        def fresh(snapshot: Optional[MarketSnapshot]) -> bool:
+            if snapshot is None:
+                return False
+            return snapshot.created_at >= requested if refresh else snapshot.age < max_age
+
+        snapshot = self.read(key)
+        if fresh(snapshot):
+            with self._lock:
+                self.hits += 1
+            return snapshot
+
+        with open(f"{self._path(key)}.lock", 'a') as lock:
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                # Another worker may have rebuilt it while we waited for the lock
+                snapshot = self.read(key)
+                if fresh(snapshot):
+                    with self._lock:
+                        self.waits += 1
+                    return snapshot
+                built = build()
+                with self._lock:
+                    self.builds += 1
+                if not built.complete:
+                    # Partial data is served to this caller but not shared
+                    return built
+                self.publish(key, built)
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock, fcntl.LOCK_UN)
+        return self.read(key) or built
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {'hits': self.hits, 'builds': self.builds, 'waits': self.waits,
+                    'mapped': len(self._mapped), 'max_age': self.max_age}
+
+
+_default_store: Optional[SnapshotStore] = None
+_default_lock = threading.Lock()
+
+
+def get_default_snapshot_store() -> Optional[SnapshotStore]:
+    """Process-wide store under SNAPSHOT_DIR (e.g. /dev/shm/financial_agent); unset keeps
+    snapshots per process"""
+    global _default_store
+    root = os.getenv("SNAPSHOT_DIR")
+    if not root:
+        return None
+    with _default_lock:
+        if _default_store is None:
+            _default_store = SnapshotStore(root, max_age=float(os.getenv("SNAPSHOT_MAX_AGE", "60")))
+        return _default_store
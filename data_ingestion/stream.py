@@ -0,0 +1,441 @@
+"""
+Streaming bar ingestion into fixed-size in-memory ring buffers.
+
+A ``BarFeed`` yields ``Bar`` objects. ``ReplayFeed`` replays a CSV file or
+in-memory frames, and ``SocketFeed`` reads newline-delimited JSON from a TCP
+socket. ``FeedIngestor`` drains a feed on a background thread into a
+``MarketStream``. The stream keeps each symbol's most recent bars in
+preallocated NumPy arrays. It also updates the indicators that
+``get_market_sentiment`` needs as each bar arrives: the change over the
+sentiment lookback for every symbol, and with it the index trend and the
+yield change. A bar with the same timestamp as the symbol's latest bar
+updates that bar in place, so tick feeds can stream a bar while it is still
+forming.
+
+Reads never scan history. ``window_return`` and ``change`` are two array
+lookups, and ``sentiment`` is built from the stored changes of the requested
+indices.
+"""
+import csv
+import json
+import logging
+import math
+import os
+import socket
+import threading
+import time
+from typing import Any, Dict, Iterable, Iterator, List, NamedTuple, Optional
+
+import numpy as np
+import pandas as pd
+
+from analytics.panel import classify_sentiment
+from observability.metrics import counter
+
+logger = logging.getLogger(__name__)
+
+streamed_bars = counter('market_stream_bars', "Bars received from the market feed", ['outcome'])
+
+# Column order of a stored bar
+FIELDS = ('open', 'high', 'low', 'close', 'volume')
+
+
+class Bar(NamedTuple):
+    symbol: str
+    timestamp: pd.Timestamp
+    open: float
+    high: float
+    low: float
+    close: float
+    volume: float = float('nan')
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'Bar':
+        close = float(data['close'])
+        return cls(
+            symbol=str(data['symbol']),
+            timestamp=pd.Timestamp(data['timestamp']),
+            open=float(data.get('open') or close),
+            high=float(data.get('high') or close),
+            low=float(data.get('low') or close),
+            close=close,
+            volume=float(data.get('volume') or 'nan'),
+        )
+
+
+def _nanos(timestamp: pd.Timestamp) -> int:
+    timestamp = pd.Timestamp(timestamp)
+    if timestamp.tzinfo is None:
+        timestamp = timestamp.tz_localize('UTC')
+    return int(timestamp.value)
+
+
+class RingBuffer:
+    """The last `capacity` bars of one symbol in preallocated arrays"""
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.timestamps = np.zeros(capacity, dtype='int64')
+        self.values = np.full((capacity, len(FIELDS)), np.nan)
+        self.count = 0
+        # Slot of the latest bar
+        self.last = -1
+
+    def append(self, timestamp: int, values: np.ndarray) -> Optional[bool]:
+        """True for a new bar, False for an update of the latest one, None if out of order"""
+        if self.count and timestamp < self.timestamps[self.last]:
+            return None
+        if self.count and timestamp == self.timestamps[self.last]:
+            current = self.values[self.last]
+            # Keep the bar's open, widen its range, take the latest close and volume
+            current[1] = np.fmax(current[1], values[1])
+            current[2] = np.fmin(current[2], values[2])
+            current[3:] = values[3:]
+            return False
+        self.last = (self.last + 1) % self.capacity
+        self.timestamps[self.last] = timestamp
+        self.values[self.last] = values
+        self.count = min(self.count + 1, self.capacity)
+        return True
+
+    def ago(self, bars: int, field: int = 3) -> float:
+        """Value of `field` (close by default) `bars` bars before the latest, NaN if not held"""
+        if bars >= self.count:
+            return float('nan')
+        return float(self.values[(self.last - bars) % self.capacity, field])
+
+    def latest_timestamp(self) -> Optional[pd.Timestamp]:
+        return pd.Timestamp(int(self.timestamps[self.last]), tz='UTC') if self.count else None
+
+    def frame(self) -> pd.DataFrame:
+        """Held bars, oldest first (a copy)"""
+        order = (self.last - np.arange(self.count)[::-1]) % self.capacity
+        index = pd.to_datetime(self.timestamps[order], utc=True)
+        return pd.DataFrame(self.values[order], index=index,
+                            columns=[field.capitalize() for field in FIELDS])
+
+
+class MarketStream:
+    def __init__(self, capacity: int = 512, lookback: int = 5, max_age: Optional[float] = None):
+        self.capacity = capacity
+        # Bars per change, matching MarketDataAgent.sentiment_lookback
+        self.lookback = lookback
+        # Seconds without any bar after which the stream no longer answers
+        self.max_age = max_age
+        self._buffers: Dict[str, RingBuffer] = {}
+        self._changes: Dict[str, float] = {}
+        self._point_changes: Dict[str, float] = {}
+        self._seeded = set()
+        self._lock = threading.Lock()
+        self.bars = 0
+        self.dropped = 0
+        self.updated_at: Optional[float] = None
+
+    def on_bar(self, bar: Bar):
+        """Store a bar and update its symbol's indicators, O(1)"""
+        values = np.array([bar.open, bar.high, bar.low, bar.close, bar.volume], dtype='float64')
+        with self._lock:
+            buffer = self._buffers.get(bar.symbol)
+            if buffer is None:
+                buffer = self._buffers[bar.symbol] = RingBuffer(self.capacity)
+            added = buffer.append(_nanos(bar.timestamp), values)
+            if added is None:
+                self.dropped += 1
+                streamed_bars.inc(outcome='out_of_order')
+                return
+            self._update_indicators(bar.symbol, buffer)
+            self.bars += 1
+            self.updated_at = time.time()
+        streamed_bars.inc(outcome='new' if added else 'update')
+
+    def _update_indicators(self, symbol: str, buffer: RingBuffer):
+        # A period over `lookback` bars spans lookback - 1 bar-to-bar moves
+        first, last = buffer.ago(self.lookback - 1), buffer.ago(0)
+        self._changes[symbol] = (last / first - 1) * 100 if first else float('nan')
+        self._point_changes[symbol] = last - first
+
+    def seed(self, history: Dict[str, pd.DataFrame]):
+        """Fill in bars older than anything streamed so far, e.g. from the history store"""
+        with self._lock:
+            for symbol, frame in history.items():
+                if frame is None or frame.empty:
+                    continue
+                existing = self._buffers.get(symbol)
+                columns = frame.reindex(columns=[field.capitalize() for field in FIELDS])
+                if existing is not None and existing.count:
+                    columns = pd.concat([columns[columns.index < existing.frame().index[0]], existing.frame()])
+                buffer = RingBuffer(self.capacity)
+                for timestamp, values in zip(columns.index[-self.capacity:],
+                                             columns.to_numpy(dtype='float64')[-self.capacity:]):
+                    buffer.append(_nanos(timestamp), values)
+                self._buffers[symbol] = buffer
+                self._update_indicators(symbol, buffer)
+            self._seeded.update(history)
+
+    def unseeded(self, symbols: Iterable[str]) -> List[str]:
+        """Symbols short of a full lookback that have not been seeded yet"""
+        with self._lock:
+            return [symbol for symbol in symbols if symbol not in self._seeded and
+                    (symbol not in self._buffers or self._buffers[symbol].count < self.lookback)]
+
+    def fresh(self) -> bool:
+        if self.updated_at is None:
+            return False
+        return self.max_age is None or time.time() - self.updated_at <= self.max_age
+
+    def covers(self, symbols: Iterable[str]) -> bool:
+        """Whether every symbol has a full lookback of bars"""
+        with self._lock:
+            return all(symbol in self._buffers and self._buffers[symbol].count >= self.lookback
+                       for symbol in symbols)
+
+    def latest(self, symbol: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            buffer = self._buffers.get(symbol)
+            if buffer is None or not buffer.count:
+                return None
+            bar = dict(zip(FIELDS, buffer.values[buffer.last].tolist()))
+            bar['timestamp'] = buffer.latest_timestamp()
+            return bar
+
+    def window_return(self, symbol: str, window: int) -> float:
+        """Percent return over the last `window` bars, O(1)"""
+        with self._lock:
+            buffer = self._buffers.get(symbol)
+            if buffer is None:
+                return float('nan')
+            start, end = buffer.ago(window), buffer.ago(0)
+        return (end / start - 1) * 100 if start else float('nan')
+
+    def change(self, symbol: str, relative: bool = True) -> float:
+        """Change over the sentiment lookback: percent, or points when not relative"""
+        with self._lock:
+            changes = self._changes if relative else self._point_changes
+            return changes.get(symbol, float('nan'))
+
+    def sentiment(self, indices: Dict[str, str], treasury_symbol: Optional[str] = None,
+                  lookback: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        """``get_market_sentiment`` from the streamed indicators; None unless the stream
+        is fresh and holds a full lookback for every symbol"""
+        symbols = list(indices) + ([treasury_symbol] if treasury_symbol else [])
+        if (lookback is not None and lookback != self.lookback) or not self.fresh() or not self.covers(symbols):
+            return None
+
+        factors = []
+        positive = total = 0
+        for symbol, name in indices.items():
+            change = self.change(symbol)
+            if math.isnan(change):
+                continue
+            factors.append({'index': name, 'change': change, 'trend': 'up' if change > 0 else 'down'})
+            positive += change > 0
+            total += 1
+        if treasury_symbol:
+            yield_change = self.change(treasury_symbol, relative=False)
+            if not math.isnan(yield_change):
+                factors.append({
+                    'factor': 'US 10Y Yield',
+                    'change': yield_change,
+                    'impact': 'cautionary' if yield_change > 0 else 'supportive'
+                })
+                # Falling yields are supportive
+                positive += yield_change <= 0
+                total += 1
+        if not total:
+            return None
+        return {'overall': classify_sentiment(positive / total), 'factors': factors, 'source': 'stream'}
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'symbols': len(self._buffers),
+                'bars': self.bars,
+                'dropped': self.dropped,
+                'age_seconds': round(time.time() - self.updated_at, 3) if self.updated_at else None,
+            }
+
+
+class BarFeed:
+    """Source of bars for a MarketStream"""
+
+    # Malformed messages skipped
+    dropped = 0
+
+    def __iter__(self) -> Iterator[Bar]:
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class ReplayFeed(BarFeed):
+    """Replays recorded bars in timestamp order, paced at `speed` times real time (0: no pacing)"""
+
+    def __init__(self, bars: Iterable[Bar], speed: float = 0.0):
+        self.bars = bars
+        self.speed = speed
+        self._closed = threading.Event()
+
+    @classmethod
+    def from_csv(cls, path: str, speed: float = 0.0) -> 'ReplayFeed':
+        """CSV with timestamp,symbol,close and optional open,high,low,volume columns"""
+        with open(path, newline='') as handle:
+            bars = [Bar.from_dict(row) for row in csv.DictReader(handle)]
+        return cls(sorted(bars, key=lambda bar: _nanos(bar.timestamp)), speed)
+
+    @classmethod
+    def from_frames(cls, history: Dict[str, pd.DataFrame], speed: float = 0.0) -> 'ReplayFeed':
+        """Interleave per-symbol OHLCV frames (e.g. FakeProvider history) into one feed"""
+        bars = []
+        for symbol, frame in history.items():
+            for timestamp, row in frame.iterrows():
+                bars.append(Bar(symbol, timestamp, row.get('Open', row['Close']), row.get('High', row['Close']),
+                                row.get('Low', row['Close']), row['Close'], row.get('Volume', float('nan'))))
+        return cls(sorted(bars, key=lambda bar: _nanos(bar.timestamp)), speed)
+
+    def __iter__(self) -> Iterator[Bar]:
+        previous = None
+        for bar in self.bars:
+            if self._closed.is_set():
+                return
+            if self.speed and previous is not None:
+                delay = (_nanos(bar.timestamp) - previous) / 1e9 / self.speed
+                if delay > 0 and self._closed.wait(delay):
+                    return
+            previous = _nanos(bar.timestamp)
+            yield bar
+
+    def close(self):
+        self._closed.set()
+
+
+class SocketFeed(BarFeed):
+    """Newline-delimited JSON bars from a TCP server, reconnecting with backoff"""
+
+    def __init__(self, host: str, port: int, reconnect_delay: float = 1.0, max_delay: float = 30.0):
+        self.host = host
+        self.port = port
+        self.reconnect_delay = reconnect_delay
+        self.max_delay = max_delay
+        self._closed = threading.Event()
+        self._socket: Optional[socket.socket] = None
+
+    def __iter__(self) -> Iterator[Bar]:
+        delay = self.reconnect_delay
+        while not self._closed.is_set():
+            try:
+                with socket.create_connection((self.host, self.port), timeout=10) as connection:
+                    connection.settimeout(None)
+                    self._socket = connection
+                    delay = self.reconnect_delay
+                    for line in connection.makefile('r', encoding='utf-8'):
+                        if not line.strip():
+                            continue
+                        # A bad line is skipped, not a reason to drop the connection
+                        try:
+                            bar = Bar.from_dict(json.loads(line))
+                        except (ValueError, KeyError, TypeError, AttributeError) as e:
+                            self.dropped += 1
+                            streamed_bars.inc(outcome='malformed')
+                            logger.warning(f"Skipping malformed bar from {self.host}:{self.port}: {str(e)}")
+                            continue
+                        yield bar
+            except (OSError, ValueError, KeyError) as e:
+                if self._closed.is_set():
+                    return
+                logger.warning(f"Market feed {self.host}:{self.port} error: {str(e)}; reconnecting in {delay:.0f}s")
+            if self._closed.wait(delay):
+                return
+            delay = min(delay * 2, self.max_delay)
+
+    def close(self):
+        self._closed.set()
+        if self._socket is not None:
+            try:
+                self._socket.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+
+class FeedIngestor:
+    """Drains a feed into a stream on a background thread"""
+
+    def __init__(self, feed: BarFeed, stream: MarketStream, restart_delay: float = 5.0):
+        self.feed = feed
+        self.stream = stream
+        self.restart_delay = restart_delay
+        self.errors = 0
+        self._thread: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+
+    def _loop(self):
+        while not self._stopped.is_set():
+            try:
+                for bar in self.feed:
+                    try:
+                        self.stream.on_bar(bar)
+                    except Exception as e:
+                        self.errors += 1
+                        logger.error(f"Dropping bar for {bar.symbol}: {str(e)}")
+                break
+            except Exception as e:
+                # Keep the thread alive; otherwise the stream goes stale and the API quietly polls
+                self.errors += 1
+                logger.error(f"Market feed failed: {str(e)}; restarting in {self.restart_delay:.0f}s")
+                if self._stopped.wait(self.restart_delay):
+                    break
+        logger.info("Market feed ended")
+
+    def start(self) -> 'FeedIngestor':
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name='market-feed', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stopped.set()
+        self.feed.close()
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def stats(self) -> Dict[str, Any]:
+        return dict(self.stream.stats(), running=self.running, errors=self.errors,
+                    malformed=self.feed.dropped)
+
+
+def feed_from_spec(spec: str) -> BarFeed:
+    """'replay:/path/bars.csv[@speed]' or 'socket:host:port'"""
+    kind, _, target = spec.partition(':')
+    if kind == 'replay':
+        path, _, speed = target.partition('@')
+        return ReplayFeed.from_csv(path, float(speed or 0))
+    if kind == 'socket':
+        host, _, port = target.rpartition(':')
+        return SocketFeed(host, int(port))
+    raise ValueError(f"Unknown market feed '{spec}'; use replay:<path>[@speed] or socket:<host>:<port>")
+
+
+_default_ingestor: Optional[FeedIngestor] = None
+_default_lock = threading.Lock()
+
+
+def get_default_ingestor() -> Optional[FeedIngestor]:
+    """Process-wide ingestor for MARKET_FEED, started on first use; None when unset"""
+    global _default_ingestor
+    spec = os.getenv("MARKET_FEED", "")
+    if not spec:
+        return None
+    with _default_lock:
+        if _default_ingestor is None:
+            max_age = float(os.getenv("MARKET_FEED_MAX_AGE", "300"))
+            stream = MarketStream(capacity=int(os.getenv("MARKET_FEED_CAPACITY", "512")),
+                                  max_age=max_age if max_age > 0 else None)
+            _default_ingestor = FeedIngestor(feed_from_spec(spec), stream).start()
+        return _default_ingestor
+
+
+def get_default_stream() -> Optional[MarketStream]:
+    ingestor = get_default_ingestor()
+    return ingestor.stream if ingestor is not None else None
@@ -0,0 +1,93 @@
+"""
+Symbol universes loaded from configuration.
+
+A universe is the set of stocks, sentiment indices and the rates symbol a
+MarketDataAgent covers. Universes live in a YAML file (see
+config/universes.yaml) or a flat CSV with ``universe,symbol,name,kind`` rows
+where kind is ``stock``, ``index`` or ``rate``.
+"""
+import csv
+import functools
+import os
+from dataclasses import dataclass, field
+from typing import Dict, Optional
+
+DEFAULT_UNIVERSE_FILE = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'config', 'universes.yaml'
+)
+
+
+@dataclass
+class Universe:
+    name: str
+    stocks: Dict[str, str]
+    indices: Dict[str, str] = field(default_factory=dict)
+    treasury_symbol: Optional[str] = None
+    description: str = ''
+
+
+def _load_yaml(path: str) -> Dict[str, Universe]:
+    try:
+        import yaml
+    except ImportError:
+        raise ImportError("PyYAML is required for YAML universe files; install pyyaml or use CSV")
+
+    with open(path) as handle:
+        config = yaml.safe_load(handle) or {}
+
+    universes = {}
+    for name, spec in (config.get('universes') or {}).items():
+        universes[name] = Universe(
+            name=name,
+            # Codes such as 005930.KS must stay strings even if YAML reads them as numbers
+            stocks={str(symbol): str(label) for symbol, label in (spec.get('stocks') or {}).items()},
+            indices={str(symbol): str(label) for symbol, label in (spec.get('indices') or {}).items()},
+            treasury_symbol=spec.get('rates'),
+            description=spec.get('description', '')
+        )
+    default = config.get('default')
+    if default and default in universes:
+        universes['default'] = universes[default]
+    return universes
+
+
+def _load_csv(path: str) -> Dict[str, Universe]:
+    universes = {}
+    with open(path, newline='') as handle:
+        for row in csv.DictReader(handle):
+            name = row['universe'].strip()
+            universe = universes.setdefault(name, Universe(name=name, stocks={}))
+            symbol = row['symbol'].strip()
+            label = (row.get('name') or symbol).strip()
+            kind = (row.get('kind') or 'stock').strip().lower()
+            if kind == 'index':
+                universe.indices[symbol] = label
+            elif kind == 'rate':
+                universe.treasury_symbol = symbol
+            else:
+                universe.stocks[symbol] = label
+    return universes
+
+
+@functools.lru_cache(maxsize=16)
+def _load(path: str, mtime: float) -> Dict[str, Universe]:
+    if path.lower().endswith('.csv'):
+        return _load_csv(path)
+    return _load_yaml(path)
+
+
+def load_universes(path: Optional[str] = None) -> Dict[str, Universe]:
+    """Load every universe defined in a YAML or CSV file, re-reading it only when it changes"""
+    path = path or os.getenv("MARKET_UNIVERSE_FILE", DEFAULT_UNIVERSE_FILE)
+    return _load(path, os.path.getmtime(path))
+
+
+def get_universe(name: Optional[str] = None, path: Optional[str] = None) -> Universe:
+    """Look up a universe by name, defaulting to MARKET_UNIVERSE or the file's default"""
+    universes = load_universes(path)
+    name = name or os.getenv("MARKET_UNIVERSE") or 'default'
+    if name not in universes:
+        if name == 'default' and universes:
+            return next(iter(universes.values()))
+        raise KeyError(f"Unknown universe '{name}'. Available: {', '.join(sorted(universes))}")
+    return universes[name]
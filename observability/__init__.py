@@ -0,0 +1,7 @@
+"""
+Tracing, metrics and profiling for the brief pipeline.
+
+``tracing`` records per-request spans for each pipeline stage, ``metrics``
+keeps Prometheus counters and histograms, and ``profiler`` samples stacks
+of slow requests. None of them needs a third-party package.
+"""
@@ -0,0 +1,84 @@
+"""
+Sampling profiler for slow requests.
+
+``SamplingProfiler`` wakes every ``interval`` seconds and records the
+current stack of every other busy thread in the process, folded into
+``outer;...;inner`` strings. That is the input format of flamegraph
+tools. It needs no tracing hooks, so the profiled code runs at full speed
+and the cost is one stack walk per thread per sample.
+
+Enable it for API requests with ``PROFILE_SLOW_SECONDS``. Every request is
+then sampled, and the profile is kept on the trace only when the request
+took at least that long. Requests run concurrently, so a profile can
+include stacks from other requests' threads.
+"""
+import os
+import sys
+import threading
+from collections import Counter
+from typing import Any, Dict, Optional
+
+PROFILE_SLOW_SECONDS = os.getenv("PROFILE_SLOW_SECONDS")
+PROFILE_INTERVAL = float(os.getenv("PROFILE_INTERVAL", "0.01"))
+
+# Where idle threads sit: pool workers waiting for work, the event loop polling
+_IDLE_FILES = ('threading.py', 'queue.py', 'thread.py', 'selectors.py')
+
+
+def _idle(frame) -> bool:
+    if frame.f_code.co_filename.endswith('selectors.py'):
+        return True
+    parent = frame.f_back
+    return (frame.f_code.co_filename.endswith(_IDLE_FILES) and parent is not None
+            and parent.f_code.co_filename.endswith(_IDLE_FILES))
+
+
+def _fold(frame, max_depth: int = 64) -> str:
+    names = []
+    while frame is not None and len(names) < max_depth:
+        code = frame.f_code
+        names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+        frame = frame.f_back
+    return ';'.join(reversed(names))
+
+
+class SamplingProfiler:
+    def __init__(self, interval: float = PROFILE_INTERVAL):
+        self.interval = interval
+        self.samples = 0
+        self.stacks: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _sample(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id != own and not _idle(frame):
+                    self.stacks[_fold(frame)] += 1
+            self.samples += 1
+
+    def start(self) -> 'SamplingProfiler':
+        self._thread = threading.Thread(target=self._sample, name='sampling-profiler', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> 'SamplingProfiler':
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        return self
+
+    def report(self, top: int = 25) -> Dict[str, Any]:
+        """The most frequent folded stacks with their sample counts"""
+        return {
+            'interval': self.interval,
+            'samples': self.samples,
+            'stacks': [{'stack': stack, 'count': count}
+                       for stack, count in self.stacks.most_common(top)],
+        }
+
+
+def slow_threshold() -> Optional[float]:
+    """Seconds from PROFILE_SLOW_SECONDS, or None when profiling is off"""
+    return float(PROFILE_SLOW_SECONDS) if PROFILE_SLOW_SECONDS else None
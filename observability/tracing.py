@@ -0,0 +1,219 @@
+"""
+Per-request tracing spans.
+
+A ``Trace`` is started for each API request or brief job and carried in a
+context variable, so every ``span`` opened while serving it, on the event
+loop or on a worker thread the context was copied to, is attached to it.
+Spans form a tree (each records its parent) and carry free-form attributes
+such as symbol counts or token usage.
+
+Every span also feeds the ``stage_duration_seconds`` histogram, labelled by
+stage name, whether or not a trace is active. Finished traces are kept in a
+bounded in-memory history. Traces slower than ``TRACE_SLOW_SECONDS`` are
+logged with a per-stage breakdown.
+"""
+import contextvars
+import functools
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional
+
+from observability.metrics import counter, histogram
+
+logger = logging.getLogger(__name__)
+
+TRACE_SLOW_SECONDS = float(os.getenv("TRACE_SLOW_SECONDS", "5"))
+TRACE_HISTORY = int(os.getenv("TRACE_HISTORY", "200"))
+
+stage_duration = histogram('stage_duration_seconds', "Duration of pipeline stages", ['stage'])
+stage_errors = counter('stage_errors', "Pipeline stages that raised", ['stage'])
+trace_duration = histogram('trace_duration_seconds', "Duration of whole traces", ['name'])
+
+_current_trace: contextvars.ContextVar[Optional['Trace']] = contextvars.ContextVar('trace', default=None)
+_current_span: contextvars.ContextVar[Optional['Span']] = contextvars.ContextVar('span', default=None)
+
+
+class Span:
+    __slots__ = ('name', 'span_id', 'parent_id', 'start', 'end', 'attrs', 'error', 'thread')
+
+    def __init__(self, name: str, parent_id: Optional[str] = None, start: Optional[float] = None,
+                 **attrs):
+        self.name = name
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent_id
+        self.start = time.monotonic() if start is None else start
+        self.end: Optional[float] = None
+        self.attrs: Dict[str, Any] = attrs
+        self.error: Optional[str] = None
+        self.thread = threading.current_thread().name
+
+    @property
+    def duration(self) -> float:
+        return (self.end if self.end is not None else time.monotonic()) - self.start
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def to_dict(self, origin: float) -> Dict[str, Any]:
+        span = {
+            'name': self.name,
+            'span_id': self.span_id,
+            'parent_id': self.parent_id,
+            'offset': round(self.start - origin, 6),
+            'duration': round(self.duration, 6),
+            'thread': self.thread,
+        }
+        if self.attrs:
+            span['attrs'] = self.attrs
+        if self.error is not None:
+            span['error'] = self.error
+        return span
+
+
+class Trace:
+    def __init__(self, name: str, trace_id: Optional[str] = None, **attrs):
+        self.name = name
+        self.trace_id = trace_id or uuid.uuid4().hex
+        self.attrs: Dict[str, Any] = attrs
+        self.start = time.monotonic()
+        self.end: Optional[float] = None
+        self.spans: List[Span] = []
+        self.profile: Optional[Dict[str, Any]] = None
+        self._lock = threading.Lock()
+
+    @property
+    def duration(self) -> float:
+        return (self.end if self.end is not None else time.monotonic()) - self.start
+
+    def add(self, span: Span):
+        with self._lock:
+            self.spans.append(span)
+
+    def stages(self) -> Dict[str, float]:
+        """Total seconds spent per stage name"""
+        totals: Dict[str, float] = {}
+        with self._lock:
+            spans = list(self.spans)
+        for span in spans:
+            totals[span.name] = totals.get(span.name, 0.0) + span.duration
+        return {name: round(seconds, 6) for name, seconds in totals.items()}
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            spans = sorted(self.spans, key=lambda span: span.start)
+        trace = {
+            'trace_id': self.trace_id,
+            'name': self.name,
+            'duration': round(self.duration, 6),
+            'attrs': self.attrs,
+            'stages': self.stages(),
+            'spans': [span.to_dict(self.start) for span in spans],
+        }
+        if self.profile is not None:
+            trace['profile'] = self.profile
+        return trace
+
+
+_history: Deque[Trace] = deque(maxlen=TRACE_HISTORY)
+_slow: Deque[Trace] = deque(maxlen=TRACE_HISTORY)
+_history_lock = threading.Lock()
+
+
+def current_trace() -> Optional[Trace]:
+    return _current_trace.get()
+
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+
+def _finish(trace: Trace):
+    trace_duration.observe(trace.duration, name=trace.name)
+    slow = trace.duration >= TRACE_SLOW_SECONDS
+    with _history_lock:
+        _history.append(trace)
+        if slow:
+            _slow.append(trace)
+    if slow:
+        logger.warning("Slow %s %s took %.3fs: %s", trace.name, trace.trace_id,
+                       trace.duration, json.dumps(trace.stages()))
+
+
+@contextmanager
+def trace(name: str, trace_id: Optional[str] = None, **attrs) -> Iterator[Trace]:
+    """Start a trace that spans opened in this context attach to"""
+    current = Trace(name, trace_id, **attrs)
+    trace_token = _current_trace.set(current)
+    span_token = _current_span.set(None)
+    try:
+        yield current
+    finally:
+        current.end = time.monotonic()
+        _current_span.reset(span_token)
+        _current_trace.reset(trace_token)
+        _finish(current)
+
+
+def _close(span: Span, error: Optional[BaseException] = None):
+    span.end = time.monotonic() if span.end is None else span.end
+    if error is not None:
+        span.error = f"{type(error).__name__}: {error}"
+        stage_errors.inc(stage=span.name)
+    stage_duration.observe(span.duration, stage=span.name)
+    active = _current_trace.get()
+    if active is not None:
+        active.add(span)
+
+
+@contextmanager
+def span(name: str, **attrs) -> Iterator[Span]:
+    """Time a stage; the yielded span accepts extra attributes via ``set``"""
+    parent = _current_span.get()
+    current = Span(name, parent.span_id if parent else None, **attrs)
+    token = _current_span.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        _current_span.reset(token)
+        _close(current, e)
+        raise
+    _current_span.reset(token)
+    _close(current)
+
+
+def record(name: str, start: float, end: Optional[float] = None, **attrs) -> Span:
+    """Add a span for a stage timed elsewhere (monotonic start and end), e.g. from a callback"""
+    parent = _current_span.get()
+    finished = Span(name, parent.span_id if parent else None, start=start, **attrs)
+    finished.end = time.monotonic() if end is None else end
+    _close(finished)
+    return finished
+
+
+def traced(name: str) -> Callable:
+    """Decorator form of ``span``"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def in_context(func: Callable[..., Any]) -> Callable[..., Any]:
+    """Bind func to the caller's context so spans from another thread join its trace"""
+    context = contextvars.copy_context()
+    return functools.partial(context.run, func)
+
+
+def recent_traces(limit: int = 20, slow_only: bool = False) -> List[Dict[str, Any]]:
+    with _history_lock:
+        traces = list(_slow if slow_only else _history)
+    return [trace.to_dict() for trace in reversed(traces[-limit:])]
@@ -1,31 +1,206 @@
-from fastapi import FastAPI, HTTPException
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
 from pydantic import BaseModel
-from typing import Optional, List
-import whisper
+from typing import Optional, List, Dict, Any, AsyncIterator
 import numpy as np
 import sys
 import os
+import time
+import json
+import math
+import asyncio
 
 # Add parent directory to Python path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from orchestrator.crew_manager import FinancialCrew
+from orchestrator.startup import LOADING, LazyResource, profile, readiness, warm_up
+
+# Heavy dependencies (crewai, whisper) are not imported here; see the lazy resources below
+_imports_started = time.monotonic()
+from orchestrator.executors import DeadlineExceeded, PoolSaturated, pool_from_env
+from orchestrator.jobs import BriefJob, JobQueue, Priority
+from orchestrator.brief_cache import get_default_brief_cache
+from orchestrator.scheduler import scheduler_from_env
+from orchestrator import router
+from data_ingestion.cache import get_default_cache
+from data_ingestion.stream import get_default_ingestor
+from data_ingestion.earnings_index import get_default_earnings_index
+from data_ingestion.snapshot import get_default_snapshot_store
+from voice.whisper_service import WhisperBatcher, WhisperClient, parse_address
+from voice.audio import (AudioDecodeError, PayloadTooLarge, PCM_ENCODINGS, WHISPER_SAMPLE_RATE,
+                         decode_pcm, decode_upload, prepare_for_whisper, read_stream)
+from voice.streaming import StreamingTranscriber
+from observability import tracing
+from observability.metrics import REGISTRY, counter, histogram, stats_families
+from observability.profiler import SamplingProfiler, slow_threshold
 import logging
+profile.record("import:api_modules", _imports_started)
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-app = FastAPI()
+# Blocking work runs on dedicated pools so the event loop stays responsive
+# STT workers only wait on the Whisper batcher, so several can be in flight to form batches
+stt_pool = pool_from_env("stt", workers=8, queue=16, timeout=60)
+crew_pool = pool_from_env("crew", workers=2, queue=8, timeout=180)
+REQUEST_TIMEOUT = float(os.getenv("REQUEST_TIMEOUT", "240"))
+AUDIO_MAX_BYTES = int(os.getenv("AUDIO_MAX_BYTES", str(20 * 1024 * 1024)))
+AUDIO_CHUNK_BYTES = 64 * 1024
+WHISPER_SERVICE_ADDRESS = os.getenv("WHISPER_SERVICE_ADDRESS")
+
+def load_crew_class():
+    """Import crewai/langchain through the crew manager"""
+    with profile.measure("import:crewai"):
+        from orchestrator.crew_manager import FinancialCrew
+    return FinancialCrew
+
+def load_stt_model():
+    """Whisper for STT: a shared inference service when configured,
+    otherwise an in-process batcher that owns the model"""
+    if WHISPER_SERVICE_ADDRESS:
+        logger.info(f"Using Whisper service at {WHISPER_SERVICE_ADDRESS}")
+        return WhisperClient(parse_address(WHISPER_SERVICE_ADDRESS))
+    
+    try:
+        logger.info("Loading Whisper model...")
+        with profile.measure("import:whisper"):
+            import whisper
+        with profile.measure("init:whisper_model"):
+            whisper_model = whisper.load_model(os.getenv("WHISPER_MODEL", "base"))
+        logger.info("Whisper model loaded successfully")
+    except Exception as e:
+        logger.error(f"Error loading Whisper model: {str(e)}")
+        raise
+    return WhisperBatcher(
+        whisper_model,
+        max_batch=int(os.getenv("WHISPER_MAX_BATCH", "8")),
+        max_wait=float(os.getenv("WHISPER_MAX_WAIT", "0.05"))
+    )
+
+def load_market_data():
+    """One MarketDataAgent for the panels and snapshot lookups, instead of a crew per request"""
+    from agents.market_data_agent import MarketDataAgent
+    return MarketDataAgent()
+
+crew_class = LazyResource("crew", load_crew_class)
+market_data_agent = LazyResource("market_data", load_market_data, required=False)
+# Text briefs keep working without speech recognition, so STT is not required for readiness
+stt_model = LazyResource("stt", load_stt_model, required=False)
+resources = [crew_class, stt_model]
+
+def new_crew():
+    """A crew for one brief; raises when crewai failed to load"""
+    crew = crew_class.get()
+    if crew is None:
+        raise RuntimeError(f"crew not available: {crew_class.error or 'failed to load'}")
+    return crew()
+
+# Pre-market warm-up runs only when BRIEF_SCHEDULE is set
+def synthesize_brief(text: str) -> bytes:
+    """Pre-rendered brief audio; its sentences stay in the TTS cache for later requests"""
+    from voice.tts import get_default_tts
+    return get_default_tts().synthesize(text)
+
+scheduler = scheduler_from_env(
+    new_crew,
+    synthesize=synthesize_brief if os.getenv("BRIEF_PRERENDER_AUDIO", "off").lower() in ('1', 'on', 'true', 'yes') else None
+)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    warm_up(resources)
+    if scheduler is not None:
+        scheduler.start()
+    yield
+    if scheduler is not None:
+        scheduler.stop()
+
+app = FastAPI(lifespan=lifespan)
+
+http_requests = counter('http_requests', "HTTP requests served", ['method', 'route', 'status'])
+http_duration = histogram('http_request_duration_seconds', "HTTP request latency", ['method', 'route'])
+# Probes and scrapes are counted but not kept in the trace history
+UNTRACED_PATHS = {"/metrics", "/health/live", "/health/ready"}
+
+@app.middleware("http")
+async def trace_requests(request: Request, call_next):
+    """Trace each request, export its latency and profile it when slow-request profiling is on"""
+    if request.url.path in UNTRACED_PATHS:
+        response = await call_next(request)
+        http_requests.inc(method=request.method, route=request.url.path, status=response.status_code)
+        return response
+    
+    threshold = slow_threshold()
+    sampler = SamplingProfiler().start() if threshold is not None else None
+    status = 500
+    with tracing.trace("http", request.headers.get("x-request-id"),
+                       method=request.method, path=request.url.path) as current:
+        try:
+            response = await call_next(request)
+            status = response.status_code
+        finally:
+            # Label by route template, not the raw path, to keep label cardinality bounded
+            route = getattr(request.scope.get("route"), "path", "unmatched")
+            current.attrs.update(route=route, status=status)
+            http_requests.inc(method=request.method, route=route, status=status)
+            http_duration.observe(current.duration, method=request.method, route=route)
+            if sampler is not None:
+                sampler.stop()
+                if current.duration >= threshold:
+                    current.profile = sampler.report()
+    
+    response.headers["X-Trace-Id"] = current.trace_id
+    response.headers["Server-Timing"] = ", ".join(
+        f"{stage};dur={seconds * 1000:.1f}" for stage, seconds in current.stages().items()
+    )
+    return response
+
+def collect_component_stats():
+    """Expose the pools', queues' and caches' own counters as gauges at scrape time"""
+    feed = get_default_ingestor()
+    snapshots = get_default_snapshot_store()
+    return stats_families([
+        ("worker_pool", {"pool": "stt"}, stt_pool.stats()),
+        ("worker_pool", {"pool": "crew"}, crew_pool.stats()),
+        ("brief_jobs", {}, job_queue.stats()),
+        ("brief_cache", {}, get_default_brief_cache().stats()),
+        ("market_data_cache", {}, get_default_cache().stats()),
+        ("whisper", {}, whisper_stats()),
+        ("market_stream", {}, feed.stats() if feed is not None else None),
+        ("earnings_index", {}, get_default_earnings_index().stats()),
+        ("market_snapshot", {}, snapshots.stats() if snapshots is not None else None),
+    ])
+
+REGISTRY.add_collector(collect_component_stats)
+
+async def require(resource: LazyResource):
+    """Resolve a lazy resource without blocking the event loop"""
+    if resource.state == LOADING:
+        raise HTTPException(status_code=503, detail=f"{resource.name} is warming up",
+                            headers={"Retry-After": "5"})
+    if resource.ready:
+        return resource.get()
+    return await asyncio.to_thread(resource.get)
 
-# Initialize Whisper model for STT
-try:
-    logger.info("Loading Whisper model...")
-    model = whisper.load_model("base")
-    logger.info("Whisper model loaded successfully")
-except Exception as e:
-    logger.error(f"Error loading Whisper model: {str(e)}")
-    model = None
+async def require_stt():
+    model = await require(stt_model)
+    if model is None:
+        raise HTTPException(status_code=500, detail="Speech recognition model not initialized")
+    return model
+
+async def require_crew():
+    crew = await require(crew_class)
+    if crew is None:
+        raise HTTPException(status_code=503, detail=f"crew not available: {crew_class.error or 'failed to load'}")
+    return crew
+
+async def require_market_data():
+    market_data = await require(market_data_agent)
+    if market_data is None:
+        raise HTTPException(status_code=503, detail=f"market data not available: {market_data_agent.error or 'failed to load'}")
+    return market_data
 
 class AudioInput(BaseModel):
     audio_data: List[float]
@@ -34,55 +209,406 @@ class AudioInput(BaseModel):
 class TextInput(BaseModel):
     text: str
 
+class BriefRequest(BaseModel):
+    text: Optional[str] = None
+    audio_data: Optional[List[float]] = None
+    sample_rate: Optional[int] = None
+    priority: Optional[str] = None
+
+@app.exception_handler(PoolSaturated)
+async def pool_saturated_handler(request: Request, exc: PoolSaturated):
+    logger.warning(str(exc))
+    return JSONResponse(
+        status_code=503,
+        content={"detail": str(exc)},
+        headers={"Retry-After": str(exc.retry_after)}
+    )
+
+@app.exception_handler(DeadlineExceeded)
+async def deadline_exceeded_handler(request: Request, exc: DeadlineExceeded):
+    logger.error(str(exc))
+    return JSONResponse(status_code=504, content={"detail": str(exc)})
+
+def remaining(deadline: float, pool) -> float:
+    """Time left for a pool job, capped by the request's overall deadline"""
+    return max(0.0, min(pool.timeout, deadline - time.monotonic()))
+
+def run_brief(query: Optional[str] = None) -> str:
+    """Build a crew and run it through the brief cache; executed on the crew pool"""
+    crew = new_crew()
+    response, source = crew.run_brief(query)
+    logger.info(f"Brief served from {source}")
+    return response
+
+def execute_brief_job(job: BriefJob) -> Dict[str, Any]:
+    """Job queue handler: transcribe voice input if present, then run the crew"""
+    with tracing.trace("brief_job", job_id=job.id, priority=job.priority.name.lower()):
+        return _execute_brief_job(job)
+
+def _execute_brief_job(job: BriefJob) -> Dict[str, Any]:
+    result = {}
+    if job.payload.get('audio_data') is not None:
+        model = stt_model.get()
+        if model is None:
+            raise RuntimeError("Speech recognition model not initialized")
+        job.report('transcribing', "Transcribing audio")
+        with tracing.span('audio.decode'):
+            audio_array = prepare_for_whisper(np.asarray(job.payload['audio_data'], dtype=np.float32),
+                                              job.payload.get('sample_rate') or WHISPER_SAMPLE_RATE)
+        with tracing.span('stt.transcribe', seconds=round(len(audio_array) / WHISPER_SAMPLE_RATE, 2)):
+            transcription = stt_pool.submit(model.transcribe, audio_array).result(timeout=stt_pool.timeout)
+        result['transcribed_text'] = transcription["text"]
+        job.query = transcription["text"]
+        job.report('transcribed', transcription["text"])
+    
+    crew = new_crew()
+    result['response'], source = crew.run_brief(job.query, progress=job.report)
+    job.report('brief_source', source)
+    return result
+
+job_queue = JobQueue(
+    execute_brief_job,
+    workers=int(os.getenv("BRIEF_WORKERS", "2")),
+    max_pending=int(os.getenv("BRIEF_MAX_PENDING", "100"))
+)
+
+def parse_priority(name: Optional[str], default: Priority) -> Priority:
+    try:
+        return Priority[name.upper()] if name else default
+    except KeyError:
+        raise HTTPException(status_code=422, detail=f"Unknown priority: {name}")
+
+@app.post("/briefs", status_code=202)
+async def create_brief(brief_request: BriefRequest):
+    """Queue a brief and return its job id immediately"""
+    if not brief_request.text and brief_request.audio_data is None:
+        raise HTTPException(status_code=422, detail="Either text or audio_data is required")
+    
+    is_voice = brief_request.audio_data is not None
+    priority = parse_priority(brief_request.priority, Priority.INTERACTIVE if is_voice else Priority.STANDARD)
+    payload = {'audio_data': brief_request.audio_data, 'sample_rate': brief_request.sample_rate} if is_voice else {}
+    job = job_queue.submit(brief_request.text or '', priority, **payload)
+    logger.info(f"Queued brief job {job.id} with priority {priority.name.lower()}")
+    return job.to_dict(include_result=False)
+
+def current_snapshot_id() -> str:
+    return market_data_agent.get().get_market_snapshot().id
+
+async def prerendered_brief(query: str):
+    """The scheduler's brief for a query, 404 when there is none or the data has changed"""
+    if scheduler is None:
+        raise HTTPException(status_code=404, detail="No brief schedule configured (set BRIEF_SCHEDULE)")
+    await require_market_data()
+    # Usually a market data cache hit; may fetch if the cache has expired
+    snapshot_id = await crew_pool.run(current_snapshot_id)
+    entry = scheduler.get(query, snapshot_id)
+    if entry is None:
+        raise HTTPException(status_code=404, detail="No pre-rendered brief for the current market data")
+    return entry
+
+@app.get("/briefs/morning")
+async def morning_brief(q: str = ""):
+    """The pre-rendered brief from the last pre-market warm-up, while it is still current"""
+    return (await prerendered_brief(q)).to_dict()
+
+@app.get("/briefs/morning/audio")
+async def morning_brief_audio(q: str = ""):
+    """Synthesized audio of the pre-rendered brief, when TTS pre-rendering is enabled"""
+    entry = await prerendered_brief(q)
+    if entry.audio is None:
+        raise HTTPException(status_code=404, detail="The pre-rendered brief has no audio")
+    return Response(content=entry.audio, media_type="audio/wav")
+
+@app.post("/briefs/morning/warm")
+async def warm_morning_brief():
+    """Run the pre-market warm-up now instead of waiting for the schedule"""
+    if scheduler is None:
+        raise HTTPException(status_code=404, detail="No brief schedule configured (set BRIEF_SCHEDULE)")
+    await require_crew()
+    entries = await crew_pool.run(scheduler.warm)
+    return {"briefs": [entry.to_dict() for entry in entries]}
+
+def json_safe(value: Any) -> Any:
+    """Tuples as lists and NaN/inf as null, so tool results serialize as strict JSON"""
+    if isinstance(value, dict):
+        return {str(key): json_safe(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [json_safe(item) for item in value]
+    if isinstance(value, (float, np.floating)):
+        return float(value) if math.isfinite(value) else None
+    if isinstance(value, np.integer):
+        return int(value)
+    return value
+
+def market_panel(name: str) -> Dict[str, Any]:
+    """One market data tool's result and its one-line summary; executed on the crew pool"""
+    market_data = market_data_agent.get()
+    method, renderer = router.RENDERERS[name]
+    data = getattr(market_data, method)()
+    return {"panel": name, "text": renderer(data), "data": json_safe(data)}
+
+@app.get("/market/{panel}")
+async def get_market_panel(panel: str):
+    """Market data for a dashboard panel: exposure, risk, earnings, calendar, sentiment or breadth"""
+    if panel not in router.RENDERERS:
+        raise HTTPException(status_code=404, detail=f"Unknown panel: {panel}")
+    await require_market_data()
+    return await crew_pool.run(market_panel, panel)
+
+@app.get("/briefs/{job_id}")
+async def get_brief(job_id: str):
+    """Poll a brief job for its status or result"""
+    job = job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown job: {job_id}")
+    return job.to_dict()
+
+@app.get("/briefs/{job_id}/stream")
+async def stream_brief(job_id: str):
+    """Stream a brief job's progress events as server-sent events"""
+    job = job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown job: {job_id}")
+    
+    async def events():
+        seen = 0
+        while True:
+            new_events = job.events[seen:]
+            seen += len(new_events)
+            for event in new_events:
+                yield f"event: progress\ndata: {json.dumps(event)}\n\n"
+            # finish() appends the final event before the status changes, so it is streamed first
+            if job.done and seen >= len(job.events):
+                yield f"event: result\ndata: {json.dumps(job.to_dict(), default=str)}\n\n"
+                return
+            if not new_events:
+                await asyncio.sleep(0.25)
+    
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+async def transcribe_and_brief(audio_array: np.ndarray, deadline: float) -> Dict[str, Any]:
+    """Shared tail of the audio endpoints: Whisper on the STT pool, then the crew"""
+    model = await require_stt()
+    
+    # Transcribe audio
+    logger.info("Transcribing audio...")
+    with tracing.span('stt.transcribe', seconds=round(len(audio_array) / WHISPER_SAMPLE_RATE, 2)):
+        result = await stt_pool.run(model.transcribe, audio_array, timeout=remaining(deadline, stt_pool))
+    transcribed_text = result["text"]
+    logger.info(f"Transcribed text: {transcribed_text}")
+    
+    # Process with crew
+    logger.info("Processing with CrewAI...")
+    response = await crew_pool.run(run_brief, transcribed_text, timeout=remaining(deadline, crew_pool))
+    logger.info("CrewAI processing complete")
+    
+    return {
+        "transcribed_text": transcribed_text,
+        "response": response
+    }
+
 @app.post("/process_audio")
 async def process_audio(audio_input: AudioInput):
+    deadline = time.monotonic() + REQUEST_TIMEOUT
     try:
         logger.info("Processing audio input...")
-        if model is None:
-            raise HTTPException(status_code=500, detail="Speech recognition model not initialized")
+        await require_stt()
             
         # Convert audio data to format expected by Whisper
-        audio_array = np.array(audio_input.audio_data)
+        with tracing.span('audio.decode', source='json'):
+            audio_array = prepare_for_whisper(np.asarray(audio_input.audio_data, dtype=np.float32),
+                                              audio_input.sample_rate)
+        return await transcribe_and_brief(audio_array, deadline)
+    except (HTTPException, PoolSaturated, DeadlineExceeded):
+        raise
+    except Exception as e:
+        logger.error(f"Error in process_audio: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+async def _upload_chunks(upload) -> AsyncIterator[bytes]:
+    while True:
+        chunk = await upload.read(AUDIO_CHUNK_BYTES)
+        if not chunk:
+            return
+        yield chunk
+
+async def read_audio_upload(request: Request) -> bytearray:
+    """The uploaded audio bytes, from multipart 'file' or the request body"""
+    if request.headers.get("content-type", "").startswith("multipart/form-data"):
+        form = await request.form()
+        upload = form.get("file")
+        if upload is None or isinstance(upload, str):
+            raise HTTPException(status_code=422, detail="Multipart uploads need a 'file' field")
+        return await read_stream(_upload_chunks(upload), AUDIO_MAX_BYTES)
+    length = request.headers.get("content-length")
+    return await read_stream(request.stream(), AUDIO_MAX_BYTES, int(length) if length else None)
+
+@app.post("/process_audio/raw")
+async def process_audio_raw(request: Request, sample_rate: Optional[int] = None,
+                            encoding: str = "pcm_s16le", channels: int = 1):
+    """Binary audio upload: a WAV file or raw PCM, as multipart 'file' or the request body"""
+    deadline = time.monotonic() + REQUEST_TIMEOUT
+    try:
+        logger.info("Processing binary audio input...")
+        data = await read_audio_upload(request)
+        with tracing.span('audio.decode', source='binary', bytes=len(data)):
+            audio_array = decode_upload(data, sample_rate, encoding, channels)
+        logger.info(f"Decoded {len(data)} bytes into {len(audio_array) / WHISPER_SAMPLE_RATE:.1f}s of audio")
+        return await transcribe_and_brief(audio_array, deadline)
+    except PayloadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except AudioDecodeError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except (HTTPException, PoolSaturated, DeadlineExceeded):
+        raise
+    except Exception as e:
+        logger.error(f"Error in process_audio_raw: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/briefs/audio", status_code=202)
+async def create_audio_brief(request: Request, sample_rate: Optional[int] = None,
+                             encoding: str = "pcm_s16le", channels: int = 1,
+                             priority: Optional[str] = None):
+    """Queue a voice brief from a binary upload (WAV or raw PCM, as for /process_audio/raw)"""
+    job_priority = parse_priority(priority, Priority.INTERACTIVE)
+    try:
+        data = await read_audio_upload(request)
+        with tracing.span('audio.decode', source='binary', bytes=len(data)):
+            audio_array = decode_upload(data, sample_rate, encoding, channels)
+    except PayloadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except AudioDecodeError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    
+    job = job_queue.submit('', job_priority, audio_data=audio_array, sample_rate=WHISPER_SAMPLE_RATE)
+    logger.info(f"Queued voice brief job {job.id} with {len(audio_array) / WHISPER_SAMPLE_RATE:.1f}s of audio")
+    return job.to_dict(include_result=False)
+
+@app.post("/process_audio/stream")
+async def process_audio_stream(request: Request, sample_rate: int = WHISPER_SAMPLE_RATE,
+                               encoding: str = "pcm_s16le", channels: int = 1):
+    """Chunked raw PCM upload, transcribed segment by segment while it arrives"""
+    deadline = time.monotonic() + REQUEST_TIMEOUT
+    try:
+        logger.info("Processing streamed audio input...")
+        model = await require_stt()
+        if encoding not in PCM_ENCODINGS:
+            raise HTTPException(status_code=422, detail=f"Unsupported encoding '{encoding}'")
         
-        # Transcribe audio
-        logger.info("Transcribing audio...")
-        result = model.transcribe(audio_array)
-        transcribed_text = result["text"]
-        logger.info(f"Transcribed text: {transcribed_text}")
+        transcriber = StreamingTranscriber(model.transcribe)
+        frame_bytes = PCM_ENCODINGS[encoding].itemsize * channels
+        pending = bytearray()
+        received = 0
+        events = []
+        async for chunk in request.stream():
+            received += len(chunk)
+            if received > AUDIO_MAX_BYTES:
+                raise HTTPException(status_code=413, detail=f"Upload exceeds the {AUDIO_MAX_BYTES} byte limit")
+            pending += chunk
+            usable = len(pending) - len(pending) % frame_bytes
+            if not usable:
+                continue
+            with tracing.span('audio.decode', source='stream', bytes=usable):
+                audio = prepare_for_whisper(decode_pcm(bytes(pending[:usable]), encoding, channels),
+                                            sample_rate, channels)
+            del pending[:usable]
+            events += await stt_pool.run(transcriber.feed, audio, timeout=remaining(deadline, stt_pool))
+            if events and events[-1]["type"] == "final":
+                # The speaker has stopped; anything after is trailing silence
+                break
+        else:
+            events += await stt_pool.run(transcriber.flush, timeout=remaining(deadline, stt_pool))
+        
+        transcribed_text = events[-1]["text"] if events else ""
+        logger.info(f"Transcribed text: {transcribed_text} ({transcriber.stats()})")
+        if not transcribed_text:
+            raise HTTPException(status_code=422, detail="No speech detected")
         
-        # Process with crew
         logger.info("Processing with CrewAI...")
-        crew = FinancialCrew()
-        response = crew.run_crew()
+        response = await crew_pool.run(run_brief, transcribed_text, timeout=remaining(deadline, crew_pool))
         logger.info("CrewAI processing complete")
         
         return {
             "transcribed_text": transcribed_text,
+            "segments": [event["segment_text"] for event in events if event["segment_text"]],
+            "stt": transcriber.stats(),
             "response": response
         }
+    except (HTTPException, PoolSaturated, DeadlineExceeded):
+        raise
     except Exception as e:
-        logger.error(f"Error in process_audio: {str(e)}")
+        logger.error(f"Error in process_audio_stream: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/process_text")
 async def process_text(text_input: TextInput):
     try:
         logger.info(f"Processing text input: {text_input.text}")
-        crew = FinancialCrew()
-        response = crew.run_crew()
+        response = await crew_pool.run(run_brief, text_input.text)
         logger.info("CrewAI processing complete")
         
         return {
             "response": response
         }
+    except (PoolSaturated, DeadlineExceeded):
+        raise
     except Exception as e:
         logger.error(f"Error in process_text: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+def whisper_stats() -> Optional[Dict[str, Any]]:
+    """Batcher stats; blocks on a round trip when Whisper runs as a service"""
+    if not stt_model.ready or stt_model.get() is None:
+        return None
+    try:
+        return stt_model.get().stats()
+    except Exception as e:
+        return {"error": str(e)}
+
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
-    return {"status": "healthy", "whisper_model": "loaded" if model is not None else "not loaded"}
+    return {
+        "status": "healthy",
+        "whisper_model": "loaded" if stt_model.ready else stt_model.state,
+        "whisper": await asyncio.to_thread(whisper_stats),
+        "market_data_cache": get_default_cache().stats(),
+        "pools": {"stt": stt_pool.stats(), "crew": crew_pool.stats()},
+        "brief_jobs": job_queue.stats(),
+        "brief_cache": get_default_brief_cache().stats(),
+        "scheduler": scheduler.stats() if scheduler is not None else None
+    }
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus metrics: request and per-stage latency histograms plus component gauges"""
+    # Collectors may call out to the Whisper service, so render off the event loop
+    return PlainTextResponse(await asyncio.to_thread(REGISTRY.render), media_type="text/plain; version=0.0.4")
+
+@app.get("/traces")
+async def traces(limit: int = 20, slow: bool = False):
+    """Most recent request traces with per-stage timings, newest first"""
+    return {"traces": tracing.recent_traces(limit, slow_only=slow)}
+
+@app.get("/health/live")
+async def liveness():
+    """Liveness probe: the process is up and the event loop responds"""
+    return {"status": "alive"}
+
+@app.get("/health/ready")
+async def readiness_check():
+    """Readiness probe: required components have finished loading"""
+    status = readiness(resources)
+    if not status["ready"]:
+        return JSONResponse(status_code=503, content=status, headers={"Retry-After": "5"})
+    return status
+
+@app.get("/startup/profile")
+async def startup_profile():
+    """Import and initialization time per component"""
+    report = profile.report()
+    report["components"] = {resource.name: resource.status() for resource in resources}
+    return report
 
 if __name__ == "__main__":
     import uvicorn
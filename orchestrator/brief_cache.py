@@ -0,0 +1,117 @@
+"""
+Single-flight execution and result caching for crew runs.
+
+Briefs are keyed by the normalized user query plus the id of the market-data
+snapshot they were built from. Concurrent requests for the same key share one
+in-flight crew execution, completed briefs are served from memory, and every
+entry built from an older snapshot is dropped as soon as a new snapshot id is
+seen.
+"""
+import os
+import re
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Optional, Tuple
+
+CACHE = 'cache'
+COALESCED = 'coalesced'
+RUN = 'run'
+
+
+def normalize_query(query: Optional[str]) -> str:
+    """Lowercase, collapse whitespace and drop surrounding punctuation"""
+    query = re.sub(r'\s+', ' ', (query or '').lower()).strip()
+    return query.strip(' ?!.,;:')
+
+
+class BriefCache:
+    def __init__(self, maxsize: int = 128,
+                 cacheable: Callable[[Any], bool] = lambda result: not str(result).startswith("Error")):
+        self.maxsize = maxsize
+        self.cacheable = cacheable
+        self.hits = 0
+        self.coalesced = 0
+        self.runs = 0
+        self.invalidations = 0
+        self._snapshot_id: Optional[str] = None
+        self._entries: "OrderedDict[Tuple[str, str], Any]" = OrderedDict()
+        self._in_flight: Dict[Tuple[str, str], Future] = {}
+        self._lock = threading.Lock()
+
+    def _observe_snapshot(self, snapshot_id: str):
+        # A new snapshot makes every brief built from the previous one stale
+        if snapshot_id != self._snapshot_id:
+            if self._entries:
+                self.invalidations += 1
+            self._entries.clear()
+            self._snapshot_id = snapshot_id
+
+    def get_or_run(self, query: str, snapshot_id: str,
+                   run: Callable[[], Any]) -> Tuple[Any, str]:
+        """Return (brief, source) where source is 'cache', 'coalesced' or 'run'"""
+        key = (normalize_query(query), snapshot_id)
+        with self._lock:
+            self._observe_snapshot(snapshot_id)
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key], CACHE
+            future = self._in_flight.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._in_flight[key] = future
+                self.runs += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            return future.result(), COALESCED
+
+        try:
+            result = run()
+        except BaseException as e:
+            with self._lock:
+                self._in_flight.pop(key, None)
+            future.set_exception(e)
+            raise
+
+        with self._lock:
+            self._in_flight.pop(key, None)
+            if self.cacheable(result) and snapshot_id == self._snapshot_id:
+                self._entries[key] = result
+                while len(self._entries) > self.maxsize:
+                    self._entries.popitem(last=False)
+        future.set_result(result)
+        return result, RUN
+
+    def invalidate(self):
+        with self._lock:
+            self._entries.clear()
+            self.invalidations += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'size': len(self._entries),
+                'in_flight': len(self._in_flight),
+                'hits': self.hits,
+                'coalesced': self.coalesced,
+                'runs': self.runs,
+                'invalidations': self.invalidations,
+                'snapshot_id': self._snapshot_id,
+            }
+
+
+_default_cache: Optional[BriefCache] = None
+_default_lock = threading.Lock()
+
+
+def get_default_brief_cache() -> BriefCache:
+    """Process-wide brief cache shared by every request"""
+    global _default_cache
+    with _default_lock:
+        if _default_cache is None:
+            _default_cache = BriefCache(maxsize=int(os.getenv("BRIEF_CACHE_SIZE", "128")))
+        return _default_cache
@@ -0,0 +1,167 @@
+"""
+HTTP client for the brief API, for front ends that should not run the crew.
+
+One ``BriefClient`` per process holds a pooled ``httpx.Client``, so every
+Streamlit session reuses the same keep-alive connections instead of opening
+new ones for each request. Briefs are queued as jobs (``POST /briefs``, or
+``POST /briefs/audio`` with a recorded question as WAV bytes), and
+their progress events, including each analysis as it completes, are read
+from the job's server-sent event stream while the API tier does the work.
+"""
+import json
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+import httpx
+
+DEFAULT_TIMEOUT = 30.0
+
+
+class ApiError(Exception):
+    """Raised for an error response from the API"""
+
+    def __init__(self, status_code: int, detail: str, retry_after: Optional[int] = None):
+        super().__init__(f"API error {status_code}: {detail}")
+        self.status_code = status_code
+        self.detail = detail
+        self.retry_after = retry_after
+
+
+def _check(response: httpx.Response) -> httpx.Response:
+    if response.is_success:
+        return response
+    try:
+        detail = response.json().get('detail', response.text)
+    except ValueError:
+        detail = response.text
+    retry_after = response.headers.get('Retry-After')
+    raise ApiError(response.status_code, str(detail), int(retry_after) if retry_after else None)
+
+
+def parse_sse(lines: Iterator[str]) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """(event, data) pairs from server-sent event lines with JSON data"""
+    event, data = 'message', []
+    for line in lines:
+        if not line:
+            if data:
+                yield event, json.loads('\n'.join(data))
+            event, data = 'message', []
+        elif line.startswith('event:'):
+            event = line[6:].strip()
+        elif line.startswith('data:'):
+            data.append(line[5:].strip())
+
+
+class BriefClient:
+    def __init__(self, base_url: str, timeout: float = DEFAULT_TIMEOUT, max_connections: int = 20,
+                 brief_timeout: float = 300.0, transport: Optional[httpx.BaseTransport] = None):
+        self.base_url = base_url.rstrip('/')
+        # Whole-brief deadline; individual requests use `timeout`
+        self.brief_timeout = brief_timeout
+        self._client = httpx.Client(
+            base_url=self.base_url,
+            timeout=timeout,
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+            transport=transport
+        )
+
+    def submit(self, text: Optional[str] = None, audio_data: Optional[List[float]] = None,
+               sample_rate: Optional[int] = None, priority: Optional[str] = None) -> Dict[str, Any]:
+        """Queue a brief; returns the job without waiting for it"""
+        payload = {'text': text, 'audio_data': audio_data, 'sample_rate': sample_rate, 'priority': priority}
+        return _check(self._client.post('/briefs', json=payload)).json()
+
+    def submit_audio(self, wav: bytes, priority: Optional[str] = None) -> Dict[str, Any]:
+        """Queue a voice brief from WAV bytes, sent as a binary body rather than JSON floats"""
+        params = {'priority': priority} if priority else None
+        response = self._client.post('/briefs/audio', content=wav, params=params,
+                                     headers={'Content-Type': 'audio/wav'})
+        return _check(response).json()
+
+    def job(self, job_id: str) -> Dict[str, Any]:
+        return _check(self._client.get(f'/briefs/{job_id}')).json()
+
+    def events(self, job_id: str) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """The job's progress events as they happen, ending with its final state"""
+        timeout = httpx.Timeout(self._client.timeout.connect, read=self.brief_timeout)
+        with self._client.stream('GET', f'/briefs/{job_id}/stream', timeout=timeout) as response:
+            _check(response)
+            for event, data in parse_sse(response.iter_lines()):
+                yield event, data
+                if event == 'result':
+                    return
+
+    def brief(self, text: Optional[str] = None, audio_data: Optional[List[float]] = None,
+              sample_rate: Optional[int] = None,
+              on_progress: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict[str, Any]:
+        """Queue a brief and follow it to the end, passing each progress event to on_progress;
+        returns the job's result (response and, for voice, transcribed_text)"""
+        return self.follow(self.submit(text, audio_data, sample_rate), on_progress)
+
+    def brief_audio(self, wav: bytes,
+                    on_progress: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict[str, Any]:
+        """Like brief(), for a recorded question as WAV bytes"""
+        return self.follow(self.submit_audio(wav), on_progress)
+
+    def follow(self, job: Dict[str, Any],
+               on_progress: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict[str, Any]:
+        """Follow a queued job to the end; returns its result"""
+        deadline = time.monotonic() + self.brief_timeout
+        final = None
+        try:
+            for event, data in self.events(job['job_id']):
+                if event == 'progress' and on_progress is not None:
+                    on_progress(data)
+                elif event == 'result':
+                    final = data
+        except httpx.TransportError:
+            # The connection dropped or timed out mid-stream; the job keeps running server-side
+            pass
+        # The stream ended early (e.g. cut by a proxy); poll the job instead
+        while final is None or final.get('status') in ('queued', 'running'):
+            if time.monotonic() > deadline:
+                raise ApiError(504, f"Brief job {job['job_id']} did not finish within {self.brief_timeout}s")
+            if final is not None:
+                time.sleep(1.0)
+            final = self.job(job['job_id'])
+        if final.get('status') != 'succeeded':
+            raise ApiError(500, final.get('error') or f"Brief job {final.get('status')}")
+        return final['result']
+
+    def panel(self, name: str) -> Dict[str, Any]:
+        """A market data panel: the tool's data and a one-line summary"""
+        return _check(self._client.get(f'/market/{name}')).json()
+
+    def ready(self) -> bool:
+        try:
+            return self._client.get('/health/ready').is_success
+        except httpx.HTTPError:
+            return False
+
+    def close(self):
+        self._client.close()
+
+
+_default_client: Optional[BriefClient] = None
+_default_lock = threading.Lock()
+
+
+def api_url() -> Optional[str]:
+    """BRIEF_API_URL: where the brief API runs; unset means briefs run in-process"""
+    return os.getenv("BRIEF_API_URL") or None
+
+
+def get_default_client() -> BriefClient:
+    """Process-wide client for BRIEF_API_URL with an API_MAX_CONNECTIONS connection pool"""
+    global _default_client
+    with _default_lock:
+        if _default_client is None:
+            _default_client = BriefClient(
+                api_url() or "http://localhost:8000",
+                timeout=float(os.getenv("API_TIMEOUT", str(DEFAULT_TIMEOUT))),
+                max_connections=int(os.getenv("API_MAX_CONNECTIONS", "20")),
+                brief_timeout=float(os.getenv("API_BRIEF_TIMEOUT", "300"))
+            )
+        return _default_client
@@ -1,30 +1,80 @@
-from typing import List, Optional, Union, Dict, Any
+from typing import List, Optional, Union, Dict, Any, Callable, Tuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from crewai import Agent, Task, Crew, Process
 from agents.market_data_agent import MarketDataAgent
+from orchestrator.brief_cache import get_default_brief_cache
+from orchestrator import router
+from orchestrator.tool_context import RISK_TOOL, ToolContext
+from observability import tracing
+from observability.metrics import counter
 import os
+import time
 from dotenv import load_dotenv
 
 # Load environment variables
 load_dotenv()
 
+SEQUENTIAL = 'sequential'
+PARALLEL = 'parallel'
+
+# Independent analyses for the parallel mode: name -> (analyst role, tool, task)
+BRANCHES = {
+    'exposure': ('Portfolio Exposure Analyst', 'get_portfolio_exposure',
+                 'Analyze portfolio exposure across the Asian tech stocks'),
+    'earnings': ('Earnings Analyst', 'get_earnings_surprises',
+                 'Analyze the latest earnings surprises of the Asian tech stocks'),
+    'sentiment': ('Market Sentiment Analyst', 'get_market_sentiment',
+                  'Analyze regional market sentiment from index trends and yields'),
+}
+
+def crew_mode() -> str:
+    """CREW_MODE: 'sequential' (one analyst, then the writer) or 'parallel' (fan-out)"""
+    mode = os.getenv("CREW_MODE", SEQUENTIAL).lower()
+    return mode if mode in (SEQUENTIAL, PARALLEL) else SEQUENTIAL
+
+llm_tokens = counter('llm_tokens', "LLM tokens used by crew runs", ['kind'])
+llm_requests = counter('llm_requests', "LLM requests made by crew runs")
+
+def record_llm_usage(span: tracing.Span, usage: Any):
+    """Add a crew run's token usage (a dict or crewai UsageMetrics) to its span and the metrics"""
+    if usage is None:
+        return
+    if not isinstance(usage, dict):
+        usage = usage.model_dump() if hasattr(usage, 'model_dump') else vars(usage)
+    tokens = {kind: int(usage.get(f'{kind}_tokens') or 0) for kind in ('prompt', 'completion', 'total')}
+    span.set(llm_requests=int(usage.get('successful_requests') or 0), **{f'{kind}_tokens': count for kind, count in tokens.items()})
+    llm_tokens.inc(tokens['prompt'], kind='prompt')
+    llm_tokens.inc(tokens['completion'], kind='completion')
+    llm_requests.inc(int(usage.get('successful_requests') or 0))
+
 class FinancialCrew:
-    def __init__(self):
-        self.market_data = MarketDataAgent()
+    def __init__(self, market_data: Optional[MarketDataAgent] = None, llm: Optional[Any] = None,
+                 use_router: Optional[bool] = None, mode: Optional[str] = None):
+        self.market_data = market_data or MarketDataAgent()
+        # Custom LLM for every agent (e.g. a local stub); OpenAI by default
+        self.llm = llm
+        self.use_router = router.router_enabled() if use_router is None else use_router
+        self.mode = mode or crew_mode()
+        # Stage timings of the last run_crew, for comparing the two modes
+        self.last_timings: Dict[str, Any] = {}
+        # Tool calls of the last run_crew: fetched, served from the prefetch, deduplicated
+        self.last_tool_stats: Dict[str, int] = {}
+        
+    def _llm_kwargs(self) -> Dict[str, Any]:
+        return {'llm': self.llm} if self.llm is not None else {}
         
-    def create_agents(self) -> List[Agent]:
+    def create_agents(self, tools: Optional[ToolContext] = None) -> List[Agent]:
         """Create specialized agents for different tasks"""
         
+        tools = tools or ToolContext(self.market_data)
         market_analyst = Agent(
             role='Market Analyst',
             goal='Analyze market data and provide insights',
             backstory='Expert in Asian tech markets with years of experience in portfolio analysis',
-            tools=[
-                self.market_data.get_portfolio_exposure,
-                self.market_data.get_earnings_surprises,
-                self.market_data.get_market_sentiment
-            ],
+            tools=tools.tool_list(),
             verbose=True,
-            allow_delegation=False
+            allow_delegation=False,
+            **self._llm_kwargs()
         )
         
         report_writer = Agent(
@@ -32,41 +82,182 @@ class FinancialCrew:
             goal='Create clear and concise market briefs',
             backstory='Experienced financial writer who specializes in converting complex data into clear narratives',
             verbose=True,
-            allow_delegation=False
+            allow_delegation=False,
+            **self._llm_kwargs()
         )
         
         return [market_analyst, report_writer]
     
-    def create_tasks(self, agents: List[Agent]) -> List[Task]:
+    def create_tasks(self, agents: List[Agent], query: Optional[str] = None) -> List[Task]:
         """Create tasks for the agents"""
         
+        question = f" The user asked: {query.strip()}" if query and query.strip() else ""
+        
         analyze_market = Task(
-            description='Analyze Asian tech stocks exposure and earnings',
+            description='Analyze Asian tech stocks exposure and earnings' + question,
             agent=agents[0]
         )
         
         write_brief = Task(
-            description='Create a market brief based on the analysis',
+            description='Create a market brief based on the analysis' + question,
             agent=agents[1]
         )
         
         return [analyze_market, write_brief]
     
-    def run_crew(self) -> str:
-        """Execute the crew's tasks"""
+    def create_branches(self, query: Optional[str] = None,
+                        tools: Optional[ToolContext] = None) -> Dict[str, Tuple[Agent, Task]]:
+        """One analyst and task per independent dataset, for the parallel mode"""
+        tools = tools or ToolContext(self.market_data)
+        question = f" The user asked: {query.strip()}" if query and query.strip() else ""
+        branches = {}
+        for name, (role, tool, description) in BRANCHES.items():
+            branch_tools = [tools.tool(tool)]
+            # The exposure analyst also sees the risk of our actual positions, when we have them
+            if name == 'exposure' and RISK_TOOL in tools.tools:
+                branch_tools.append(tools.tool(RISK_TOOL))
+            analyst = Agent(
+                role=role,
+                goal='Analyze one aspect of the market data and report the key numbers',
+                backstory='Expert in Asian tech markets with years of experience in portfolio analysis',
+                tools=branch_tools,
+                verbose=True,
+                allow_delegation=False,
+                **self._llm_kwargs()
+            )
+            branches[name] = (analyst, Task(description=description + question, agent=analyst))
+        return branches
+    
+    def _kickoff(self, agents: List[Agent], tasks: List[Task],
+                 progress: Optional[Callable[..., None]] = None) -> Any:
+        """Run tasks as a sequential crew, tracing each task, agent step and the token usage"""
+        # Tasks and agent steps run one after another, so each starts where the last ended
+        started = {'task': time.monotonic(), 'step': time.monotonic()}
         
-        if not os.getenv("OPENAI_API_KEY"):
-            return "Error: OpenAI API key not found. Please set the OPENAI_API_KEY environment variable."
+        def on_task(output):
+            description = str(getattr(output, 'description', '') or 'Task completed')
+            tracing.record('crew.task', started['task'], description=description[:80])
+            started['task'] = started['step'] = time.monotonic()
+            if progress is not None:
+                progress('task_completed', description, output=str(getattr(output, 'raw', '') or ''))
         
-        agents = self.create_agents()
-        tasks = self.create_tasks(agents)
+        def on_step(step):
+            # One agent step is an LLM round trip plus the tool call it asked for, if any
+            tracing.record('crew.agent_step', started['step'], step=type(step).__name__)
+            started['step'] = time.monotonic()
         
         crew = Crew(
             agents=agents,
             tasks=tasks,
             process=Process.sequential,
-            verbose=True
+            verbose=True,
+            task_callback=on_task,
+            step_callback=on_step
         )
         
-        result = crew.kickoff()
-        return result 
\ No newline at end of file
+        with tracing.span('crew.kickoff', tasks=len(tasks)) as kickoff:
+            started['task'] = started['step'] = time.monotonic()
+            result = crew.kickoff()
+            record_llm_usage(kickoff, getattr(result, 'token_usage', None) or getattr(crew, 'usage_metrics', None))
+        return result
+    
+    def run_crew(self, query: Optional[str] = None,
+                 progress: Optional[Callable[..., None]] = None) -> str:
+        """Execute the crew's tasks, reporting (stage, message, **data) to progress if given"""
+        
+        if self.llm is None and not os.getenv("OPENAI_API_KEY"):
+            return "Error: OpenAI API key not found. Please set the OPENAI_API_KEY environment variable."
+        
+        started = time.monotonic()
+        # Every dataset starts loading now; tool calls in this run share the results
+        with tracing.span('crew.run', mode=self.mode) as run_span, ToolContext(self.market_data).prefetch() as tools:
+            try:
+                if self.mode == PARALLEL:
+                    result = self._run_parallel(query, progress, tools)
+                else:
+                    agents = self.create_agents(tools)
+                    tasks = self.create_tasks(agents, query)
+                    if progress is not None:
+                        progress('crew_started', f"Running {len(tasks)} tasks")
+                    result = self._kickoff(agents, tasks, progress)
+                    self.last_timings = {'mode': SEQUENTIAL, 'total': round(time.monotonic() - started, 3)}
+            finally:
+                self.last_tool_stats = tools.stats()
+                run_span.set(**{f'tool_{key}': value for key, value in self.last_tool_stats.items()})
+        return result
+    
+    def _run_parallel(self, query: Optional[str],
+                      progress: Optional[Callable[..., None]] = None,
+                      tools: Optional[ToolContext] = None) -> Any:
+        """Run the analysis branches concurrently, then write the brief from their outputs"""
+        started = time.monotonic()
+        branches = self.create_branches(query, tools)
+        if progress is not None:
+            progress('crew_started', f"Running {len(branches)} analyses in parallel")
+        
+        def run_branch(name: str) -> Tuple[str, float]:
+            branch_started = time.monotonic()
+            analyst, task = branches[name]
+            with tracing.span('crew.branch', branch=name):
+                output = str(self._kickoff([analyst], [task]))
+            return output, time.monotonic() - branch_started
+        
+        outputs: Dict[str, str] = {}
+        branch_seconds: Dict[str, float] = {}
+        with tracing.span('crew.fan_out', branches=len(branches)) as fan_out:
+            with ThreadPoolExecutor(max_workers=len(branches), thread_name_prefix='crew-branch') as executor:
+                futures = {executor.submit(tracing.in_context(run_branch), name): name for name in branches}
+                for future in as_completed(futures):
+                    name = futures[future]
+                    try:
+                        outputs[name], branch_seconds[name] = future.result()
+                    except Exception as e:
+                        # One failed analysis should not sink the whole brief
+                        print(f"Error in {name} analysis: {str(e)}")
+                        outputs[name] = f"The {name} analysis is unavailable ({str(e)})."
+                    if progress is not None:
+                        # Clients can show each analysis before the brief is written
+                        progress('branch_completed', name, output=outputs[name])
+            fan_out.set(**{f'{name}_seconds': round(seconds, 3) for name, seconds in branch_seconds.items()})
+        fan_out_seconds = time.monotonic() - started
+        
+        question = f" The user asked: {query.strip()}" if query and query.strip() else ""
+        analyses = "\n\n".join(f"{BRANCHES[name][0]}:\n{outputs[name]}" for name in branches)
+        writer = self.create_agents(tools)[1]
+        write_brief = Task(
+            description=f"Create a market brief based on these analyses:\n\n{analyses}\n\n{question.strip()}".strip(),
+            agent=writer
+        )
+        merge_started = time.monotonic()
+        result = self._kickoff([writer], [write_brief], progress)
+        merge_seconds = time.monotonic() - merge_started
+        
+        # Parallel latency tracks the slowest branch; sequential would pay for all of them
+        self.last_timings = {
+            'mode': PARALLEL,
+            'branches': {name: round(seconds, 3) for name, seconds in branch_seconds.items()},
+            'fan_out': round(fan_out_seconds, 3),
+            'merge': round(merge_seconds, 3),
+            'total': round(time.monotonic() - started, 3),
+            'sequential_estimate': round(sum(branch_seconds.values()) + merge_seconds, 3),
+        }
+        return result
+    
+    def run_brief(self, query: Optional[str] = None,
+                  progress: Optional[Callable[..., None]] = None) -> Tuple[str, str]:
+        """Answer structured questions from the numbers, otherwise run the crew through
+        the shared brief cache; returns (brief, source)"""
+        if self.use_router:
+            route = router.classify(query, tuple(self.market_data.stocks.values()),
+                                    router.intents_for(self.market_data))
+            if route.fast:
+                with tracing.span('router.fast_path', intents=','.join(route.intents)):
+                    return router.render(route, self.market_data), router.FAST_PATH
+        
+        with tracing.span('crew.brief') as brief:
+            snapshot_id = self.market_data.get_market_snapshot().id
+            result, source = get_default_brief_cache().get_or_run(
+                query, snapshot_id, lambda: str(self.run_crew(query, progress))
+            )
+            brief.set(source=source, snapshot_id=snapshot_id)
+        return result, source
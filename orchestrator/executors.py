@@ -0,0 +1,131 @@
+"""
+Bounded worker pools for running blocking work off the FastAPI event loop.
+
+Each pool owns its own threads, so slow Whisper transcriptions and crew runs
+never compete with each other or stall cheap endpoints like /health. A pool
+admits at most ``max_workers + max_queue`` jobs; beyond that it rejects new
+work immediately with a Retry-After estimate instead of letting latency grow
+without bound.
+"""
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from observability.tracing import in_context
+
+
+class PoolSaturated(Exception):
+    """Raised when a pool's admission queue is full"""
+
+    def __init__(self, pool: str, retry_after: int):
+        super().__init__(f"{pool} pool is at capacity, retry in {retry_after}s")
+        self.pool = pool
+        self.retry_after = retry_after
+
+
+class DeadlineExceeded(Exception):
+    """Raised when a job does not finish within its deadline"""
+
+    def __init__(self, pool: str, timeout: float):
+        super().__init__(f"{pool} job did not finish within {timeout}s")
+        self.pool = pool
+        self.timeout = timeout
+
+
+class WorkerPool:
+    def __init__(self, name: str, max_workers: int = 1, max_queue: int = 4,
+                 timeout: Optional[float] = None):
+        self.name = name
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self.completed = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self._admitted = 0
+        self._avg_duration = 1.0
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+
+    @property
+    def capacity(self) -> int:
+        return self.max_workers + self.max_queue
+
+    def retry_after(self) -> int:
+        """Seconds until a slot is likely to free up"""
+        with self._lock:
+            backlog = max(1, self._admitted - self.max_workers + 1)
+            return max(1, int(round(self._avg_duration * backlog / self.max_workers)))
+
+    def _admit(self):
+        with self._lock:
+            if self._admitted >= self.capacity:
+                self.rejected += 1
+                full = True
+            else:
+                self._admitted += 1
+                full = False
+        if full:
+            raise PoolSaturated(self.name, self.retry_after())
+
+    def _release(self, duration: float):
+        with self._lock:
+            self._admitted -= 1
+            self.completed += 1
+            self._avg_duration = 0.8 * self._avg_duration + 0.2 * duration
+
+    def submit(self, func: Callable[..., Any], *args, **kwargs):
+        """Admit a job and start it on the pool, returning a concurrent future"""
+        self._admit()
+        started = time.monotonic()
+        try:
+            # Run in the caller's context so the job's spans join the request trace
+            future = self._executor.submit(in_context(func), *args, **kwargs)
+        except Exception:
+            self._release(0.0)
+            raise
+        # The slot is held until the work really stops (or is cancelled before
+        # starting), even when the caller has already given up on its deadline
+        future.add_done_callback(lambda _: self._release(time.monotonic() - started))
+        return future
+
+    async def run(self, func: Callable[..., Any], *args,
+                  timeout: Optional[float] = None, **kwargs) -> Any:
+        """Run a blocking callable on the pool and await it with a deadline"""
+        timeout = self.timeout if timeout is None else timeout
+        future = asyncio.wrap_future(self.submit(func, *args, **kwargs))
+        try:
+            return await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            with self._lock:
+                self.timed_out += 1
+            raise DeadlineExceeded(self.name, timeout)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'workers': self.max_workers,
+                'capacity': self.capacity,
+                'in_flight': self._admitted,
+                'completed': self.completed,
+                'rejected': self.rejected,
+                'timed_out': self.timed_out,
+                'avg_duration': round(self._avg_duration, 3),
+            }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+def pool_from_env(name: str, workers: int, queue: int, timeout: float) -> WorkerPool:
+    """Build a pool configured by <NAME>_WORKERS, <NAME>_QUEUE and <NAME>_TIMEOUT"""
+    prefix = name.upper()
+    return WorkerPool(
+        name,
+        max_workers=int(os.getenv(f"{prefix}_WORKERS", str(workers))),
+        max_queue=int(os.getenv(f"{prefix}_QUEUE", str(queue))),
+        timeout=float(os.getenv(f"{prefix}_TIMEOUT", str(timeout)))
+    )
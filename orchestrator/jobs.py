@@ -0,0 +1,172 @@
+"""
+In-process job queue for asynchronous brief generation.
+
+Jobs are ordered by priority (interactive voice requests before standard text
+requests before batch/scheduled briefs) and then by arrival, and executed by a
+fixed set of worker threads. Each job records its progress as a list of
+events that clients can poll or stream while the brief is being built.
+"""
+import heapq
+import itertools
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from enum import IntEnum
+from typing import Any, Callable, Dict, List, Optional
+
+from orchestrator.executors import PoolSaturated
+
+QUEUED = 'queued'
+RUNNING = 'running'
+SUCCEEDED = 'succeeded'
+FAILED = 'failed'
+
+
+class Priority(IntEnum):
+    INTERACTIVE = 0
+    STANDARD = 1
+    BATCH = 2
+
+
+@dataclass
+class BriefJob:
+    query: str
+    priority: Priority = Priority.STANDARD
+    payload: Dict[str, Any] = field(default_factory=dict)
+    id: str = field(default_factory=lambda: uuid.uuid4().hex)
+    status: str = QUEUED
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    result: Any = None
+    error: Optional[str] = None
+    events: List[Dict[str, Any]] = field(default_factory=list)
+
+    def __post_init__(self):
+        self._lock = threading.Lock()
+        self.report(QUEUED, "Waiting for a worker")
+
+    @property
+    def done(self) -> bool:
+        return self.status in (SUCCEEDED, FAILED)
+
+    def report(self, stage: str, message: str = '', **data):
+        """Append a progress event"""
+        with self._lock:
+            self.events.append(dict({'stage': stage, 'message': message, 'time': time.time()}, **data))
+
+    def finish(self, status: str, message: str, result: Any = None, error: Optional[str] = None):
+        """Record the outcome; the status changes last, so a reader that sees the job done
+        also sees its result, finish time and final event"""
+        with self._lock:
+            self.result = result
+            self.error = error
+            self.finished_at = time.time()
+            self.events.append({'stage': status, 'message': message, 'time': self.finished_at})
+            self.status = status
+
+    def to_dict(self, include_result: bool = True) -> Dict[str, Any]:
+        data = {
+            'job_id': self.id,
+            'status': self.status,
+            'priority': self.priority.name.lower(),
+            'query': self.query,
+            'created_at': self.created_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+            'progress': self.events[-1] if self.events else None,
+        }
+        if include_result:
+            data['result'] = self.result
+            data['error'] = self.error
+        return data
+
+
+class JobQueue:
+    def __init__(self, handler: Callable[[BriefJob], Any], workers: int = 2,
+                 max_pending: int = 100, retain: int = 1000):
+        self.handler = handler
+        self.workers = workers
+        self.max_pending = max_pending
+        self.retain = retain
+        self._heap: List = []
+        self._counter = itertools.count()
+        self._jobs: "OrderedDict[str, BriefJob]" = OrderedDict()
+        self._available = threading.Condition()
+        self._running = 0
+        self._stopped = False
+        self._threads = [threading.Thread(target=self._work, name=f'brief-worker-{i}', daemon=True)
+                         for i in range(workers)]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, query: str, priority: Priority = Priority.STANDARD, **payload) -> BriefJob:
+        """Queue a job, rejecting it when the backlog is full"""
+        with self._available:
+            if len(self._heap) >= self.max_pending:
+                raise PoolSaturated('brief', retry_after=self._retry_after())
+            job = BriefJob(query=query, priority=priority, payload=payload)
+            heapq.heappush(self._heap, (job.priority, next(self._counter), job))
+            self._jobs[job.id] = job
+            self._trim()
+            self._available.notify()
+            return job
+
+    def get(self, job_id: str) -> Optional[BriefJob]:
+        with self._available:
+            return self._jobs.get(job_id)
+
+    def _retry_after(self) -> int:
+        # Rough estimate from the average run time of recent jobs
+        durations = [job.finished_at - job.started_at for job in self._jobs.values()
+                     if job.done and job.started_at and job.finished_at][-20:]
+        average = sum(durations) / len(durations) if durations else 30.0
+        return max(1, int(average * len(self._heap) / self.workers))
+
+    def _trim(self):
+        # Forget the oldest finished jobs once we hold more than `retain`
+        excess = len(self._jobs) - self.retain
+        for job_id in [job_id for job_id, job in self._jobs.items() if job.done][:max(0, excess)]:
+            del self._jobs[job_id]
+
+    def _work(self):
+        while True:
+            with self._available:
+                self._available.wait_for(lambda: self._heap or self._stopped)
+                if self._stopped:
+                    return
+                _, _, job = heapq.heappop(self._heap)
+                self._running += 1
+
+            job.status = RUNNING
+            job.started_at = time.time()
+            job.report(RUNNING, "Generating brief")
+            try:
+                result = self.handler(job)
+            except Exception as e:
+                job.finish(FAILED, f"Brief failed: {e}", error=str(e))
+            else:
+                job.finish(SUCCEEDED, "Brief ready", result=result)
+
+            with self._available:
+                self._running -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._available:
+            pending = {priority.name.lower(): 0 for priority in Priority}
+            for priority, _, _ in self._heap:
+                pending[Priority(priority).name.lower()] += 1
+            return {
+                'workers': self.workers,
+                'running': self._running,
+                'pending': pending,
+                'max_pending': self.max_pending,
+                'tracked_jobs': len(self._jobs),
+            }
+
+    def shutdown(self):
+        with self._available:
+            self._stopped = True
+            self._available.notify_all()
@@ -0,0 +1,228 @@
+"""
+Deterministic fast path for structured questions.
+
+``classify`` maps a question to the datasets it asks about (exposure,
+portfolio risk, earnings surprises and calendar, sentiment, breadth) with
+keyword patterns, no model involved. When it asks for one or more of them
+and nothing open-ended, ``render`` answers straight from the
+``MarketDataAgent`` numbers in milliseconds. Anything open-ended ("why",
+"should we", forecasts, news), unrecognised, or needing data the agent does
+not have goes to the crew. Questions naming companies in the universe are
+narrowed to those companies.
+"""
+import math
+import os
+import re
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional, Tuple
+
+INTENT_PATTERNS = {
+    'exposure': r'\b(exposure|exposed|allocation|weight(s|ing)?|holdings?|positions?|market caps?|concentrat\w*)\b',
+    'earnings': r'\b(earnings?|surprises?|beats?|miss(es|ed)?|eps|quarterly results)\b',
+    'calendar': r'\b(upcoming|calendar|scheduled|announc\w*|(this|next) (week|month))\b',
+    'sentiment': r'\b(sentiment|mood|risk[- ]on|risk[- ]off|ind(ex|ices)|yields?|treasur(y|ies)|rates?)\b',
+    'risk': r'\b(var|value at risk|volatility|expected shortfall|diversifi\w*|risk contributions?)\b',
+    'breadth': r'\b(breadth|advanc\w*|declin\w*|performance|performing|returns?|movers?|gainers?|losers?)\b',
+}
+
+# Reasoning, advice or outside information is the crew's job
+OPEN_ENDED = re.compile(
+    r'\b(why|should|explain|predict\w*|forecast\w*|recommend\w*|think|opinion|strategy|'
+    r'outlook|what if|how will|will (it|they|the)|news|compare|versus|vs|hedge|buy|sell)\b'
+)
+
+SECTION_ORDER = ('exposure', 'risk', 'earnings', 'calendar', 'sentiment', 'breadth')
+
+# Brief source reported for answers rendered without the crew
+FAST_PATH = 'fast_path'
+
+
+@dataclass
+class Route:
+    intents: Tuple[str, ...]
+    fast: bool
+    reason: str
+    companies: Tuple[str, ...] = ()
+
+
+def intents_for(market_data) -> Tuple[str, ...]:
+    """Intents the agent has data for; portfolio risk needs a positions file"""
+    if getattr(market_data, 'positions_file', None):
+        return SECTION_ORDER
+    return tuple(intent for intent in SECTION_ORDER if intent != 'risk')
+
+
+def classify(query: Optional[str], companies: Tuple[str, ...] = (),
+             available: Tuple[str, ...] = SECTION_ORDER) -> Route:
+    """Decide whether a question can be answered from the numbers alone, using only
+    the `available` intents"""
+    text = re.sub(r'\s+', ' ', (query or '').lower()).strip()
+    if not text:
+        return Route((), False, 'empty query: full brief')
+    mentioned = tuple(name for name in companies if name.lower() in text)
+    if OPEN_ENDED.search(text):
+        return Route((), False, 'open-ended question', mentioned)
+    intents = tuple(intent for intent in SECTION_ORDER if re.search(INTENT_PATTERNS[intent], text))
+    if not intents:
+        return Route((), False, 'no structured intent recognised', mentioned)
+    missing = tuple(intent for intent in intents if intent not in available)
+    if missing:
+        return Route((), False, 'no data for: ' + ', '.join(missing), mentioned)
+    return Route(intents, True, 'structured intents: ' + ', '.join(intents), mentioned)
+
+
+def _pct(value: float, signed: bool = True) -> str:
+    return f"{value:+.1f}%" if signed else f"{value:.1f}%"
+
+
+def _valid(value: Any) -> bool:
+    return isinstance(value, (int, float)) and not math.isnan(value)
+
+
+def render_exposure(data: Tuple[float, Dict[str, float]], companies: Tuple[str, ...] = ()) -> str:
+    _, exposure = data
+    if not exposure:
+        return "Exposure data is currently unavailable."
+    ranked = sorted(exposure.items(), key=lambda item: item[1], reverse=True)
+    if companies:
+        shares = [f"{name} {_pct(weight, False)}" for name, weight in ranked if name in companies]
+        if shares:
+            return f"Share of the tracked universe by market cap: {', '.join(shares)}."
+    top_name, top_weight = ranked[0]
+    top3 = sum(weight for _, weight in ranked[:3])
+    shares = ', '.join(f"{name} {_pct(weight, False)}" for name, weight in ranked)
+    return (f"Exposure across {len(ranked)} tracked names by market cap: {shares}. "
+            f"{top_name} is the largest position at {_pct(top_weight, False)}, "
+            f"and the top three make up {_pct(top3, False)}.")
+
+
+def _money(value: float) -> str:
+    for bound, suffix in ((1e9, 'B'), (1e6, 'M'), (1e3, 'K')):
+        if abs(value) >= bound:
+            return f"{value / bound:,.1f}{suffix}"
+    return f"{value:,.0f}"
+
+
+def render_risk(risk: Dict[str, Any], companies: Tuple[str, ...] = ()) -> str:
+    if risk.get('error'):
+        return f"Portfolio risk is unavailable: {risk['error']}."
+    if 'daily_volatility' not in risk:
+        return "Not enough price history yet to estimate portfolio risk."
+    confidence = f"{risk['confidence'] * 100:g}%"
+    text = (f"Our book of {risk['positions']} positions has {_money(risk['gross_exposure'])} gross "
+            f"and {_money(risk['net_exposure'])} net exposure. One-day {confidence} VaR is "
+            f"{_money(risk['historical_var'])} historical and {_money(risk['parametric_var'])} parametric, "
+            f"with expected shortfall of {_money(risk['expected_shortfall'])} "
+            f"and daily volatility of {risk['daily_volatility']:.2f}%.")
+    contributions = risk.get('risk_contribution') or {}
+    named = [(name, share) for name, share in contributions.items() if not companies or name in companies]
+    if named:
+        shown = sorted(named, key=lambda item: -item[1])[:3]
+        text += " Largest risk contributors: " + ', '.join(
+            f"{name} {_pct(share, False)} of variance" for name, share in shown) + "."
+    concentration = risk.get('concentration') or {}
+    if concentration.get('effective_positions'):
+        text += (f" The largest position is {_pct(concentration['largest'], False)} of gross exposure, "
+                 f"about {concentration['effective_positions']:.1f} effective positions.")
+    return text
+
+
+def render_earnings(surprises: Dict[str, float], companies: Tuple[str, ...] = ()) -> str:
+    reported = {name: float(value) for name, value in surprises.items()
+                if _valid(value) and (not companies or name in companies)}
+    if not reported:
+        return "No earnings surprises have been reported for these companies yet."
+    beats = sorted(((n, v) for n, v in reported.items() if v > 0), key=lambda item: -item[1])
+    misses = sorted(((n, v) for n, v in reported.items() if v < 0), key=lambda item: item[1])
+    parts = [f"Earnings surprises: {len(beats)} beat{'s' if len(beats) != 1 else ''} "
+             f"and {len(misses)} miss{'es' if len(misses) != 1 else ''}."]
+    if beats:
+        parts.append("Beats: " + ', '.join(f"{n} {_pct(v)}" for n, v in beats) + ".")
+    if misses:
+        parts.append("Misses: " + ', '.join(f"{n} {_pct(v)}" for n, v in misses) + ".")
+    return ' '.join(parts)
+
+
+def render_calendar(calendar: Dict[str, Any], companies: Tuple[str, ...] = ()) -> str:
+    def wanted(events):
+        return [event for event in events if not companies or event['name'] in companies]
+
+    upcoming, recent = wanted(calendar.get('upcoming') or []), wanted(calendar.get('recent') or [])
+    parts = []
+    if upcoming:
+        parts.append("Reporting in the next week: " + ', '.join(
+            f"{event['name']} on {event['date'][:10]}" for event in upcoming) + ".")
+    else:
+        parts.append("No earnings announcements are scheduled in the next week.")
+    if recent:
+        parts.append("Reported in the last 30 days: " + ', '.join(
+            f"{event['name']} ({_pct(event['surprise'])} surprise)" for event in reversed(recent)) + ".")
+    return ' '.join(parts)
+
+
+def render_sentiment(sentiment: Dict[str, Any], companies: Tuple[str, ...] = ()) -> str:
+    if not sentiment.get('factors'):
+        return "Market sentiment data is currently unavailable."
+    moves = []
+    for factor in sentiment['factors']:
+        if 'index' in factor:
+            direction = 'up' if factor['change'] > 0 else 'down'
+            moves.append(f"{factor['index']} {direction} {abs(factor['change']):.1f}%")
+        else:
+            moves.append(f"the {factor['factor']} {'up' if factor['change'] > 0 else 'down'} "
+                         f"{abs(factor['change']):.2f} points, which is {factor['impact']}")
+    return f"Overall sentiment is {sentiment['overall']}: " + ', '.join(moves) + "."
+
+
+def render_breadth(breadth: Dict[str, Any], companies: Tuple[str, ...] = ()) -> str:
+    returns, counts = breadth.get('returns') or {}, breadth.get('breadth') or {}
+    if not returns:
+        return "Price history for breadth is currently unavailable."
+    if companies:
+        lines = []
+        for name in companies:
+            values = returns.get(name) or {}
+            moves = [f"{_pct(values[window])} {'today' if int(window) == 1 else f'over {window} days'}"
+                     for window in counts if _valid(values.get(window))]
+            if moves:
+                lines.append(f"{name} is {', '.join(moves)}.")
+        if lines:
+            return ' '.join(lines)
+    parts = []
+    for window, stats in counts.items():
+        label = 'today' if int(window) == 1 else f"over {window} days"
+        parts.append(f"{stats['advancers']} advancing and {stats['decliners']} declining {label}")
+    text = "Breadth: " + '; '.join(parts) + "."
+    windows = list(counts)
+    if windows:
+        window = windows[min(1, len(windows) - 1)]
+        ranked = sorted(((name, values.get(window)) for name, values in returns.items()
+                         if _valid(values.get(window))),
+                        key=lambda item: item[1], reverse=True)
+        if ranked:
+            text += (f" Over {window} days the best performer is {ranked[0][0]} ({_pct(ranked[0][1])})"
+                     + (f" and the weakest is {ranked[-1][0]} ({_pct(ranked[-1][1])})." if len(ranked) > 1 else "."))
+    return text
+
+
+RENDERERS: Dict[str, Tuple[str, Callable[..., str]]] = {
+    'exposure': ('get_portfolio_exposure', render_exposure),
+    'risk': ('get_portfolio_risk', render_risk),
+    'earnings': ('get_earnings_surprises', render_earnings),
+    'calendar': ('get_earnings_calendar', render_calendar),
+    'sentiment': ('get_market_sentiment', render_sentiment),
+    'breadth': ('get_sector_breadth', render_breadth),
+}
+
+
+def render(route: Route, market_data) -> str:
+    """Answer a fast-path route from the agent's (cached) tool results"""
+    sections = []
+    for intent in route.intents:
+        method, renderer = RENDERERS[intent]
+        sections.append(renderer(getattr(market_data, method)(), route.companies))
+    return ' '.join(sections)
+
+
+def router_enabled() -> bool:
+    return os.getenv("INTENT_ROUTER", "on").lower() not in ('0', 'off', 'false', 'no')
@@ -0,0 +1,231 @@
+"""
+Pre-market warm-up and pre-rendered morning briefs.
+
+``PremarketScheduler`` wakes ``lead`` minutes before each configured market
+open. It drops stale market data, prefetches every dataset the crew tools
+use and runs the crew once per configured query. The rendered brief lands in
+the shared brief cache under the fresh snapshot id, so requests for the same
+question are cache reads until the market data changes. The scheduler also
+keeps the latest brief (and, with a ``synthesize`` callable, its audio) for
+direct serving.
+
+The schedule comes from ``BRIEF_SCHEDULE``, a comma-separated list of
+exchanges from ``MARKET_SESSIONS`` or ``Area/City@HH:MM`` entries, e.g.
+``TSE,HKEX,Europe/London@08:00,America/New_York@09:30``.
+"""
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, time as dtime, timedelta
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import pytz
+
+from data_ingestion.cache import MARKET_SESSIONS
+from observability import tracing
+from orchestrator.brief_cache import normalize_query
+
+logger = logging.getLogger(__name__)
+
+# (label, timezone, local opening time)
+MarketOpen = Tuple[str, str, dtime]
+
+
+def parse_schedule(spec: str) -> List[MarketOpen]:
+    """'TSE,America/New_York@09:30' -> [('TSE', 'Asia/Tokyo', 09:00), ('America/New_York', ..., 09:30)]"""
+    opens = []
+    for entry in filter(None, (part.strip() for part in spec.split(','))):
+        if entry in MARKET_SESSIONS:
+            tz_name, sessions = MARKET_SESSIONS[entry]
+            opens.append((entry, tz_name, sessions[0][0]))
+            continue
+        tz_name, sep, clock = entry.partition('@')
+        if not sep:
+            raise ValueError(f"Unknown market '{entry}'; use an exchange name or Area/City@HH:MM")
+        pytz.timezone(tz_name)
+        hour, minute = (int(part) for part in clock.split(':'))
+        opens.append((tz_name, tz_name, dtime(hour, minute)))
+    return opens
+
+
+def next_open(market: MarketOpen, now: datetime) -> datetime:
+    """The next weekday opening of `market` strictly after `now` (UTC)"""
+    _, tz_name, opens_at = market
+    tz = pytz.timezone(tz_name)
+    local_date = now.astimezone(tz).date()
+    for days in range(8):
+        day = local_date + timedelta(days=days)
+        if day.weekday() >= 5:
+            continue
+        opening = tz.localize(datetime.combine(day, opens_at)).astimezone(pytz.utc)
+        if opening > now:
+            return opening
+    raise RuntimeError(f"No opening found for {tz_name}")
+
+
+@dataclass
+class PrerenderedBrief:
+    market: str
+    query: str
+    brief: str
+    snapshot_id: str
+    source: str
+    rendered_at: float = field(default_factory=time.time)
+    seconds: float = 0.0
+    audio: Optional[bytes] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'market': self.market,
+            'query': self.query,
+            'brief': self.brief,
+            'snapshot_id': self.snapshot_id,
+            'source': self.source,
+            'rendered_at': self.rendered_at,
+            'seconds': round(self.seconds, 3),
+            'has_audio': self.audio is not None,
+        }
+
+
+class PremarketScheduler:
+    def __init__(self, crew_factory: Callable[[], Any], schedule: List[MarketOpen],
+                 queries: Optional[List[str]] = None, lead: float = 15 * 60,
+                 synthesize: Optional[Callable[[str], bytes]] = None,
+                 clock: Callable[[], datetime] = lambda: datetime.now(pytz.utc)):
+        self.crew_factory = crew_factory
+        self.schedule = schedule
+        # An empty query is the generic morning brief
+        self.queries = queries or ['']
+        self.lead = lead
+        self.synthesize = synthesize
+        self.clock = clock
+        self.runs = 0
+        self.failures = 0
+        self.last_run: Optional[Dict[str, Any]] = None
+        self._briefs: Dict[str, PrerenderedBrief] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._fired = set()
+
+    def next_run(self) -> Optional[Tuple[datetime, str, datetime]]:
+        """(when the next warm-up is due, for which market, that market's opening)"""
+        if not self.schedule:
+            return None
+        now = self.clock()
+        runs = []
+        for market in self.schedule:
+            opening = next_open(market, now)
+            if (market[0], opening) in self._fired:
+                opening = next_open(market, opening)
+            due = opening - timedelta(seconds=self.lead)
+            # Inside the lead window already: warm up right away
+            runs.append((max(due, now), market[0], opening))
+        return min(runs)
+
+    def warm(self, market: str = 'manual') -> List[PrerenderedBrief]:
+        """Refresh market data and render every configured brief now"""
+        started = time.monotonic()
+        rendered = []
+        with tracing.trace('premarket_warmup', market=market):
+            crew = self.crew_factory()
+            market_data = crew.market_data
+            with tracing.span('warmup.prefetch'):
+                # Overnight entries, and the shared snapshot, may still be inside their closed-market TTL
+                if market_data.cache is not None:
+                    market_data.cache.invalidate()
+                snapshot_id = market_data.get_market_snapshot(refresh=True).id
+                market_data.get_sector_breadth()
+
+            for query in self.queries:
+                query_started = time.monotonic()
+                brief, source = crew.run_brief(query or None)
+                brief = str(brief)
+                if brief.startswith("Error"):
+                    raise RuntimeError(brief)
+                entry = PrerenderedBrief(market, query, brief, snapshot_id, source,
+                                         seconds=time.monotonic() - query_started)
+                if self.synthesize is not None:
+                    with tracing.span('tts', characters=len(brief)):
+                        entry.audio = self.synthesize(brief)
+                with self._lock:
+                    self._briefs[normalize_query(query)] = entry
+                rendered.append(entry)
+
+        with self._lock:
+            self.runs += 1
+            self.last_run = {
+                'market': market,
+                'finished_at': time.time(),
+                'seconds': round(time.monotonic() - started, 3),
+                'briefs': len(rendered),
+                'snapshot_id': snapshot_id,
+            }
+        logger.info(f"Pre-rendered {len(rendered)} brief(s) for {market} in {self.last_run['seconds']}s")
+        return rendered
+
+    def get(self, query: str = '', snapshot_id: Optional[str] = None) -> Optional[PrerenderedBrief]:
+        """The pre-rendered brief for a query, unless the market data has moved on since"""
+        with self._lock:
+            entry = self._briefs.get(normalize_query(query))
+        if entry is None or (snapshot_id is not None and entry.snapshot_id != snapshot_id):
+            return None
+        return entry
+
+    def _loop(self):
+        while not self._stop.is_set():
+            due, market, opening = self.next_run()
+            wait = (due - self.clock()).total_seconds()
+            if wait > 0 and self._stop.wait(wait):
+                return
+            # Never fire twice for the same opening, even if the warm-up fails
+            self._fired = {(name, day) for name, day in self._fired if day >= opening - timedelta(days=1)}
+            self._fired.add((market, opening))
+            try:
+                self.warm(market)
+            except Exception as e:
+                with self._lock:
+                    self.failures += 1
+                logger.error(f"Pre-market warm-up for {market} failed: {str(e)}")
+
+    def start(self) -> 'PremarketScheduler':
+        if self._thread is None and self.schedule:
+            self._thread = threading.Thread(target=self._loop, name='premarket-scheduler', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def stats(self) -> Dict[str, Any]:
+        upcoming = self.next_run()
+        with self._lock:
+            return {
+                'markets': [market[0] for market in self.schedule],
+                'lead_seconds': self.lead,
+                'next_run': upcoming[0].isoformat() if upcoming else None,
+                'next_market': upcoming[1] if upcoming else None,
+                'runs': self.runs,
+                'failures': self.failures,
+                'last_run': self.last_run,
+                'briefs': sorted(self._briefs),
+            }
+
+
+def scheduler_from_env(crew_factory: Callable[[], Any],
+                       synthesize: Optional[Callable[[str], bytes]] = None) -> Optional[PremarketScheduler]:
+    """Build a scheduler from BRIEF_SCHEDULE, BRIEF_LEAD_MINUTES and BRIEF_PRERENDER_QUERIES;
+    None when no schedule is configured"""
+    spec = os.getenv("BRIEF_SCHEDULE", "")
+    if not spec.strip():
+        return None
+    queries = [query.strip() for query in os.getenv("BRIEF_PRERENDER_QUERIES", "").split('|')]
+    return PremarketScheduler(
+        crew_factory,
+        parse_schedule(spec),
+        queries=[''] + [query for query in queries if query],
+        lead=float(os.getenv("BRIEF_LEAD_MINUTES", "15")) * 60,
+        synthesize=synthesize
+    )
@@ -0,0 +1,187 @@
+"""
+Lazy loading, background warm-up and startup profiling.
+
+Heavy dependencies (crewai/langchain, Whisper and its model) are wrapped in
+``LazyResource`` objects instead of being imported at module import time.
+Depending on ``STARTUP_MODE`` they are loaded synchronously at startup
+(``eager``), in a background warm-up thread (``background``, the default) or
+on first use (``lazy``). Every import and initialization step is timed into a
+process-wide ``StartupProfile`` so slow components show up in one report.
+"""
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+PENDING = 'pending'
+LOADING = 'loading'
+READY = 'ready'
+FAILED = 'failed'
+
+EAGER = 'eager'
+BACKGROUND = 'background'
+LAZY = 'lazy'
+
+# Monotonic reference for the whole report, taken when this module is imported
+PROCESS_START = time.monotonic()
+
+
+class StartupProfile:
+    """Wall-clock timings of import and initialization steps"""
+
+    def __init__(self):
+        self._steps: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def measure(self, component: str):
+        started = time.monotonic()
+        error = None
+        try:
+            yield
+        except BaseException as e:
+            error = str(e)
+            raise
+        finally:
+            step = {
+                'component': component,
+                'started_at': round(started - PROCESS_START, 4),
+                'seconds': round(time.monotonic() - started, 4),
+                'thread': threading.current_thread().name,
+            }
+            if error is not None:
+                step['error'] = error
+            with self._lock:
+                self._steps.append(step)
+
+    def record(self, component: str, started: float):
+        """Record a step that began at the monotonic time `started` and ends now"""
+        with self._lock:
+            self._steps.append({
+                'component': component,
+                'started_at': round(started - PROCESS_START, 4),
+                'seconds': round(time.monotonic() - started, 4),
+                'thread': threading.current_thread().name,
+            })
+
+    def report(self) -> Dict[str, Any]:
+        with self._lock:
+            steps = sorted(self._steps, key=lambda step: step['started_at'])
+        return {
+            'uptime': round(time.monotonic() - PROCESS_START, 4),
+            'total_seconds': round(sum(step['seconds'] for step in steps), 4),
+            'steps': steps,
+        }
+
+
+profile = StartupProfile()
+
+
+class LazyResource:
+    """A value built once on first use or by a warm-up thread, whichever comes first"""
+
+    def __init__(self, name: str, loader: Callable[[], Any], required: bool = True):
+        self.name = name
+        self.loader = loader
+        self.required = required
+        self.state = PENDING
+        self.error: Optional[str] = None
+        self.seconds: Optional[float] = None
+        self._value = None
+        self._condition = threading.Condition()
+
+    @property
+    def ready(self) -> bool:
+        return self.state == READY
+
+    def get(self, timeout: Optional[float] = None) -> Any:
+        """Return the value, loading it on this thread or waiting for the thread that is"""
+        with self._condition:
+            if self.state == LOADING:
+                self._condition.wait_for(lambda: self.state != LOADING, timeout)
+            if self.state == READY:
+                return self._value
+            if self.state == FAILED:
+                return None
+            if self.state == LOADING:
+                raise TimeoutError(f"{self.name} is still loading")
+            self.state = LOADING
+
+        started = time.monotonic()
+        try:
+            with profile.measure(self.name):
+                value = self.loader()
+        except Exception as e:
+            with self._condition:
+                self.state = FAILED
+                self.error = str(e)
+                self.seconds = time.monotonic() - started
+                self._condition.notify_all()
+            return None
+
+        with self._condition:
+            self._value = value
+            self.state = READY
+            self.seconds = time.monotonic() - started
+            self._condition.notify_all()
+        return value
+
+    def set(self, value: Any):
+        """Install a ready value without running the loader (benchmarks, tests)"""
+        with self._condition:
+            self._value = value
+            self.state = READY
+            self.error = None
+            self._condition.notify_all()
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            'state': self.state,
+            'required': self.required,
+            'seconds': round(self.seconds, 4) if self.seconds is not None else None,
+            'error': self.error,
+        }
+
+
+def startup_mode() -> str:
+    mode = os.getenv("STARTUP_MODE", BACKGROUND).lower()
+    return mode if mode in (EAGER, BACKGROUND, LAZY) else BACKGROUND
+
+
+def warm_up(resources: Iterable[LazyResource], mode: Optional[str] = None) -> Optional[threading.Thread]:
+    """Load resources now, in a background thread, or not at all, per the startup mode"""
+    mode = mode or startup_mode()
+    resources = list(resources)
+    if mode == LAZY:
+        return None
+    if mode == EAGER:
+        for resource in resources:
+            resource.get()
+        return None
+
+    def run():
+        for resource in resources:
+            resource.get()
+
+    thread = threading.Thread(target=run, name='warm-up', daemon=True)
+    thread.start()
+    return thread
+
+
+def readiness(resources: Iterable[LazyResource], mode: Optional[str] = None) -> Dict[str, Any]:
+    """Ready once every required resource is loaded; in lazy mode unloaded ones count too"""
+    mode = mode or startup_mode()
+    statuses = {resource.name: resource.status() for resource in resources}
+    waiting = [name for name, status in statuses.items()
+               if status['required'] and status['state'] not in (READY, FAILED)
+               and not (mode == LAZY and status['state'] == PENDING)]
+    failed = [name for name, status in statuses.items()
+              if status['required'] and status['state'] == FAILED]
+    return {
+        'ready': not waiting and not failed,
+        'mode': mode,
+        'waiting': waiting,
+        'failed': failed,
+        'components': statuses,
+    }
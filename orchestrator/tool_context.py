@@ -0,0 +1,143 @@
+"""
+Per-run memoization of the market data tools handed to crew agents.
+
+An LLM agent may call the same tool several times in one brief, and parallel
+analysts may call tools at the same moment. ``ToolContext`` starts fetching
+every dataset concurrently when the crew starts. It then serves each tool
+call from the run's results: a repeated call reuses the finished result, and
+a call that overlaps one in flight waits for it. Failed fetches are not
+memoized, so a later call retries them. The context lives for one
+``run_crew``. The process-wide TTL cache still decides what is fetched from
+the network across runs.
+"""
+import functools
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+from observability import tracing
+from observability.metrics import counter
+
+# Market data methods exposed to the crew as tools
+TOOLS = ('get_portfolio_exposure', 'get_earnings_surprises', 'get_market_sentiment')
+# Added when the agent has positions to analyse
+RISK_TOOL = 'get_portfolio_risk'
+# Every base tool's result is in the market snapshot (MarketSnapshot.tool_results)
+SNAPSHOT_TOOLS = TOOLS
+
+tool_calls = counter('crew_tool_calls', "Crew tool calls by tool and outcome", ['tool', 'outcome'])
+
+
+def tools_for(market_data) -> Tuple[str, ...]:
+    return TOOLS + ((RISK_TOOL,) if getattr(market_data, 'positions_file', None) else ())
+
+
+class ToolContext:
+    def __init__(self, market_data, tools: Optional[Tuple[str, ...]] = None):
+        self.market_data = market_data
+        self.tools = tools or tools_for(market_data)
+        self._results: Dict[Hashable, Future] = {}
+        # Calls already served a result, to tell prefetch hits from repeats
+        self._served = set()
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self.calls = 0
+        self.fetches = 0
+        self.prefetch_hits = 0
+        self.deduplicated = 0
+
+    @staticmethod
+    def _key(name: str, args: tuple, kwargs: Dict[str, Any]) -> Hashable:
+        return (name, args, tuple(sorted(kwargs.items())))
+
+    def _future(self, key: Hashable) -> Tuple[Future, bool]:
+        """The run's future for this call, and whether this caller has to fill it"""
+        with self._lock:
+            future = self._results.get(key)
+            # A failed fetch is retried rather than served again
+            if future is not None and not (future.done() and future.exception() is not None):
+                return future, False
+            future = Future()
+            self._results[key] = future
+            self.fetches += 1
+            return future, True
+
+    def _fill(self, future: Future, name: str, args: tuple, kwargs: Dict[str, Any]):
+        try:
+            future.set_result(getattr(self.market_data, name)(*args, **kwargs))
+        except Exception as e:
+            future.set_exception(e)
+
+    def _fill_from_snapshot(self, futures: Dict[str, Future]):
+        try:
+            results = self.market_data.get_market_snapshot().tool_results()
+        except Exception as e:
+            for future in futures.values():
+                future.set_exception(e)
+            return
+        for name, future in futures.items():
+            future.set_result(results[name])
+
+    def call(self, name: str, *args, **kwargs) -> Any:
+        """Result of market_data.<name>(*args, **kwargs), fetched at most once per run"""
+        key = self._key(name, args, kwargs)
+        future, owner = self._future(key)
+        with self._lock:
+            self.calls += 1
+            if owner:
+                outcome = 'fetched'
+            elif key in self._served:
+                outcome = 'deduplicated'
+                self.deduplicated += 1
+            else:
+                outcome = 'prefetched'
+                self.prefetch_hits += 1
+            self._served.add(key)
+        tool_calls.inc(tool=name, outcome=outcome)
+        if owner:
+            self._fill(future, name, args, kwargs)
+        return future.result()
+
+    def prefetch(self) -> 'ToolContext':
+        """Start fetching every tool's data concurrently without waiting for it"""
+        # With a shared snapshot store, one snapshot read (usually another worker's) covers most tools
+        shared = SNAPSHOT_TOOLS if getattr(self.market_data, 'snapshot_store', None) is not None else ()
+        with tracing.span('crew.prefetch', tools=len(self.tools)):
+            self._executor = ThreadPoolExecutor(max_workers=len(self.tools), thread_name_prefix='tool-prefetch')
+            from_snapshot = {}
+            for name in self.tools:
+                future, owner = self._future(self._key(name, (), {}))
+                if owner and name in shared:
+                    from_snapshot[name] = future
+                elif owner:
+                    self._executor.submit(tracing.in_context(self._fill), future, name, (), {})
+            if from_snapshot:
+                self._executor.submit(tracing.in_context(self._fill_from_snapshot), from_snapshot)
+        return self
+
+    def tool(self, name: str) -> Callable[..., Any]:
+        """The memoized tool, with the name and docstring of the market data method"""
+        method = getattr(self.market_data, name)
+
+        @functools.wraps(method)
+        def memoized(*args, **kwargs):
+            return self.call(name, *args, **kwargs)
+        return memoized
+
+    def tool_list(self, names: Optional[Tuple[str, ...]] = None) -> List[Callable[..., Any]]:
+        return [self.tool(name) for name in names or self.tools]
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+
+    def __enter__(self) -> 'ToolContext':
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {'calls': self.calls, 'fetches': self.fetches,
+                    'prefetch_hits': self.prefetch_hits, 'deduplicated': self.deduplicated}
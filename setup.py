@@ -22,5 +22,6 @@ setup(
         "uvicorn>=0.27.0",
         "httpx>=0.26.0",
         "aiohttp>=3.9.3",
+        "pyyaml>=6.0",
     ],
 ) 
\ No newline at end of file
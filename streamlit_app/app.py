@@ -1,6 +1,7 @@
 import streamlit as st
 import requests
 from datetime import datetime
+import importlib.util
 import pytz
 import sys
 import os
@@ -8,33 +9,61 @@ from typing import List
 
 # Add parent directory to Python path
 try:
-    from orchestrator.crew_manager import FinancialCrew
+    import orchestrator
 except ImportError:
     # Try alternative import path for Streamlit Cloud
     sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-    from orchestrator.crew_manager import FinancialCrew
 
-# Initialize voice features if available
-VOICE_ENABLED = False
-try:
-    import speech_recognition as sr
-    import sounddevice as sd
-    import numpy as np
-    import whisper
-    import subprocess
-    VOICE_ENABLED = True
-except ImportError:
-    pass
+from orchestrator.startup import profile
+from orchestrator.client import ApiError, api_url, get_default_client
+
+# With BRIEF_API_URL set, briefs and market data come from the API service and
+# this app never imports crewai or Whisper; otherwise everything runs in-process
+CLIENT_MODE = api_url() is not None
+
+# Voice features are available when their packages are installed; the packages
+# themselves (and the Whisper model) are only imported on first use
+VOICE_PACKAGES = ("sounddevice", "numpy") if CLIENT_MODE else ("speech_recognition", "sounddevice", "numpy", "whisper")
+VOICE_ENABLED = all(importlib.util.find_spec(name) is not None for name in VOICE_PACKAGES)
+
+# Market panels are shared by every session for this many seconds
+PANEL_TTL = int(os.getenv("PANEL_TTL", "60"))
+PANELS = ('exposure', 'earnings', 'calendar', 'sentiment')
+
+@st.cache_resource
+def load_crew_class():
+    """Import crewai/langchain through the crew manager, once per process"""
+    with profile.measure("import:crewai"):
+        from orchestrator.crew_manager import FinancialCrew
+    return FinancialCrew
+
+@st.cache_resource
+def load_market_data():
+    from agents.market_data_agent import MarketDataAgent
+    return MarketDataAgent()
+
+@st.cache_data(ttl=PANEL_TTL, show_spinner=False)
+def load_panel(name):
+    """A market panel's data and one-line summary, from the API in client mode"""
+    if CLIENT_MODE:
+        return get_default_client().panel(name)
+    from orchestrator import router
+    method, renderer = router.RENDERERS[name]
+    data = getattr(load_market_data(), method)()
+    return {"panel": name, "text": renderer(data), "data": data}
 
 # Initialize Whisper model if voice is enabled
 @st.cache_resource
 def load_whisper_model():
     if VOICE_ENABLED:
-        return whisper.load_model("base")
+        with profile.measure("import:whisper"):
+            import whisper
+        with profile.measure("init:whisper_model"):
+            return whisper.load_model("base")
     return None
 
 def speak_text(text, rate=175):
-    """Speak the given text using macOS say command"""
+    """Start speaking the given text in the background, sentence by sentence"""
     if not VOICE_ENABLED:
         st.warning("Voice output is not available. Install voice dependencies to enable this feature.")
         return
@@ -43,61 +72,106 @@ def speak_text(text, rate=175):
         if not isinstance(text, str):
             text = str(text)
         rate = int(rate * 1.5)
-        process = subprocess.Popen(['say', '-r', str(rate), text])
-        try:
-            process.wait(timeout=30)
-        except subprocess.TimeoutExpired:
-            process.kill()
-            st.warning("Speech synthesis took too long and was interrupted")
+        # Returns as soon as playback starts; a new response interrupts the previous one
+        from voice.tts import get_default_tts
+        return get_default_tts().speak(text, rate)
     except Exception as e:
         st.error(f"Error in text-to-speech: {str(e)}")
 
-def record_audio(duration=5):
-    """Record audio from microphone"""
+def listen_and_transcribe(max_duration=15):
+    """Stream microphone audio through VAD and Whisper until the speaker stops"""
     if not VOICE_ENABLED:
         st.error("Voice input is not available. Install voice dependencies to enable this feature.")
-        return None, None
-        
-    sample_rate = 44100
-    recording = sd.rec(int(duration * sample_rate),
-                      samplerate=sample_rate, channels=1, dtype='float64')
-    st.info(f"Recording for {duration} seconds...")
-    sd.wait()
-    return recording.flatten().tolist(), sample_rate
-
-def process_audio(audio_data, sample_rate):
-    """Process audio using Whisper and CrewAI"""
-    if not VOICE_ENABLED:
-        return None, None
+        return None
         
     try:
-        # Convert audio to numpy array
-        audio_array = np.array(audio_data)
-        
-        # Transcribe audio
-        model = load_whisper_model()
-        result = model.transcribe(audio_array)
-        transcribed_text = result["text"]
+        from voice.streaming import StreamingTranscriber, stream_microphone
+        with st.spinner("Loading speech recognition..."):
+            model = load_whisper_model()
+        transcriber = StreamingTranscriber(lambda audio: model.transcribe(audio, fp16=False))
+        placeholder = st.empty()
+        placeholder.info("Listening... recording stops when you stop talking")
         
-        # Process with CrewAI
-        crew = FinancialCrew()
-        response = crew.run_crew()
-        
-        return transcribed_text, response
+        transcribed_text = ""
+        for event in stream_microphone(transcriber, max_duration):
+            transcribed_text = event["text"]
+            suffix = "" if event["type"] == "final" else " ..."
+            placeholder.info(f"You said: {transcribed_text}{suffix}")
+        return transcribed_text or None
     except Exception as e:
         st.error(f"Error processing audio: {str(e)}")
-        return None, None
+        return None
 
 def process_text(text):
-    """Process text using CrewAI"""
+    """Answer from the numbers when possible, otherwise with CrewAI"""
+    if CLIENT_MODE:
+        result = process_remote(text=text)
+        return result.get("response") if result else None
     try:
-        crew = FinancialCrew()
-        response = crew.run_crew()
+        crew = load_crew_class()()
+        response, _ = crew.run_brief(text)
         return response
     except Exception as e:
         st.error(f"Error processing text: {str(e)}")
         return None
 
+def process_remote(text=None, wav=None):
+    """Queue a brief on the API and show its progress, and each finished analysis, as it arrives"""
+    status = st.status("Waiting for a worker...", expanded=True)
+    
+    def on_progress(event):
+        message = event.get("message") or event.get("stage", "")
+        if event.get("stage") == "transcribed":
+            status.info(f"You said: {message}")
+        elif event.get("output"):
+            status.markdown(f"**{message}**")
+            status.write(event["output"])
+        status.update(label=message)
+    
+    try:
+        client = get_default_client()
+        if wav is not None:
+            result = client.brief_audio(wav, on_progress=on_progress)
+        else:
+            result = client.brief(text, on_progress=on_progress)
+        status.update(label="Brief ready", state="complete", expanded=False)
+        return result
+    except ApiError as e:
+        status.update(label="Brief failed", state="error")
+        if e.retry_after:
+            st.warning(f"The service is busy, please retry in {e.retry_after}s")
+        else:
+            st.error(f"Error processing request: {e.detail}")
+    except Exception as e:
+        status.update(label="Brief failed", state="error")
+        st.error(f"Error reaching the brief service: {str(e)}")
+    return None
+
+def listen_and_brief(max_duration=15):
+    """Client mode: record until the speaker stops, then transcribe and brief on the API"""
+    try:
+        from voice.audio import encode_wav
+        from voice.streaming import record_utterance
+        st.info("Listening... recording stops when you stop talking")
+        audio = record_utterance(max_duration=max_duration)
+    except Exception as e:
+        st.error(f"Error recording audio: {str(e)}")
+        return None
+    if not len(audio):
+        st.warning("No speech detected")
+        return None
+    result = process_remote(wav=encode_wav(audio, 16000))
+    return result.get("response") if result else None
+
+def show_market_panels():
+    with st.expander("Market overview"):
+        for tab, name in zip(st.tabs([name.title() for name in PANELS]), PANELS):
+            with tab:
+                try:
+                    st.write(load_panel(name)["text"])
+                except Exception as e:
+                    st.warning(f"{name.title()} data is unavailable: {str(e)}")
+
 def main():
     st.title("🎙️ AI Market Brief Assistant")
     st.write("Get your morning market brief with voice interaction!")
@@ -116,6 +190,12 @@ def main():
                     st.error("Voice output is disabled")
         else:
             st.warning("Voice features are not available. Install the required dependencies to enable voice interaction.")
+        
+        if CLIENT_MODE:
+            st.caption(f"Briefs run on {api_url()}")
+        else:
+            with st.expander("Startup profile"):
+                st.json(profile.report())
 
     # Display current time in different time zones
     col1, col2, col3 = st.columns(3)
@@ -127,6 +207,8 @@ def main():
     with col3:
         st.write("Tokyo:", now.astimezone(pytz.timezone('Asia/Tokyo')).strftime("%H:%M"))
 
+    show_market_panels()
+
     # Create tabs for different input methods
     if VOICE_ENABLED:
         tab1, tab2 = st.tabs(["Voice Input", "Text Input"])
@@ -135,20 +217,21 @@ def main():
             st.subheader("Voice Input")
             col1, col2 = st.columns([1, 3])
             with col1:
-                duration = st.number_input("Recording duration (seconds)", min_value=1, max_value=10, value=5)
+                duration = st.number_input("Maximum recording (seconds)", min_value=1, max_value=30, value=15)
             
             if st.button("🎤 Start Recording"):
-                audio_data, sample_rate = record_audio(duration)
-                if audio_data and sample_rate:
-                    transcribed_text, response = process_audio(audio_data, sample_rate)
+                if CLIENT_MODE:
+                    response = listen_and_brief(duration)
+                else:
+                    transcribed_text = listen_and_transcribe(duration)
+                    response = process_text(transcribed_text) if transcribed_text else None
+                
+                if response:
+                    st.success("AI Response:")
+                    st.write(response)
                     
-                    if transcribed_text and response:
-                        st.info(f"You said: {transcribed_text}")
-                        st.success("AI Response:")
-                        st.write(response)
-                        
-                        if voice_enabled:
-                            speak_text(response, voice_speed)
+                    if voice_enabled:
+                        speak_text(response, voice_speed)
     else:
         tab2 = st.empty()
 
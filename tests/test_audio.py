@@ -0,0 +1,56 @@
+import struct
+
+import numpy as np
+import pytest
+
+from voice.audio import AudioDecodeError, decode_upload, decode_wav, encode_wav
+
+
+def wav(channels: int = 1, sample_rate: int = 16000, bits: int = 16, frames: int = 160,
+        fmt_size: int = 16) -> bytes:
+    pcm = np.zeros(frames * max(channels, 1), dtype='<i2').tobytes()
+    block = max(channels, 1) * bits // 8
+    fmt = struct.pack('<HHIIHH', 1, channels, sample_rate, sample_rate * block, block, bits)[:fmt_size]
+    body = b'WAVE' + b'fmt ' + struct.pack('<I', fmt_size) + fmt + b'data' + struct.pack('<I', len(pcm)) + pcm
+    return b'RIFF' + struct.pack('<I', len(body)) + body
+
+
+def test_decode_wav_round_trip():
+    audio = np.linspace(-0.5, 0.5, 1600, dtype=np.float32)
+    samples, sample_rate, channels = decode_wav(encode_wav(audio, 16000))
+    assert (sample_rate, channels) == (16000, 1)
+    assert np.allclose(samples / 32768.0, audio, atol=1e-4)
+
+
+def test_decode_upload_resamples_stereo():
+    decoded = decode_upload(wav(channels=2, sample_rate=8000, frames=800))
+    assert decoded.dtype == np.float32
+    assert len(decoded) == 1600
+
+
+@pytest.mark.parametrize('header, message', [
+    (dict(sample_rate=0), 'sample rate'),
+    (dict(channels=0), 'channel count'),
+    (dict(fmt_size=12), 'Truncated'),
+])
+def test_invalid_wav_headers_are_decode_errors(header, message):
+    data = wav(**header)
+    with pytest.raises(AudioDecodeError, match=message):
+        decode_wav(data)
+    with pytest.raises(AudioDecodeError):
+        decode_upload(data)
+
+
+def test_fmt_chunk_cut_off_by_end_of_buffer():
+    data = wav()
+    with pytest.raises(AudioDecodeError, match='Truncated'):
+        decode_wav(data[:30])
+
+
+def test_raw_pcm_needs_sample_rate_and_channels():
+    pcm = np.zeros(320, dtype='<i2').tobytes()
+    with pytest.raises(AudioDecodeError):
+        decode_upload(pcm)
+    with pytest.raises(AudioDecodeError):
+        decode_upload(pcm, sample_rate=16000, channels=0)
+    assert len(decode_upload(pcm, sample_rate=16000)) == 320
@@ -0,0 +1,135 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from data_ingestion.cache import MarketDataCache, cached
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def make_cache(clock=None, market_open: bool = True) -> MarketDataCache:
+    return MarketDataCache(maxsize=8, ttls={'info': (60, 600)}, clock=clock or FakeClock(),
+                           market_open=lambda: market_open)
+
+
+class BlockingLoader:
+    """Loader that holds every caller until released, counting calls"""
+
+    def __init__(self, result=None, error: Exception = None):
+        self.result = {'value': 1} if result is None else result
+        self.error = error
+        self.calls = 0
+        self.started = threading.Event()
+        self.release = threading.Event()
+
+    def __call__(self):
+        self.calls += 1
+        self.started.set()
+        self.release.wait(5)
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+
+def run_concurrently(cache: MarketDataCache, loader: BlockingLoader, callers: int):
+    with ThreadPoolExecutor(callers) as executor:
+        first = executor.submit(cache.get_or_load, 'key', loader)
+        assert loader.started.wait(5)
+        rest = [executor.submit(cache.get_or_load, 'key', loader) for _ in range(callers - 1)]
+        # Give the waiters time to queue behind the load in flight
+        threading.Event().wait(0.1)
+        loader.release.set()
+        return [first] + rest
+
+
+def test_concurrent_misses_load_once_and_count_waiters_as_hits():
+    cache = make_cache()
+    loader = BlockingLoader()
+    futures = run_concurrently(cache, loader, 8)
+    results = [future.result(5) for future in futures]
+
+    assert loader.calls == 1
+    assert all(result == {'value': 1} for result in results)
+    # Every caller gets its own copy
+    assert len({id(result) for result in results}) == len(results)
+    stats = cache.stats()
+    assert (stats['misses'], stats['hits']) == (1, 7)
+    assert cache._loading == {}
+
+
+def test_loader_exception_reaches_every_waiter_and_is_not_cached():
+    cache = make_cache()
+    loader = BlockingLoader(error=RuntimeError('provider down'))
+    futures = run_concurrently(cache, loader, 5)
+    for future in futures:
+        with pytest.raises(RuntimeError, match='provider down'):
+            future.result(5)
+    assert loader.calls == 1
+    assert cache._loading == {}
+
+    # The next call loads again
+    assert cache.get_or_load('key', lambda: 'recovered') == 'recovered'
+
+
+def test_uncacheable_results_are_not_stored():
+    cache = make_cache()
+    assert cache.get_or_load('key', lambda: {}) == {}
+    assert cache.get('key', 'missing') == 'missing'
+
+
+def test_entries_expire_after_their_ttl():
+    clock = FakeClock()
+    cache = make_cache(clock)
+    calls = []
+
+    def loader():
+        calls.append(clock.now)
+        return {'loaded_at': clock.now}
+
+    assert cache.get_or_load('key', loader) == {'loaded_at': 1000.0}
+    clock.now += 59
+    assert cache.get_or_load('key', loader) == {'loaded_at': 1000.0}
+    clock.now += 2
+    assert cache.get_or_load('key', loader) == {'loaded_at': 1061.0}
+    assert len(calls) == 2
+
+
+def test_closed_markets_use_the_longer_ttl():
+    clock = FakeClock()
+    cache = make_cache(clock, market_open=False)
+    cache.set('key', 'value')
+    clock.now += 599
+    assert cache.get('key') == 'value'
+    clock.now += 2
+    assert cache.get('key') is None
+
+
+def test_cached_decorator_keys_by_universe_and_arguments():
+    class Agent:
+        def __init__(self, cache, universe):
+            self.cache = cache
+            self.universe = universe
+            self.calls = 0
+
+        def cache_key(self):
+            return self.universe
+
+        @cached('info')
+        def lookup(self, symbol):
+            self.calls += 1
+            return {'universe': self.universe, 'symbol': symbol}
+
+    cache = make_cache()
+    asia, europe = Agent(cache, 'asia'), Agent(cache, 'europe')
+    assert asia.lookup('A') == {'universe': 'asia', 'symbol': 'A'}
+    assert asia.lookup('A') == {'universe': 'asia', 'symbol': 'A'}
+    assert asia.lookup('B')['symbol'] == 'B'
+    assert europe.lookup('A')['universe'] == 'europe'
+    assert (asia.calls, europe.calls) == (2, 1)
@@ -0,0 +1,61 @@
+import multiprocessing
+
+import numpy as np
+import pandas as pd
+
+from data_ingestion.history_store import HistoryStore
+
+
+def bars(start: str, periods: int, base: float = 100.0) -> pd.DataFrame:
+    index = pd.date_range(start, periods=periods, freq='D', tz='UTC')
+    close = base + np.arange(periods, dtype='float64')
+    return pd.DataFrame({'Open': close - 0.5, 'High': close + 1, 'Low': close - 1,
+                         'Close': close, 'Volume': close * 10}, index=index)
+
+
+def test_append_adds_only_newer_bars(tmp_path):
+    store = HistoryStore(str(tmp_path))
+    assert store.append('AAA', bars('2024-01-01', 5)) == 5
+    # Overlapping refresh: the first 3 bars are already stored, the last stored one is rewritten
+    assert store.append('AAA', bars('2024-01-03', 5, base=102.0)) == 2
+    frame = store.frame('AAA')
+    assert len(frame) == 7
+    assert frame.index.is_monotonic_increasing
+    assert list(frame['Close']) == [100.0, 101.0, 102.0, 103.0, 104.0, 105.0, 106.0]
+
+
+def test_append_overwrites_the_last_bar(tmp_path):
+    store = HistoryStore(str(tmp_path))
+    store.append('AAA', bars('2024-01-01', 3))
+    forming = bars('2024-01-03', 1, base=150.0)
+    assert store.append('AAA', forming) == 0
+    frame = store.frame('AAA')
+    assert len(frame) == 3
+    assert frame['Close'].iloc[-1] == 150.0
+    assert frame['Volume'].iloc[-1] == 1500.0
+    # A fresh store reads the same files from disk
+    assert HistoryStore(str(tmp_path)).frame('AAA').equals(frame)
+
+
+def _append_batches(root: str, offset: int):
+    store = HistoryStore(root)
+    for start in range(offset, 600, 3):
+        store.append('AAA', bars(str(pd.Timestamp('2024-01-01') + pd.Timedelta(days=start)), 4,
+                                 base=100.0 + start))
+
+
+def test_concurrent_appends_from_processes_keep_columns_aligned(tmp_path):
+    context = multiprocessing.get_context('fork')
+    workers = [context.Process(target=_append_batches, args=(str(tmp_path), offset)) for offset in range(6)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+        assert worker.exitcode == 0
+
+    frame = HistoryStore(str(tmp_path)).frame('AAA')
+    assert frame.index.is_unique and frame.index.is_monotonic_increasing
+    days = (frame.index - pd.Timestamp('2024-01-01', tz='UTC')).days.to_numpy()
+    # Every row's values belong to its own timestamp
+    assert np.array_equal(frame['Close'].to_numpy(), 100.0 + days)
+    assert np.array_equal(frame['Volume'].to_numpy(), (100.0 + days) * 10)
@@ -0,0 +1,104 @@
+import math
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from analytics.risk import RiskEngine
+
+SYMBOLS = ['AAA', 'BBB', 'CCC', 'DDD']
+
+
+def make_positions() -> pd.DataFrame:
+    return pd.DataFrame({
+        'quantity': [100.0, -50.0, 30.0, 10.0],
+        'name': SYMBOLS,
+        'fx': [1.0, 1.0, 1.1, 0.9],
+    }, index=pd.Index(SYMBOLS, name='symbol'))
+
+
+def make_prices(bars: int, seed: int) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    returns = rng.normal(0.0, 0.02, size=(bars, len(SYMBOLS)))
+    prices = 100 * np.cumprod(1 + returns, axis=0)
+    return pd.DataFrame(prices, index=pd.bdate_range('2024-01-01', periods=bars), columns=SYMBOLS)
+
+
+def window_returns(prices: pd.DataFrame, engine: RiskEngine) -> np.ndarray:
+    """The returns the engine's window should hold, recomputed from all prices seen"""
+    returns = prices.pct_change().iloc[1:].to_numpy()
+    return returns[-engine.count:]
+
+
+def assert_sums_match(engine: RiskEngine, returns: np.ndarray):
+    book = returns @ engine.weights
+    assert np.allclose(engine._sum, returns.sum(axis=0))
+    assert math.isclose(engine._book_sum, float(book.sum()), abs_tol=1e-12)
+    assert math.isclose(engine._book_sq, float(book @ book), abs_tol=1e-12)
+    assert np.allclose(engine._cross, returns.T @ book)
+
+
+def assert_matches_rebase(engine: RiskEngine, monkeypatch):
+    """rebase() under the weights in the sums must reproduce the incremental sums"""
+    incremental = (engine._sum.copy(), engine._book_sum, engine._book_sq, engine._cross.copy())
+    weights = engine.weights
+    with monkeypatch.context() as patch:
+        patch.setattr(engine, '_value_weights', lambda: weights)
+        engine.rebase()
+    assert np.allclose(incremental[0], engine._sum)
+    assert math.isclose(incremental[1], engine._book_sum, abs_tol=1e-12)
+    assert math.isclose(incremental[2], engine._book_sq, abs_tol=1e-12)
+    assert np.allclose(incremental[3], engine._cross)
+
+
+def test_update_wrapping_before_window_is_full():
+    prices = make_prices(8, seed=1)
+    engine = RiskEngine(make_positions(), window=5, drift_tolerance=float('inf'))
+    engine.load(prices.iloc[:4])
+    assert engine.count == 3
+    # 4 new bars wrap around slot 0 while only 3 slots held data
+    engine.update(prices.iloc[4:])
+    assert engine.count == 5
+    assert_sums_match(engine, window_returns(prices, engine))
+
+
+@pytest.mark.parametrize('drift_tolerance', [float('inf'), 0.05])
+def test_incremental_sums_match_rebase(drift_tolerance, monkeypatch):
+    rng = np.random.default_rng(7)
+    prices = make_prices(200, seed=2)
+    engine = RiskEngine(make_positions(), window=5, drift_tolerance=drift_tolerance)
+    engine.load(prices.iloc[:3])
+    end = 3
+    while end < len(prices):
+        size = int(rng.integers(1, engine.window))
+        engine.update(prices.iloc[end:end + size])
+        end += size
+        assert_sums_match(engine, window_returns(prices.iloc[:end], engine))
+        assert_matches_rebase(engine, monkeypatch)
+
+
+def test_summary_matches_full_recompute():
+    rng = np.random.default_rng(11)
+    prices = make_prices(120, seed=3)
+    engine = RiskEngine(make_positions(), window=20, confidence=0.95)
+    engine.load(prices.iloc[:10])
+    end = 10
+    while end < len(prices):
+        size = int(rng.integers(1, 30))
+        engine.update(prices.iloc[end:end + size])
+        end += size
+
+        returns = window_returns(prices.iloc[:end], engine)
+        book = returns @ engine.weights
+        values = engine.values()
+        gross = np.abs(values).sum()
+        losses = np.sort(-book)
+        var = max(losses[math.ceil(0.95 * len(losses)) - 1], 0.0)
+        contribution = engine.weights * np.cov(returns.T, book)[-1, :-1] / book.var(ddof=1)
+
+        summary = engine.summary()
+        assert summary['observations'] == min(end - 1, engine.window)
+        assert math.isclose(summary['daily_volatility'], book.std(ddof=1) * 100, rel_tol=1e-9)
+        assert math.isclose(summary['historical_var'], var * gross, rel_tol=1e-9, abs_tol=1e-9)
+        assert np.allclose(list(summary['risk_contribution'].values()), contribution * 100)
+        assert math.isclose(sum(summary['risk_contribution'].values()), 100.0)
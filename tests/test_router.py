@@ -0,0 +1,31 @@
+from types import SimpleNamespace
+
+from orchestrator import router
+
+
+def test_risk_question_without_positions_goes_to_crew():
+    market_data = SimpleNamespace(positions_file=None)
+    route = router.classify("what's our volatility", available=router.intents_for(market_data))
+    assert not route.fast
+    assert route.intents == ()
+    assert 'risk' in route.reason
+
+
+def test_risk_question_with_positions_takes_fast_path():
+    market_data = SimpleNamespace(positions_file='positions.csv')
+    route = router.classify("what's our volatility", available=router.intents_for(market_data))
+    assert route.fast
+    assert route.intents == ('risk',)
+
+
+def test_other_intents_unaffected_without_positions():
+    market_data = SimpleNamespace(positions_file=None)
+    route = router.classify("earnings surprises this quarter", available=router.intents_for(market_data))
+    assert route.fast
+    assert route.intents == ('earnings',)
+
+
+def test_mixed_question_with_unavailable_intent_goes_to_crew():
+    market_data = SimpleNamespace(positions_file=None)
+    route = router.classify("earnings and value at risk", available=router.intents_for(market_data))
+    assert not route.fast
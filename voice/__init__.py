@@ -0,0 +1,3 @@
+"""
+Voice package for audio decoding, speech-to-text and text-to-speech.
+"""
@@ -0,0 +1,160 @@
+"""
+Audio decoding and resampling for speech-to-text.
+
+Uploaded WAV or raw PCM bytes are viewed in place with ``np.frombuffer``
+(no parsing into Python floats, no intermediate copies), downmixed and
+resampled once, vectorized, to the 16 kHz mono float32 that Whisper expects.
+"""
+import struct
+from typing import AsyncIterator, Optional, Tuple, Union
+
+import numpy as np
+
+WHISPER_SAMPLE_RATE = 16000
+
+# WAVE format tags
+_PCM = 0x0001
+_IEEE_FLOAT = 0x0003
+_EXTENSIBLE = 0xFFFE
+
+# Raw PCM encodings accepted for octet-stream uploads
+PCM_ENCODINGS = {
+    'pcm_s16le': np.dtype('<i2'),
+    'pcm_s32le': np.dtype('<i4'),
+    'pcm_f32le': np.dtype('<f4'),
+    'pcm_u8': np.dtype('u1'),
+}
+
+Buffer = Union[bytes, bytearray, memoryview]
+
+
+class AudioDecodeError(ValueError):
+    """Raised when uploaded audio cannot be decoded"""
+
+
+class PayloadTooLarge(Exception):
+    """Raised when an upload exceeds the configured size limit"""
+
+
+def decode_wav(data: Buffer) -> Tuple[np.ndarray, int, int]:
+    """View the samples of a RIFF/WAVE buffer; returns (samples, sample_rate, channels)"""
+    view = memoryview(data)
+    if len(view) < 12 or bytes(view[0:4]) != b'RIFF' or bytes(view[8:12]) != b'WAVE':
+        raise AudioDecodeError("Not a RIFF/WAVE file")
+
+    fmt = None
+    offset = 12
+    while offset + 8 <= len(view):
+        chunk_id = bytes(view[offset:offset + 4])
+        chunk_size = struct.unpack_from('<I', view, offset + 4)[0]
+        body = offset + 8
+        if chunk_id == b'fmt ':
+            if chunk_size < 16 or body + 16 > len(view):
+                raise AudioDecodeError("Truncated WAV fmt chunk")
+            tag, channels, sample_rate = struct.unpack_from('<HHI', view, body)
+            bits = struct.unpack_from('<H', view, body + 14)[0]
+            if tag == _EXTENSIBLE and chunk_size >= 40 and body + 26 <= len(view):
+                tag = struct.unpack_from('<H', view, body + 24)[0]
+            if channels < 1:
+                raise AudioDecodeError(f"Invalid WAV channel count: {channels}")
+            if sample_rate <= 0:
+                raise AudioDecodeError(f"Invalid WAV sample rate: {sample_rate}")
+            fmt = (tag, channels, sample_rate, bits)
+        elif chunk_id == b'data':
+            if fmt is None:
+                raise AudioDecodeError("WAV data chunk before fmt chunk")
+            tag, channels, sample_rate, bits = fmt
+            dtype = _wav_dtype(tag, bits)
+            # Streamed WAVs may carry a placeholder size; trust the buffer instead
+            size = min(chunk_size, len(view) - body)
+            count = size // dtype.itemsize
+            count -= count % max(channels, 1)
+            samples = np.frombuffer(data, dtype=dtype, count=count, offset=body)
+            return samples, sample_rate, channels
+        # Chunks are padded to an even size
+        offset = body + chunk_size + (chunk_size & 1)
+    raise AudioDecodeError("WAV file has no data chunk")
+
+
+def _wav_dtype(tag: int, bits: int) -> np.dtype:
+    if tag == _PCM and bits in (8, 16, 32):
+        return np.dtype({8: 'u1', 16: '<i2', 32: '<i4'}[bits])
+    if tag == _IEEE_FLOAT and bits in (32, 64):
+        return np.dtype({32: '<f4', 64: '<f8'}[bits])
+    raise AudioDecodeError(f"Unsupported WAV encoding (format {tag}, {bits} bits)")
+
+
+def encode_wav(audio: np.ndarray, sample_rate: int) -> bytes:
+    """16-bit mono RIFF/WAVE bytes for float32 samples in [-1, 1]"""
+    pcm = (np.clip(audio, -1.0, 1.0) * 32767).astype('<i2').tobytes()
+    header = struct.pack('<4sI4s4sIHHIIHH4sI', b'RIFF', 36 + len(pcm), b'WAVE', b'fmt ', 16,
+                         _PCM, 1, sample_rate, sample_rate * 2, 2, 16, b'data', len(pcm))
+    return header + pcm
+
+
+def decode_pcm(data: Buffer, encoding: str = 'pcm_s16le', channels: int = 1) -> np.ndarray:
+    """View raw interleaved PCM bytes as samples"""
+    if encoding not in PCM_ENCODINGS:
+        raise AudioDecodeError(f"Unsupported encoding '{encoding}'. Use one of: {', '.join(PCM_ENCODINGS)}")
+    dtype = PCM_ENCODINGS[encoding]
+    count = len(data) // dtype.itemsize
+    count -= count % max(channels, 1)
+    return np.frombuffer(data, dtype=dtype, count=count)
+
+
+def to_float32_mono(samples: np.ndarray, channels: int = 1) -> np.ndarray:
+    """Scale integer PCM to [-1, 1] float32 and average interleaved channels"""
+    if samples.dtype.kind == 'u':
+        audio = (samples.astype(np.float32) - 128.0) / 128.0
+    elif samples.dtype.kind == 'i':
+        audio = samples.astype(np.float32) / float(np.iinfo(samples.dtype).max + 1)
+    else:
+        audio = samples.astype(np.float32, copy=False)
+    if channels > 1:
+        audio = audio.reshape(-1, channels).mean(axis=1, dtype=np.float32)
+    return audio
+
+
+def resample(audio: np.ndarray, source_rate: int,
+             target_rate: int = WHISPER_SAMPLE_RATE) -> np.ndarray:
+    """Linear-interpolation resampling of a mono signal in one vectorized pass"""
+    if source_rate == target_rate or not len(audio):
+        return audio
+    duration = len(audio) / source_rate
+    target_length = max(1, int(round(duration * target_rate)))
+    positions = np.arange(target_length, dtype=np.float64) * (source_rate / target_rate)
+    return np.interp(positions, np.arange(len(audio)), audio).astype(np.float32)
+
+
+def prepare_for_whisper(samples: np.ndarray, sample_rate: int, channels: int = 1) -> np.ndarray:
+    """Convert decoded samples to 16 kHz mono float32"""
+    return resample(to_float32_mono(samples, channels), sample_rate)
+
+
+def decode_upload(data: Buffer, sample_rate: Optional[int] = None,
+                  encoding: str = 'pcm_s16le', channels: int = 1) -> np.ndarray:
+    """Decode a WAV or raw PCM upload into Whisper-ready audio"""
+    if bytes(memoryview(data)[:4]) == b'RIFF':
+        samples, sample_rate, channels = decode_wav(data)
+    else:
+        if not sample_rate or sample_rate < 0:
+            raise AudioDecodeError("sample_rate is required for raw PCM uploads")
+        if channels < 1:
+            raise AudioDecodeError(f"Invalid channel count: {channels}")
+        samples = decode_pcm(data, encoding, channels)
+    if not len(samples):
+        raise AudioDecodeError("Upload contains no audio samples")
+    return prepare_for_whisper(samples, sample_rate, channels)
+
+
+async def read_stream(chunks: AsyncIterator[bytes], limit: int,
+                      expected_length: Optional[int] = None) -> bytearray:
+    """Collect an upload chunk by chunk into one buffer, enforcing a size limit"""
+    if expected_length is not None and expected_length > limit:
+        raise PayloadTooLarge(f"Upload of {expected_length} bytes exceeds the {limit} byte limit")
+    buffer = bytearray()
+    async for chunk in chunks:
+        if len(buffer) + len(chunk) > limit:
+            raise PayloadTooLarge(f"Upload exceeds the {limit} byte limit")
+        buffer += chunk
+    return buffer
@@ -0,0 +1,298 @@
+"""
+Streaming speech-to-text with energy-based voice activity detection.
+
+Audio arrives in arbitrary chunks (microphone callbacks or an upload being
+read) and is staged in a ring buffer, then processed in fixed 30 ms frames. A
+lightweight energy detector with an adaptive noise floor decides which frames
+carry speech. Leading silence is never buffered beyond a short pre-roll, each
+pause-bounded speech segment is transcribed as soon as the speaker pauses,
+and the utterance ends on its own after a longer stretch of silence. Whisper
+therefore only ever sees speech-bearing samples, and the first words come back
+while the user is still talking.
+"""
+import queue
+import time
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from observability.tracing import span
+from voice.audio import WHISPER_SAMPLE_RATE
+
+SEGMENT = 'segment'
+END = 'end'
+
+
+class RingBuffer:
+    """Fixed-capacity FIFO of float32 samples backed by one preallocated array"""
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self._data = np.zeros(capacity, dtype=np.float32)
+        self._start = 0
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def write(self, samples: np.ndarray):
+        """Append samples, overwriting the oldest ones when full"""
+        samples = np.asarray(samples, dtype=np.float32)[-self.capacity:]
+        n = len(samples)
+        overflow = max(0, self._size + n - self.capacity)
+        self._start = (self._start + overflow) % self.capacity
+        self._size -= overflow
+        end = (self._start + self._size) % self.capacity
+        first = min(n, self.capacity - end)
+        self._data[end:end + first] = samples[:first]
+        self._data[:n - first] = samples[first:]
+        self._size += n
+
+    def peek(self, n: Optional[int] = None) -> np.ndarray:
+        """Copy of the oldest n samples (all by default) without consuming them"""
+        n = self._size if n is None else min(n, self._size)
+        index = (self._start + np.arange(n)) % self.capacity
+        return self._data[index]
+
+    def read(self, n: int) -> np.ndarray:
+        """Consume and return the oldest n samples"""
+        samples = self.peek(n)
+        self._start = (self._start + len(samples)) % self.capacity
+        self._size -= len(samples)
+        return samples
+
+    def clear(self):
+        self._start = 0
+        self._size = 0
+
+
+class EnergyVAD:
+    """RMS energy detector with a noise floor that adapts during silence
+
+    The floor starts at ``min_rms``, so a speaker who is already talking when
+    recording starts is heard at once. After ``calibration_frames`` frames it
+    is raised to the quietest of them if that is higher, since even continuous
+    speech has quiet gaps between words and only background noise is left in
+    them.
+    """
+
+    def __init__(self, threshold: float = 3.0, min_rms: float = 0.005, adaptation: float = 0.05,
+                 calibration_frames: int = 20):
+        self.threshold = threshold
+        self.min_rms = min_rms
+        self.adaptation = adaptation
+        self.calibration_frames = calibration_frames
+        self.noise_floor = min_rms
+        self._quietest: Optional[float] = None
+        self._calibrated = 0
+
+    def is_speech(self, frame: np.ndarray) -> bool:
+        rms = float(np.sqrt(np.mean(np.square(frame, dtype=np.float32))))
+        if self._calibrated < self.calibration_frames:
+            self._calibrated += 1
+            self._quietest = rms if self._quietest is None else min(self._quietest, rms)
+            if self._calibrated == self.calibration_frames:
+                self.noise_floor = max(self.noise_floor, self._quietest)
+        speech = rms > max(self.min_rms, self.noise_floor * self.threshold)
+        if not speech:
+            self.noise_floor += self.adaptation * (rms - self.noise_floor)
+        return speech
+
+
+class UtteranceSegmenter:
+    """Split a sample stream into pause-bounded speech segments of one utterance
+
+    ``feed`` returns ``(kind, audio)`` pairs: ``'segment'`` when the speaker
+    pauses for ``pause_ms``, ``'end'`` when silence lasts ``end_silence_ms``
+    or the utterance reaches ``max_utterance`` seconds. Silence around speech
+    is trimmed to ``padding_ms``.
+    """
+
+    def __init__(self, sample_rate: int = WHISPER_SAMPLE_RATE, frame_ms: int = 30,
+                 pause_ms: int = 300, end_silence_ms: int = 900, padding_ms: int = 150,
+                 min_speech_ms: int = 150, max_utterance: float = 30.0,
+                 vad: Optional[EnergyVAD] = None):
+        self.sample_rate = sample_rate
+        self.frame = int(sample_rate * frame_ms / 1000)
+        self.pause_frames = max(1, pause_ms // frame_ms)
+        self.end_frames = max(self.pause_frames + 1, end_silence_ms // frame_ms)
+        self.padding_frames = max(0, padding_ms // frame_ms)
+        self.min_speech_frames = max(1, min_speech_ms // frame_ms)
+        self.max_frames = int(max_utterance * 1000 / frame_ms)
+        self.vad = vad or EnergyVAD()
+        self._input = RingBuffer(sample_rate * 2)
+        self._preroll = RingBuffer(self.frame * max(1, self.padding_frames))
+        self.reset()
+
+    def reset(self):
+        self._frames: List[np.ndarray] = []
+        self._speech_frames = 0
+        self._silence_run = 0
+        self._utterance_frames = 0
+        self._segment_emitted = False
+        self.in_speech = False
+        self._preroll.clear()
+
+    def _cut(self) -> np.ndarray:
+        # Keep `padding` frames of the trailing silence
+        keep = len(self._frames) - max(0, self._silence_run - self.padding_frames)
+        audio = np.concatenate(self._frames[:keep]) if keep > 0 else np.zeros(0, dtype=np.float32)
+        self._frames = []
+        self._speech_frames = 0
+        return audio
+
+    def _process(self, frame: np.ndarray) -> Optional[Tuple[str, np.ndarray]]:
+        speech = self.vad.is_speech(frame)
+        if not self.in_speech:
+            if not speech:
+                self._preroll.write(frame)
+                return None
+            self.in_speech = True
+            self._frames = [self._preroll.read(len(self._preroll))] if len(self._preroll) else []
+            self._silence_run = 0
+
+        self._frames.append(frame)
+        self._utterance_frames += 1
+        if speech:
+            self._speech_frames += 1
+            self._silence_run = 0
+        else:
+            self._silence_run += 1
+
+        if self._silence_run >= self.end_frames or self._utterance_frames >= self.max_frames:
+            enough = self._speech_frames >= self.min_speech_frames
+            audio = self._cut()
+            emitted = self._segment_emitted
+            self.reset()
+            if enough or emitted:
+                return END, audio if enough else np.zeros(0, dtype=np.float32)
+            # A click or a cough: no utterance after all
+            return None
+        if self._silence_run == self.pause_frames and self._speech_frames >= self.min_speech_frames:
+            self._segment_emitted = True
+            return SEGMENT, self._cut()
+        return None
+
+    def feed(self, samples: np.ndarray) -> List[Tuple[str, np.ndarray]]:
+        """Consume a chunk of 16 kHz mono samples and return finished segments"""
+        samples = np.asarray(samples, dtype=np.float32)
+        events = []
+        # Large chunks are staged piecewise so the ring buffer never overflows
+        for start in range(0, len(samples), self._input.capacity - self.frame):
+            self._input.write(samples[start:start + self._input.capacity - self.frame])
+            while len(self._input) >= self.frame:
+                event = self._process(self._input.read(self.frame))
+                if event is not None:
+                    events.append(event)
+        return events
+
+    def flush(self) -> List[Tuple[str, np.ndarray]]:
+        """End of stream: close the current utterance, if any"""
+        if not self.in_speech:
+            return []
+        enough = self._speech_frames >= self.min_speech_frames
+        audio = self._cut() if enough else np.zeros(0, dtype=np.float32)
+        emitted = self._segment_emitted
+        self.reset()
+        return [(END, audio)] if enough or emitted else []
+
+
+class StreamingTranscriber:
+    """Transcribe each speech segment as it completes and emit partial/final text"""
+
+    def __init__(self, transcribe: Callable[[np.ndarray], Dict[str, Any]],
+                 segmenter: Optional[UtteranceSegmenter] = None):
+        self.transcribe = transcribe
+        self.segmenter = segmenter or UtteranceSegmenter()
+        self.samples_in = 0
+        self.samples_transcribed = 0
+        self.first_text_at: Optional[float] = None
+        self._texts: List[str] = []
+        self._started = time.monotonic()
+
+    @property
+    def sample_rate(self) -> int:
+        return self.segmenter.sample_rate
+
+    def _transcribe(self, audio: np.ndarray) -> str:
+        if not len(audio):
+            return ''
+        self.samples_transcribed += len(audio)
+        with span('stt.transcribe', seconds=round(len(audio) / self.sample_rate, 2)):
+            text = self.transcribe(audio)["text"].strip()
+        if text and self.first_text_at is None:
+            self.first_text_at = time.monotonic() - self._started
+        return text
+
+    def _events(self, segments: List[Tuple[str, np.ndarray]]) -> List[Dict[str, Any]]:
+        events = []
+        for kind, audio in segments:
+            text = self._transcribe(audio)
+            if text:
+                self._texts.append(text)
+            events.append({
+                'type': 'final' if kind == END else 'partial',
+                'text': ' '.join(self._texts),
+                'segment_text': text,
+            })
+            if kind == END:
+                self._texts = []
+        return events
+
+    def feed(self, samples: np.ndarray) -> List[Dict[str, Any]]:
+        self.samples_in += len(samples)
+        return self._events(self.segmenter.feed(samples))
+
+    def flush(self) -> List[Dict[str, Any]]:
+        return self._events(self.segmenter.flush())
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'seconds_in': self.samples_in / self.sample_rate,
+            'seconds_transcribed': self.samples_transcribed / self.sample_rate,
+            'time_to_first_text': self.first_text_at,
+        }
+
+
+def _microphone_chunks(sample_rate: int, max_duration: float,
+                       block_ms: int = 30) -> Iterator[np.ndarray]:
+    import sounddevice as sd
+
+    chunks: "queue.Queue[np.ndarray]" = queue.Queue()
+
+    def callback(indata, frames, time_info, status):
+        chunks.put(indata[:, 0].copy())
+
+    deadline = time.monotonic() + max_duration
+    with sd.InputStream(samplerate=sample_rate, channels=1, dtype='float32',
+                        blocksize=int(sample_rate * block_ms / 1000), callback=callback):
+        while time.monotonic() < deadline:
+            try:
+                yield chunks.get(timeout=0.5)
+            except queue.Empty:
+                continue
+
+
+def stream_microphone(transcriber: StreamingTranscriber,
+                      max_duration: float = 30.0) -> Iterator[Dict[str, Any]]:
+    """Yield partial and final transcripts from the microphone until the utterance ends"""
+    for chunk in _microphone_chunks(transcriber.sample_rate, max_duration):
+        for event in transcriber.feed(chunk):
+            yield event
+            if event['type'] == 'final':
+                return
+    yield from transcriber.flush()
+
+
+def record_utterance(max_duration: float = 30.0,
+                     sample_rate: int = WHISPER_SAMPLE_RATE) -> np.ndarray:
+    """Record from the microphone until the speaker stops; returns trimmed speech only"""
+    segmenter = UtteranceSegmenter(sample_rate=sample_rate)
+    segments = []
+    for chunk in _microphone_chunks(sample_rate, max_duration):
+        for kind, audio in segmenter.feed(chunk):
+            segments.append(audio)
+            if kind == END:
+                return np.concatenate(segments)
+    segments.extend(audio for _, audio in segmenter.flush())
+    return np.concatenate(segments) if segments else np.zeros(0, dtype=np.float32)
@@ -0,0 +1,410 @@
+"""
+Text-to-speech with pluggable engines, sentence pipelining and an audio cache.
+
+An engine turns one piece of text into WAV bytes:
+- ``EspeakEngine`` uses espeak-ng or espeak, offline on Linux;
+- ``SayEngine`` uses macOS ``say``;
+- ``NullEngine`` writes silence sized to the text, for tests and headless
+  hosts.
+
+``TTS`` splits a brief into sentences and synthesizes them on a background
+worker, one or two sentences ahead of whoever consumes them. ``speak``
+therefore starts playing after the first sentence instead of the whole
+brief, and returns right away with a ``Playback`` handle. Every sentence's
+audio goes into a content-hashed LRU cache bounded in bytes. Repeated
+phrases, and briefs that were pre-rendered with ``synthesize``, are served
+without running the engine again.
+"""
+import hashlib
+import logging
+import os
+import queue
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Union
+
+import numpy as np
+
+from observability import tracing
+from voice.audio import decode_wav, encode_wav, resample, to_float32_mono
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_RATE = 175
+# Sentence ends: ., ! or ? followed by whitespace (so 3.5% and U.S. stay whole)
+_SENTENCE_END = re.compile(r'(?<=[.!?])\s+(?=[A-Z0-9"\'(])')
+
+
+def split_sentences(text: str, min_length: int = 20) -> List[str]:
+    """Split text into sentences, merging fragments shorter than `min_length` into the next"""
+    sentences, pending = [], ''
+    for part in _SENTENCE_END.split(' '.join(str(text).split())):
+        pending = f"{pending} {part}".strip()
+        if len(pending) >= min_length:
+            sentences.append(pending)
+            pending = ''
+    if pending:
+        if sentences and len(pending) < min_length:
+            sentences[-1] = f"{sentences[-1]} {pending}"
+        else:
+            sentences.append(pending)
+    return sentences
+
+
+class SentenceStream:
+    """Sentences cut from text that arrives in pieces, such as LLM tokens, as each one completes
+
+    One thread ``feed``s text and ``close``s the stream; another iterates it,
+    e.g. by passing it to ``TTS.speak``.
+    """
+
+    def __init__(self, min_length: int = 20):
+        self.min_length = min_length
+        self._text = ''
+        self._short = ''
+        self._sentences: "queue.Queue" = queue.Queue()
+
+    def feed(self, text: str):
+        self._text += text
+        parts = _SENTENCE_END.split(self._text)
+        # The last part may still be growing
+        self._text = parts.pop()
+        for part in parts:
+            self._short = f"{self._short} {' '.join(part.split())}".strip()
+            if len(self._short) >= self.min_length:
+                self._sentences.put(self._short)
+                self._short = ''
+
+    def close(self):
+        rest = f"{self._short} {' '.join(self._text.split())}".strip()
+        self._short = self._text = ''
+        if rest:
+            self._sentences.put(rest)
+        self._sentences.put(None)
+
+    def __iter__(self) -> Iterator[str]:
+        while True:
+            sentence = self._sentences.get()
+            if sentence is None:
+                return
+            yield sentence
+
+
+class TTSEngine:
+    """Interface implemented by every speech synthesizer"""
+
+    name = 'base'
+
+    @classmethod
+    def available(cls) -> bool:
+        return True
+
+    def synthesize(self, text: str, rate: int = DEFAULT_RATE) -> bytes:
+        """WAV bytes for `text` spoken at `rate` words per minute"""
+        raise NotImplementedError
+
+
+class EspeakEngine(TTSEngine):
+    """Offline synthesis with espeak-ng (or espeak), writing WAV to stdout"""
+
+    name = 'espeak'
+
+    def __init__(self, voice: str = 'en-us', timeout: float = 30.0):
+        self.binary = shutil.which('espeak-ng') or shutil.which('espeak')
+        self.voice = voice
+        self.timeout = timeout
+
+    @classmethod
+    def available(cls) -> bool:
+        return bool(shutil.which('espeak-ng') or shutil.which('espeak'))
+
+    def synthesize(self, text: str, rate: int = DEFAULT_RATE) -> bytes:
+        # Text goes on stdin, so a leading "-" (bullets, negative numbers) is never read as an option
+        result = subprocess.run([self.binary, '-v', self.voice, '-s', str(int(rate)), '--stdout', '--stdin'],
+                                input=text.encode('utf-8'), capture_output=True,
+                                timeout=self.timeout, check=True)
+        return result.stdout
+
+
+class SayEngine(TTSEngine):
+    """macOS ``say``, rendered to a WAV file instead of the speakers"""
+
+    name = 'say'
+
+    def __init__(self, timeout: float = 30.0):
+        self.timeout = timeout
+
+    @classmethod
+    def available(cls) -> bool:
+        return sys.platform == 'darwin' and bool(shutil.which('say'))
+
+    def synthesize(self, text: str, rate: int = DEFAULT_RATE) -> bytes:
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'speech.wav')
+            subprocess.run(['say', '-r', str(int(rate)), '-o', path, '--file-format=WAVE',
+                            '--data-format=LEI16@22050', '-f', '-'],
+                           input=text.encode('utf-8'), capture_output=True,
+                           timeout=self.timeout, check=True)
+            with open(path, 'rb') as handle:
+                return handle.read()
+
+
+class NullEngine(TTSEngine):
+    """Silent WAV as long as the text would take to read, for tests and headless hosts"""
+
+    name = 'null'
+
+    def __init__(self, sample_rate: int = 16000, latency: float = 0.0):
+        self.sample_rate = sample_rate
+        self.latency = latency
+        self.calls = 0
+
+    def synthesize(self, text: str, rate: int = DEFAULT_RATE) -> bytes:
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        seconds = max(len(text.split()), 1) / max(rate, 1) * 60
+        return encode_wav(np.zeros(int(seconds * self.sample_rate), dtype=np.float32), self.sample_rate)
+
+
+ENGINES = {engine.name: engine for engine in (EspeakEngine, SayEngine, NullEngine)}
+
+
+def engine_from_env() -> TTSEngine:
+    """TTS_ENGINE: espeak, say, null or auto (default: the first one installed)"""
+    name = os.getenv("TTS_ENGINE", "auto").lower()
+    if name != 'auto':
+        if name not in ENGINES:
+            raise ValueError(f"Unknown TTS engine '{name}'. Use one of: auto, {', '.join(ENGINES)}")
+        return ENGINES[name]()
+    for engine in (SayEngine, EspeakEngine):
+        if engine.available():
+            return engine()
+    logger.warning("No speech synthesizer found (install espeak-ng); TTS will be silent")
+    return NullEngine()
+
+
+class AudioCache:
+    """LRU of synthesized audio keyed by a hash of engine, rate and text, bounded in bytes"""
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, bytes]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(engine: str, rate: int, text: str) -> str:
+        return hashlib.sha256(f"{engine}\0{int(rate)}\0{text}".encode()).hexdigest()
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            audio = self._entries.get(key)
+            if audio is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return audio
+
+    def set(self, key: str, audio: bytes):
+        if len(audio) > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            self.size -= len(previous) if previous is not None else 0
+            self._entries[key] = audio
+            self.size += len(audio)
+            while self.size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.size -= len(evicted)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self.size,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / total if total else 0.0,
+            }
+
+
+def join_wavs(chunks: List[bytes]) -> bytes:
+    """Concatenate WAV files into one 16-bit mono WAV at the first chunk's rate"""
+    parts, rate = [], None
+    for chunk in chunks:
+        samples, sample_rate, channels = decode_wav(chunk)
+        audio = to_float32_mono(samples, channels)
+        rate = rate or sample_rate
+        parts.append(resample(audio, sample_rate, rate))
+    if not parts:
+        return encode_wav(np.zeros(0, dtype=np.float32), 16000)
+    return encode_wav(np.concatenate(parts), rate)
+
+
+def play_wav(audio: bytes):
+    """Play WAV bytes on this machine, blocking until done"""
+    try:
+        import sounddevice as sd
+    except ImportError:
+        sd = None
+    if sd is not None:
+        samples, sample_rate, channels = decode_wav(audio)
+        sd.play(to_float32_mono(samples, channels), sample_rate)
+        sd.wait()
+        return
+    player = shutil.which('aplay') or shutil.which('afplay') or shutil.which('paplay')
+    if player is None:
+        raise RuntimeError("No audio output available; install sounddevice or aplay")
+    with tempfile.NamedTemporaryFile(suffix='.wav') as handle:
+        handle.write(audio)
+        handle.flush()
+        subprocess.run([player, handle.name], capture_output=True, check=True)
+
+
+class Playback:
+    """Handle for speech playing in the background"""
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self.first_audio: Optional[float] = None
+        self.error: Optional[str] = None
+        self.done = threading.Event()
+        self._stop = threading.Event()
+
+    def stop(self):
+        self._stop.set()
+
+    @property
+    def stopped(self) -> bool:
+        return self._stop.is_set()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        return self.done.wait(timeout)
+
+    @property
+    def first_audio_latency(self) -> Optional[float]:
+        return self.first_audio - self.started if self.first_audio is not None else None
+
+
+class TTS:
+    def __init__(self, engine: Optional[TTSEngine] = None, cache: Optional[AudioCache] = None,
+                 player: Callable[[bytes], None] = play_wav, lookahead: int = 2):
+        self.engine = engine or engine_from_env()
+        self.cache = cache or AudioCache()
+        self.player = player
+        # Sentences synthesized ahead of playback
+        self.lookahead = lookahead
+        self._current: Optional[Playback] = None
+        self._lock = threading.Lock()
+
+    def sentence_audio(self, sentence: str, rate: int = DEFAULT_RATE) -> bytes:
+        key = AudioCache.key(self.engine.name, rate, sentence)
+        audio = self.cache.get(key)
+        if audio is None:
+            with tracing.span('tts.synthesize', engine=self.engine.name, characters=len(sentence)):
+                audio = self.engine.synthesize(sentence, rate)
+            self.cache.set(key, audio)
+        return audio
+
+    def stream(self, text: Union[str, Iterable[str]], rate: int = DEFAULT_RATE,
+               stop: Optional[threading.Event] = None) -> Iterator[bytes]:
+        """WAV audio per sentence, synthesized on a worker up to `lookahead` sentences ahead;
+        `text` is a whole text or an iterable of sentences such as a ``SentenceStream``"""
+        chunks: "queue.Queue" = queue.Queue(maxsize=self.lookahead)
+        stop = stop or threading.Event()
+        done = object()
+
+        def put(item) -> bool:
+            # Give up once the consumer has gone away instead of blocking forever
+            while not stop.is_set():
+                try:
+                    chunks.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        def produce():
+            try:
+                for sentence in split_sentences(text) if isinstance(text, str) else text:
+                    if stop.is_set() or not put(self.sentence_audio(sentence, rate)):
+                        return
+            except Exception as e:
+                put(e)
+            finally:
+                put(done)
+
+        threading.Thread(target=tracing.in_context(produce), name='tts-synth', daemon=True).start()
+        try:
+            while True:
+                # An external stop makes the producer give up without queueing `done`
+                try:
+                    chunk = chunks.get(timeout=0.1)
+                except queue.Empty:
+                    if stop.is_set():
+                        return
+                    continue
+                if chunk is done:
+                    return
+                if isinstance(chunk, Exception):
+                    raise chunk
+                yield chunk
+        finally:
+            stop.set()
+
+    def synthesize(self, text: str, rate: int = DEFAULT_RATE) -> bytes:
+        """The whole text as one WAV, e.g. for a pre-rendered brief; sentences land in the cache"""
+        return join_wavs(list(self.stream(text, rate)))
+
+    def speak(self, text: Union[str, Iterable[str]], rate: int = DEFAULT_RATE) -> Playback:
+        """Start speaking in the background, interrupting anything still playing"""
+        playback = Playback()
+        with self._lock:
+            if self._current is not None:
+                self._current.stop()
+            self._current = playback
+
+        def play():
+            try:
+                for chunk in self.stream(text, rate, playback._stop):
+                    if playback.stopped:
+                        break
+                    if playback.first_audio is None:
+                        playback.first_audio = time.monotonic()
+                    self.player(chunk)
+            except Exception as e:
+                playback.error = str(e)
+                logger.error(f"Error in text-to-speech: {str(e)}")
+            finally:
+                playback.done.set()
+
+        threading.Thread(target=tracing.in_context(play), name='tts-playback', daemon=True).start()
+        return playback
+
+    def stats(self) -> Dict[str, Any]:
+        return dict(self.cache.stats(), engine=self.engine.name)
+
+
+_default_tts: Optional[TTS] = None
+_default_lock = threading.Lock()
+
+
+def get_default_tts() -> TTS:
+    """Process-wide TTS with the TTS_ENGINE engine and a TTS_CACHE_MB audio cache"""
+    global _default_tts
+    with _default_lock:
+        if _default_tts is None:
+            cache = AudioCache(int(float(os.getenv("TTS_CACHE_MB", "64")) * 1024 * 1024))
+            _default_tts = TTS(engine_from_env(), cache)
+        return _default_tts
@@ -0,0 +1,278 @@
+"""
+Whisper inference service with dynamic micro-batching.
+
+``WhisperBatcher`` owns the model on a single inference thread. Concurrent
+transcription requests are queued and gathered into micro-batches of up to
+``max_batch`` clips, waiting at most ``max_wait`` seconds for a batch to fill;
+their padded log-mel spectrograms are decoded together in one forward pass.
+
+``WhisperServer`` exposes a batcher over a ``multiprocessing.connection``
+socket so that several uvicorn workers can share one model through
+``WhisperClient`` instead of each loading their own copy::
+
+    WHISPER_SERVICE_AUTHKEY=... python -m voice.whisper_service --address /tmp/whisper.sock
+
+and start the API with ``WHISPER_SERVICE_ADDRESS=/tmp/whisper.sock`` and the
+same ``WHISPER_SERVICE_AUTHKEY``. Requests are pickled, so both sides must
+share a secret key and the service only listens on a Unix socket or a
+loopback TCP address.
+"""
+import argparse
+import logging
+import os
+import queue
+import threading
+import time
+from collections import Counter
+from concurrent.futures import Future
+from multiprocessing.connection import Client, Listener
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+LOOPBACK_HOSTS = ('127.0.0.1', '::1', 'localhost')
+
+# Whisper decodes fixed 30 second windows of 16 kHz audio
+WINDOW_SAMPLES = 30 * 16000
+
+Address = Union[str, Tuple[str, int]]
+
+
+def parse_address(address: str) -> Address:
+    """'host:port' becomes a TCP address, anything else a Unix socket path"""
+    host, _, port = address.rpartition(':')
+    if host and port.isdigit():
+        return check_address((host.strip('[]'), int(port)))
+    return address
+
+
+def check_address(address: Address) -> Address:
+    """Refuses TCP addresses other hosts could reach"""
+    if not isinstance(address, str) and address[0] not in LOOPBACK_HOSTS:
+        raise ValueError(f"Whisper service address must be a Unix socket or a loopback host, not '{address[0]}'")
+    return address
+
+
+def default_authkey() -> bytes:
+    """WHISPER_SERVICE_AUTHKEY; there is no default, since anyone with the key can send pickles"""
+    authkey = os.getenv("WHISPER_SERVICE_AUTHKEY")
+    if not authkey:
+        raise ValueError("WHISPER_SERVICE_AUTHKEY must be set to use the Whisper service")
+    return authkey.encode()
+
+
+class _Request:
+    __slots__ = ('audio', 'future', 'enqueued')
+
+    def __init__(self, audio: np.ndarray):
+        self.audio = audio
+        self.future = Future()
+        self.enqueued = time.monotonic()
+
+
+class WhisperBatcher:
+    def __init__(self, model, max_batch: int = 8, max_wait: float = 0.05, fp16: bool = False):
+        self.model = model
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.fp16 = fp16
+        self.requests = 0
+        self.batches = 0
+        self.batch_sizes = Counter()
+        self._queue_wait = 0.0
+        self._inference_time = 0.0
+        self._queue: "queue.Queue[Optional[_Request]]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._loop, name='whisper-batcher', daemon=True)
+        self._thread.start()
+
+    def submit(self, audio: np.ndarray) -> Future:
+        """Queue a 16 kHz mono clip; the future resolves to {'text': ..., 'language': ...}"""
+        request = _Request(np.asarray(audio, dtype=np.float32))
+        self._queue.put(request)
+        return request.future
+
+    def transcribe(self, audio: np.ndarray, **kwargs) -> Dict[str, Any]:
+        """Blocking transcription with the same result shape as model.transcribe"""
+        return self.submit(audio).result()
+
+    def _collect(self, first: _Request) -> List[_Request]:
+        batch = [first]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                request = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if request is None:
+                # Put the shutdown marker back for the main loop
+                self._queue.put(None)
+                break
+            batch.append(request)
+        return batch
+
+    def _loop(self):
+        while True:
+            first = self._queue.get()
+            if first is None:
+                return
+            batch = self._collect(first)
+            started = time.monotonic()
+            with self._lock:
+                self.requests += len(batch)
+                self.batches += 1
+                self.batch_sizes[len(batch)] += 1
+                self._queue_wait += sum(started - request.enqueued for request in batch)
+            self._run(batch)
+            with self._lock:
+                self._inference_time += time.monotonic() - started
+
+    def _run(self, batch: List[_Request]):
+        # Clips longer than one window need Whisper's sliding-window transcribe
+        short = [request for request in batch if len(request.audio) <= WINDOW_SAMPLES]
+        long = [request for request in batch if len(request.audio) > WINDOW_SAMPLES]
+
+        if short:
+            try:
+                results = self._decode_batch([request.audio for request in short])
+                for request, result in zip(short, results):
+                    request.future.set_result(result)
+            except Exception as e:
+                logger.error(f"Batched Whisper decode failed: {str(e)}")
+                for request in short:
+                    request.future.set_exception(e)
+
+        for request in long:
+            try:
+                request.future.set_result(self.model.transcribe(request.audio, fp16=self.fp16))
+            except Exception as e:
+                request.future.set_exception(e)
+
+    def _decode_batch(self, audios: List[np.ndarray]) -> List[Dict[str, Any]]:
+        import torch
+        import whisper
+
+        n_mels = getattr(self.model.dims, 'n_mels', 80)
+        mels = torch.stack([
+            whisper.log_mel_spectrogram(whisper.pad_or_trim(torch.from_numpy(audio)), n_mels=n_mels)
+            for audio in audios
+        ]).to(self.model.device)
+        results = whisper.decode(self.model, mels, whisper.DecodingOptions(fp16=self.fp16))
+        return [{'text': result.text, 'language': result.language} for result in results]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'queue_depth': self._queue.qsize(),
+                'requests': self.requests,
+                'batches': self.batches,
+                'batch_sizes': dict(sorted(self.batch_sizes.items())),
+                'avg_batch_size': self.requests / self.batches if self.batches else 0.0,
+                'avg_queue_wait': self._queue_wait / self.requests if self.requests else 0.0,
+                'avg_batch_time': self._inference_time / self.batches if self.batches else 0.0,
+                'max_batch': self.max_batch,
+                'max_wait': self.max_wait,
+            }
+
+    def close(self):
+        self._queue.put(None)
+
+
+class WhisperServer:
+    """Serves a WhisperBatcher to other processes over a socket"""
+
+    def __init__(self, batcher: WhisperBatcher, address: Address, authkey: Optional[bytes] = None):
+        self.batcher = batcher
+        self.address = check_address(address)
+        self.authkey = authkey or default_authkey()
+
+    def serve_forever(self):
+        if isinstance(self.address, str) and os.path.exists(self.address):
+            os.unlink(self.address)
+        with Listener(self.address, authkey=self.authkey) as listener:
+            if isinstance(self.address, str):
+                os.chmod(self.address, 0o600)
+            logger.info(f"Whisper service listening on {self.address}")
+            while True:
+                try:
+                    connection = listener.accept()
+                except Exception as e:
+                    logger.warning(f"Rejected Whisper client: {str(e)}")
+                    continue
+                threading.Thread(target=self._handle, args=(connection,), daemon=True).start()
+
+    def _handle(self, connection):
+        with connection:
+            while True:
+                try:
+                    kind, payload = connection.recv()
+                except (EOFError, OSError):
+                    return
+                try:
+                    if kind == 'transcribe':
+                        response = ('ok', self.batcher.submit(payload).result())
+                    elif kind == 'stats':
+                        response = ('ok', self.batcher.stats())
+                    else:
+                        response = ('error', f"Unknown request '{kind}'")
+                except Exception as e:
+                    response = ('error', str(e))
+                connection.send(response)
+
+
+class WhisperClient:
+    """Drop-in for a Whisper model that forwards to a WhisperServer"""
+
+    def __init__(self, address: Address, authkey: Optional[bytes] = None):
+        self.address = address
+        self.authkey = authkey or default_authkey()
+        # One connection per thread so concurrent callers can be batched together
+        self._local = threading.local()
+
+    def _request(self, kind: str, payload: Any = None) -> Any:
+        for attempt in range(2):
+            connection = getattr(self._local, 'connection', None)
+            try:
+                if connection is None:
+                    connection = self._local.connection = Client(self.address, authkey=self.authkey)
+                connection.send((kind, payload))
+                status, result = connection.recv()
+                break
+            except (EOFError, OSError):
+                # The server restarted; reconnect once
+                self._local.connection = None
+                if attempt:
+                    raise
+        if status != 'ok':
+            raise RuntimeError(f"Whisper service error: {result}")
+        return result
+
+    def transcribe(self, audio: np.ndarray, **kwargs) -> Dict[str, Any]:
+        return self._request('transcribe', np.asarray(audio, dtype=np.float32))
+
+    def stats(self) -> Dict[str, Any]:
+        return self._request('stats')
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the shared Whisper inference service")
+    parser.add_argument("--model", default=os.getenv("WHISPER_MODEL", "base"))
+    parser.add_argument("--address", default=os.getenv("WHISPER_SERVICE_ADDRESS", "/tmp/whisper.sock"))
+    parser.add_argument("--max-batch", type=int, default=int(os.getenv("WHISPER_MAX_BATCH", "8")))
+    parser.add_argument("--max-wait", type=float, default=float(os.getenv("WHISPER_MAX_WAIT", "0.05")))
+    args = parser.parse_args()
+
+    import whisper
+    logging.basicConfig(level=logging.INFO)
+    logger.info(f"Loading Whisper model '{args.model}'...")
+    batcher = WhisperBatcher(whisper.load_model(args.model), args.max_batch, args.max_wait)
+    WhisperServer(batcher, parse_address(args.address)).serve_forever()
+
+
+if __name__ == "__main__":
+    main()